@@ -0,0 +1,285 @@
+"""bench_e2e.py — 수집 → 업로드 전체 흐름 처리량 측정
+=====================================================
+실제 테넌트·SFTP 서버 없이 로컬 가짜 서버 두 개를 띄우고
+
+    fetch_email_from_office365(cfg, one_day=...)  →  upload_to_sftp(cfg, db_path)
+
+를 반복 실행해 메일/s, MB/s, 최대 RSS, 단계별 소요 시간을 출력합니다.
+
+• Graph: `fake_graph_server.py` — 메일 수·본문·첨부 크기, 429 throttling, 지연 조절
+• SFTP : `fake_sftp_server.py`  — 로컬 디렉터리를 루트로 쓰는 paramiko 서버
+• IMAP : `--backend imap` 이면 같은 메일함을 `fake_imap_server.py` 로 제공
+• 단계별 시간·카운터는 `metrics.last_run("fetch" / "upload")` 기록을 그대로 사용
+• 토큰 발급(msal)은 측정하지 않습니다 — 가짜 토큰을 돌려주도록 바꿔 끼웁니다.
+• 가짜 서버도 같은 프로세스에서 돌므로 RSS 와 CPU 에는 서버 몫이 포함됩니다.
+
+`--replay` 에 운영에서 녹화한 Graph 응답(`graph_cassette.py`)을 주면
+가짜 Graph 서버 대신 그 녹화를 재생해 실제 메일 구성으로 측정합니다.
+
+반복마다 새 data_dir / 원격 폴더를 쓰므로 매 실행이 처음 받는 메일함과
+같습니다. 임시 작업 폴더는 끝나면 지웁니다 (`--keep` 이면 남기고 경로 출력). `--json` 으로 결과를 저장해 두고 다음 릴리스에서 `--baseline`
+으로 비교합니다.
+
+사용법
+-----
+$ python bench/bench_e2e.py
+$ python bench/bench_e2e.py --messages 500 --attach-kb 512 --repeat 5
+$ python bench/bench_e2e.py --throttle-every 20 --latency-ms 30
+$ python bench/bench_e2e.py --backend imap --latency-ms 30
+$ python bench/bench_e2e.py --replay c:/fund_mail/cassette/graph_20250102_101500.cassette.gz
+$ python bench/bench_e2e.py --json bench_0.2.0.json --baseline bench_0.1.0.json
+$ python bench/bench_e2e.py --messages 20 --repeat 1 --keep     # DB·로그 확인용
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+for p in (BENCH_DIR, SRC_DIR):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+MB = 1024 * 1024
+
+# 요약·비교에 쓰는 지표 — (키, 표시 이름, 클수록 좋은가)
+SUMMARY_KEYS = [
+    ("fetch_msg_per_s", "fetch msg/s", True),
+    ("fetch_mb_per_s", "fetch MB/s", True),
+    ("upload_mb_per_s", "upload MB/s", True),
+    ("total_s", "total s", False),
+    ("peak_rss_mb", "peak RSS MB", False),
+]
+
+
+def _peak_rss_mb() -> float | None:
+    """프로세스 최대 RSS(MB). 측정할 수 없으면 None."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / MB if sys.platform == "darwin" else peak / 1024   # macOS 는 바이트, Linux 는 KB
+    except ImportError:                                                 # Windows
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / MB
+    except ImportError:
+        return None
+
+
+def _git_describe() -> str | None:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _bench_config(work_dir: Path, graph, sftp, args):
+    from config import Config
+    if args.backend == "imap":
+        graph_args = dict(mail_backend="imap", imap_host="127.0.0.1", imap_port=graph.port,
+                          imap_ssl=False, imap_folders=("INBOX",))
+    elif args.replay:
+        graph_args = dict(graph_cassette=args.replay, graph_cassette_mode="replay")
+    else:
+        graph_args = dict(graph_base_url=graph.base_url)
+    return Config(
+        email_user_id="fund@bench.local", email_pw="", tenant_id="bench", client_id="bench",
+        client_secret="", data_dir=work_dir / "data", log_dir=work_dir / "logs",
+        sftp_host="127.0.0.1", sftp_port=sftp.port, sftp_id=sftp.username, sftp_pw=sftp.password,
+        sftp_base_dir=f"/{work_dir.name}", sftp_bundle=args.bundle, **graph_args,
+    )
+
+
+def run_once(cfg, day: str | None) -> dict:
+    """수집 + 업로드 1회 — 두 실행의 metrics 기록과 처리량."""
+    import metrics
+    from fetch_email import fetch_email_from_office365
+    from sftp_upload import upload_to_sftp
+
+    t0 = time.perf_counter()
+    db_path = fetch_email_from_office365(cfg, one_day=day)
+    t1 = time.perf_counter()
+    if db_path is None:
+        raise RuntimeError("수집된 메일이 없습니다 — 가짜 메일함 날짜(--day)나 녹화 파일을 확인하세요")
+    upload_to_sftp(cfg, db_path)
+    t2 = time.perf_counter()
+
+    fetch, upload = metrics.last_run("fetch"), metrics.last_run("upload")
+    fc, uc = fetch["counters"], upload["counters"]
+    fetch_s, upload_s = t1 - t0, t2 - t1
+    return {
+        "messages": fc.get("messages", 0),
+        "requests": fc.get("graph_requests", 0) + fc.get("imap_requests", 0),
+        "graph_requests": fc.get("graph_requests", 0),
+        "graph_retries": fc.get("graph_retries", 0),
+        "attach_mb": fc.get("attach_bytes", 0) / MB,
+        "upload_files": uc.get("upload_files", 0),
+        "upload_mb": uc.get("upload_bytes", 0) / MB,
+        "fetch_s": fetch_s,
+        "upload_s": upload_s,
+        "total_s": t2 - t0,
+        "fetch_msg_per_s": fc.get("messages", 0) / fetch_s,
+        "fetch_mb_per_s": fc.get("attach_bytes", 0) / MB / fetch_s,
+        "upload_mb_per_s": uc.get("upload_bytes", 0) / MB / upload_s if upload_s else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": {f"fetch.{k}": v for k, v in fetch["stages"].items()}
+                  | {f"upload.{k}": v for k, v in upload["stages"].items()},
+    }
+
+
+def summarize(runs: list[dict]) -> dict:
+    """반복 실행의 중앙값 (최대 RSS 는 최댓값)."""
+    summary = {}
+    for key, _, _ in SUMMARY_KEYS:
+        values = [r[key] for r in runs if r[key] is not None]
+        if values:
+            summary[key] = max(values) if key == "peak_rss_mb" else statistics.median(values)
+    stage_names = sorted({s for r in runs for s in r["stages"]})
+    summary["stages"] = {s: statistics.median(r["stages"].get(s, 0.0) for r in runs)
+                         for s in stage_names}
+    return summary
+
+
+def _print_runs(runs: list[dict]) -> None:
+    print(f"{'run':>3} {'msgs':>6} {'req':>6} {'retry':>5} {'attach MB':>9} {'fetch s':>8} "
+          f"{'upload s':>8} {'msg/s':>8} {'fetch MB/s':>10} {'up MB/s':>8} {'RSS MB':>7}")
+    for i, r in enumerate(runs, 1):
+        rss = f"{r['peak_rss_mb']:7.1f}" if r["peak_rss_mb"] is not None else f"{'-':>7}"
+        print(f"{i:>3} {r['messages']:>6} {r['requests']:>6} {r['graph_retries']:>5} "
+              f"{r['attach_mb']:>9.1f} {r['fetch_s']:>8.2f} {r['upload_s']:>8.2f} "
+              f"{r['fetch_msg_per_s']:>8.1f} {r['fetch_mb_per_s']:>10.1f} "
+              f"{r['upload_mb_per_s']:>8.1f} {rss}")
+
+
+def _print_summary(summary: dict, baseline: dict | None) -> None:
+    base = (baseline or {}).get("summary", {})
+    print(f"\n{'summary (median)':<22} {'value':>10} {'baseline':>10} {'change':>8}")
+    rows = [(key, label, better) for key, label, better in SUMMARY_KEYS if key in summary]
+    rows += [(s, s, False) for s in summary["stages"]]
+    for key, label, higher_better in rows:
+        value = summary["stages"][key] if key in summary["stages"] else summary[key]
+        old = base.get("stages", {}).get(key) if key in summary["stages"] else base.get(key)
+        line = f"{label:<22} {value:>10.3f}"
+        if old:
+            change = (value - old) / old * 100
+            worse = change < 0 if higher_better else change > 0
+            mark = " ⚠️" if worse and abs(change) >= 10 else ""
+            line += f" {old:>10.3f} {change:>+7.1f}%{mark}"
+        print(line)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="가짜 Graph/SFTP 서버로 수집→업로드 전체 처리량 측정")
+    parser.add_argument("--messages", type=int, default=200, help="메일 수 (기본 200, 1000 이하)")
+    parser.add_argument("--body-kb", type=int, default=8, help="본문 크기 KB (기본 8)")
+    parser.add_argument("--attachments", type=int, default=1, help="메일당 첨부 수 (기본 1)")
+    parser.add_argument("--attach-kb", type=int, default=128, help="첨부 1개 크기 KB (기본 128)")
+    parser.add_argument("--day", default="2025-01-02", help="메일 수신일(KST), one_day 수집 대상")
+    parser.add_argument("--throttle-every", type=int, default=0, help="N번째 Graph 요청마다 429 (0 = 끔)")
+    parser.add_argument("--retry-after", type=int, default=0, help="429 응답의 Retry-After 초 (기본 0)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Graph 응답마다 더할 지연(ms)")
+    parser.add_argument("--bundle", choices=("", "zip", "tar.zst"), default="",
+                        help="SFTP_BUNDLE 값 (기본: 파일별 업로드)")
+    parser.add_argument("--backend", choices=("graph", "imap"), default="graph",
+                        help="수집 백엔드 (MAIL_BACKEND, 기본 graph)")
+    parser.add_argument("--replay", type=Path, help="가짜 Graph 서버 대신 재생할 녹화 파일(.cassette.gz)")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 횟수 (기본 3)")
+    parser.add_argument("--json", type=Path, help="결과를 JSON 으로 저장")
+    parser.add_argument("--baseline", type=Path, help="이전 --json 결과와 비교")
+    parser.add_argument("--verbose", action="store_true", help="fund_mail INFO 로그 출력")
+    parser.add_argument("--keep", action="store_true", help="임시 작업 폴더를 지우지 않고 남김")
+    return parser.parse_args()
+
+
+def _remove_work_root(work_root: Path) -> None:
+    # atexit 역순 — 로거 writer 가 남은 기록을 쓴 뒤에 불리므로 로그 파일을 닫고 지운다
+    logging.shutdown()
+    shutil.rmtree(work_root, ignore_errors=True)
+
+
+def main() -> None:
+    args = _parse_args()
+    if not 0 < args.messages <= 1000:
+        sys.exit("--messages 는 1~1000 이어야 합니다 (one_day 수집은 한 페이지 $top=1000 만 읽음)")
+    work_root = Path(tempfile.mkdtemp(prefix="fund_mail_e2e_"))
+    if not args.keep:                  # 로거보다 먼저 등록 (예외로 끝나도 지움)
+        atexit.register(_remove_work_root, work_root)
+    os.environ["LOG_DIR"] = str(work_root / "logs")          # 로거가 임시 폴더에 쓰도록
+
+    import fetch_email
+    import graph_cassette
+    import imap_backend
+    from fake_graph_server import FakeGraphServer, MailboxSpec
+    from fake_imap_server import FakeImapServer
+    from fake_sftp_server import FakeSFTPServer
+
+    if not args.verbose:
+        logging.getLogger("fund_mail").setLevel(logging.WARNING)
+    # 토큰 발급(msal → login.microsoftonline.com)은 측정 대상이 아니다
+    fetch_email.get_graph_token = lambda config: "bench-token"
+    imap_backend.get_imap_token = lambda config: "bench-token"
+
+    spec = MailboxSpec(count=args.messages, day=args.day, body_kb=args.body_kb,
+                       attachments=args.attachments, attach_kb=args.attach_kb,
+                       throttle_every=args.throttle_every, throttle_retry_after=args.retry_after,
+                       latency_ms=args.latency_ms)
+    day = spec.day
+    if args.replay and args.backend == "imap":
+        sys.exit("--replay 는 Graph 녹화만 재생합니다 (--backend graph)")
+    if args.replay:
+        graph = None
+        day = graph_cassette.read_header(args.replay).get("one_day")
+        print(f"녹화 재생: {args.replay} (one_day={day}), bundle={args.bundle or '없음'}")
+    else:
+        graph = (FakeImapServer if args.backend == "imap" else FakeGraphServer)(spec).start()
+        print(f"[{args.backend}] 메일 {spec.count}건 × 첨부 {spec.attachments}개 × {spec.attach_kb} KB, "
+              f"본문 {spec.body_kb} KB, throttle={spec.throttle_every or '끔'}, "
+              f"latency={spec.latency_ms}ms, bundle={args.bundle or '없음'}")
+    sftp = FakeSFTPServer(work_root / "remote").start()
+    runs = []
+    try:
+        for i in range(max(1, args.repeat)):
+            run_dir = work_root / f"run{i + 1}"
+            (work_root / "remote" / run_dir.name).mkdir(parents=True, exist_ok=True)
+            runs.append(run_once(_bench_config(run_dir, graph, sftp, args), day))
+    finally:
+        if graph:
+            graph.stop()
+        sftp.stop()
+
+    _print_runs(runs)
+    summary = summarize(runs)
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline else None
+    _print_summary(summary, baseline)
+    if args.keep:
+        print(f"\n작업 폴더: {work_root}")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "version": _git_describe(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "summary": summary,
+            "runs": runs,
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
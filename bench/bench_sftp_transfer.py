@@ -0,0 +1,134 @@
+"""bench_sftp_transfer.py — SFTP 전송 설정별 처리량 측정
+========================================================
+`Config` 의 SFTP 튜닝 값(윈도·패킷·버퍼 크기, pipelining, prefetch,
+압축, cipher) 조합마다 업로드/읽기 MB/s 를 측정해 표로 출력합니다.
+
+기본은 로컬 paramiko SFTP 서버(`fake_sftp_server.py`)를 띄워 측정하고,
+`--target env` 를 주면 `.env` 의 실제 SFTP 서버에 `<SFTP_BASE_DIR>/_bench`
+폴더를 만들어 측정합니다(실제 회선에 맞는 프로파일을 고를 때 사용).
+
+사용법
+-----
+$ PYTHONPATH=src python bench/bench_sftp_transfer.py
+$ PYTHONPATH=src python bench/bench_sftp_transfer.py --files 20 --size-kb 512
+$ PYTHONPATH=src python bench/bench_sftp_transfer.py --target env
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+for p in (BENCH_DIR, SRC_DIR):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+from config import Config  # noqa: E402
+from sftp_connection import open_sftp, put_file, read_remote  # noqa: E402
+from sftp_upload import mkdir_p  # noqa: E402
+
+MB = 1024 * 1024
+
+# 비교할 프로파일 — Config 필드 덮어쓰기 값
+PROFILES: dict[str, dict] = {
+    "unpipelined": dict(sftp_pipelined=False, sftp_prefetch=False),   # 이 저장소의 put_file, 응답마다 대기
+    "pipelined": dict(),
+    "pipelined-buf256k": dict(sftp_buffer_size=256 * 1024),
+    "large-window": dict(sftp_window_size=16 * MB, sftp_buffer_size=256 * 1024),
+    "large-window-pkt": dict(sftp_window_size=16 * MB, sftp_max_packet_size=256 * 1024,
+                             sftp_buffer_size=256 * 1024),
+    "compress": dict(sftp_compress=True),
+    "aes128-ctr": dict(sftp_ciphers=("aes128-ctr",)),
+    "aes256-gcm": dict(sftp_ciphers=("aes256-gcm@openssh.com",)),
+}
+
+
+def _bench_config(host: str, port: int, user: str, pw: str, base_dir: str, data_dir: Path) -> Config:
+    return Config(
+        email_user_id="bench@localhost", email_pw="", tenant_id="", client_id="",
+        client_secret="", data_dir=data_dir, log_dir=data_dir / "logs",
+        sftp_host=host, sftp_port=port, sftp_id=user, sftp_pw=pw, sftp_base_dir=base_dir,
+    )
+
+
+def _make_files(work_dir: Path, count: int, size: int) -> list[Path]:
+    files = []
+    for i in range(count):
+        p = work_dir / f"bench_{i:03d}.bin"
+        p.write_bytes(os.urandom(size))   # 압축 안 되는 데이터 (PDF/XLSX 와 유사)
+        files.append(p)
+    return files
+
+
+def run_profile(cfg: Config, files: list[Path], remote_dir: str) -> tuple[float, float]:
+    """(업로드 MB/s, 읽기 MB/s) — 연결 수립 시간은 제외."""
+    transport, sftp = open_sftp(cfg)
+    try:
+        mkdir_p(sftp, remote_dir)
+        total = sum(f.stat().st_size for f in files)
+
+        t0 = time.perf_counter()
+        for f in files:
+            put_file(sftp, cfg, f, f"{remote_dir}/{f.name}")
+        up = total / MB / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        for f in files:
+            read_remote(sftp, cfg, f"{remote_dir}/{f.name}")
+        down = total / MB / (time.perf_counter() - t0)
+
+        for f in files:
+            sftp.remove(f"{remote_dir}/{f.name}")
+        return up, down
+    finally:
+        sftp.close()
+        transport.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SFTP 전송 설정별 MB/s 측정")
+    parser.add_argument("--target", choices=("local", "env"), default="local",
+                        help="local: 로컬 paramiko 서버, env: .env 의 실제 SFTP 서버")
+    parser.add_argument("--files", type=int, default=10, help="파일 개수 (기본 10)")
+    parser.add_argument("--size-kb", type=int, default=1024, help="파일당 크기 KB (기본 1024)")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES),
+                        help="측정할 프로파일 (여러 번 지정 가능, 기본 전체)")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="fund_mail_bench_"))
+    files = _make_files(work_dir, args.files, args.size_kb * 1024)
+
+    server = None
+    if args.target == "local":
+        from fake_sftp_server import FakeSFTPServer
+        server = FakeSFTPServer(work_dir / "remote").start()
+        base = _bench_config("127.0.0.1", server.port, server.username, server.password,
+                             "/bench", work_dir)
+    else:
+        env = Config.load()
+        base = dataclasses.replace(env, sftp_base_dir=f"{env.sftp_base_dir}/_bench")
+
+    print(f"대상: {args.target}  파일 {args.files}개 × {args.size_kb} KB")
+    print(f"{'profile':<20} {'upload MB/s':>12} {'read MB/s':>12}")
+    print("-" * 46)
+    try:
+        for name in args.profile or PROFILES:
+            cfg = dataclasses.replace(base, **PROFILES[name])
+            try:
+                up, down = run_profile(cfg, files, base.sftp_base_dir)
+                print(f"{name:<20} {up:>12.1f} {down:>12.1f}")
+            except Exception as e:  # cipher 미지원 등 — 다른 프로파일은 계속
+                print(f"{name:<20} {'실패':>12}  {e}")
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
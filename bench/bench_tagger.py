@@ -0,0 +1,101 @@
+"""bench_tagger.py — 메일 태그 매처 처리량 측정
+==============================================
+합성 키워드(펀드 코드·펀드명·거래상대방) N개와 합성 메일 본문으로
+`mail_tagger.MailTagger` (Aho-Corasick) 와 키워드마다 `in` 으로 찾는 방식의
+메일당 시간을 비교합니다. 키워드 수를 늘려도 Aho-Corasick 쪽 시간이 거의
+그대로인지(본문 길이에만 비례) 확인하는 용도입니다.
+
+사용법
+-----
+$ python bench/bench_tagger.py
+$ python bench/bench_tagger.py --keywords 500 2000 8000 --body-kb 32 --mails 200
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+for p in (BENCH_DIR, SRC_DIR):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+from mail_tagger import MailTagger, _normalize, html_to_text  # noqa: E402
+
+_SYLLABLES = "가나다라마바사아자차카타파하국민신한우리하나미래에셋삼성키움대신유진"
+_WORDS = ("채권", "주식", "혼합", "인덱스", "배당", "성장", "가치", "단기", "글로벌", "코리아")
+
+
+def _keywords(n: int, rnd: random.Random) -> list[tuple[str, str, str]]:
+    rows = []
+    for i in range(n):
+        kind = ("code", "fund", "counterparty")[i % 3]
+        if kind == "code":
+            word = f"K{rnd.randrange(10**9, 10**10)}"
+        elif kind == "fund":
+            word = "".join(rnd.choices(_SYLLABLES, k=3)) + rnd.choice(_WORDS) + f"{i}호"
+        else:
+            word = "".join(rnd.choices(_SYLLABLES, k=4)) + "증권"
+        rows.append((kind, word, word))
+    return rows
+
+
+def _body(kb: int, words: list[str], rnd: random.Random) -> str:
+    parts, size = [], 0
+    while size < kb * 1024:
+        piece = ("".join(rnd.choices(_SYLLABLES, k=rnd.randrange(2, 8))) if rnd.random() > 0.02
+                 else rnd.choice(words))
+        parts.append(piece)
+        size += len(piece.encode("utf-8")) + 1
+    return "<html><body><p>" + " ".join(parts) + "</p></body></html>"
+
+
+def _naive(keywords: list[tuple[str, str, str]], subject: str, content: str) -> int:
+    text = _normalize(subject + " " + html_to_text(content))
+    return sum(1 for _, _, word in keywords if _normalize(word) in text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="메일 태그 매처 처리량 측정")
+    parser.add_argument("--keywords", type=int, nargs="+", default=[200, 2000, 8000])
+    parser.add_argument("--mails", type=int, default=100)
+    parser.add_argument("--body-kb", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"메일 {args.mails}건 × 본문 {args.body_kb} KB")
+    print(f"{'keywords':>8} {'build ms':>9} {'AC ms/mail':>11} {'naive ms/mail':>14} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.keywords:
+            rnd = random.Random(args.seed)
+            keywords = _keywords(n, rnd)
+            mails = [(f"[안내] {rnd.choice(keywords)[2]} 기준가",
+                      _body(args.body_kb, [k[2] for k in keywords], rnd)) for _ in range(args.mails)]
+            path = Path(tmp) / f"kw_{n}.csv"
+            path.write_text("kind,tag,keyword\n" + "".join(f"{k},{t},{w}\n" for k, t, w in keywords),
+                            encoding="utf-8")
+
+            t0 = time.perf_counter()
+            tagger = MailTagger(path)
+            build = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            for subject, content in mails:
+                tagger.tag(subject, content)
+            ac = (time.perf_counter() - t0) / len(mails)
+
+            t0 = time.perf_counter()
+            for subject, content in mails:
+                _naive(keywords, subject, content)
+            naive = (time.perf_counter() - t0) / len(mails)
+            print(f"{n:>8} {build * 1000:>9.1f} {ac * 1000:>11.2f} {naive * 1000:>14.2f} "
+                  f"{naive / ac:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
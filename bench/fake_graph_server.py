@@ -0,0 +1,220 @@
+"""fake_graph_server.py — 벤치마크/로컬 검증용 Microsoft Graph 메일 API
+======================================================================
+합성 메일함 하나를 제공하는 최소 HTTP 서버입니다. 실제 테넌트 없이
+`fetch_email_from_office365` 의 처리량을 측정할 때 사용합니다.
+
+`fetch_email` 이 부르는 세 가지 요청만 흉내 냅니다::
+
+    GET /v1.0/users/{user}/messages                 ($filter ge/lt, $orderby, $top, $skip)
+    GET /v1.0/users/{user}/messages/{id}            (본문 — body.content)
+    GET /v1.0/users/{user}/messages/{id}/attachments (contentBytes 포함)
+
+• 메일 수·본문 크기·메일당 첨부 개수/크기를 정할 수 있고, 첨부 내용은
+  (메일, 순번)마다 다르지만 같은 시드면 항상 같습니다.
+• `throttle_every=N` 이면 N번째 요청마다 `429 + Retry-After` 를 돌려주고,
+  `latency_ms` 만큼 모든 응답을 늦춥니다.
+• 토큰은 확인하지 않습니다(Authorization 헤더만 있으면 됨).
+
+사용 예::
+
+    server = FakeGraphServer(MailboxSpec(count=200, attach_kb=256)).start()
+    ... Config(..., graph_base_url=server.base_url) ...
+    server.stop()
+"""
+from __future__ import annotations
+
+import base64
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlencode, urlsplit
+
+__all__ = ["MailboxSpec", "FakeGraphServer"]
+
+UTC = timezone.utc
+
+
+@dataclass(frozen=True)
+class MailboxSpec:
+    """합성 메일함 설정."""
+    count: int = 100                  # 메일 수
+    day: str = "2025-01-02"           # 메일이 도착한 날(KST) — 하루 동안 고르게 분포
+    body_kb: int = 8                  # HTML 본문 크기(KB)
+    attachments: int = 1              # 메일당 첨부 수
+    attach_kb: int = 128              # 첨부 1개 크기(KB)
+    seed: int = 42
+    throttle_every: int = 0           # N번째 요청마다 429, 0 = 끔
+    throttle_retry_after: int = 0     # 429 응답의 Retry-After(초)
+    latency_ms: float = 0.0           # 모든 응답에 더하는 지연(ms)
+
+
+class _Mailbox:
+    """id / 수신 시각이 정해진 합성 메일 목록 (최신순)."""
+
+    def __init__(self, spec: MailboxSpec):
+        self.spec = spec
+        start = datetime.strptime(spec.day, "%Y-%m-%d").replace(tzinfo=timezone(timedelta(hours=9)))
+        step = timedelta(days=1) / max(spec.count, 1)
+        self.messages = []
+        for i in range(spec.count):
+            received = (start + step * i + timedelta(seconds=1)).astimezone(UTC)
+            self.messages.append({
+                "id": f"msg-{i:06d}",
+                "subject": f"[bench] 펀드 메일 {i:06d}",
+                "receivedDateTime": received.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "hasAttachments": spec.attachments > 0,
+                "from": {"emailAddress": {"name": "Bench Sender", "address": "sender@bench.local"}},
+                "sender": {"emailAddress": {"name": "Bench Sender", "address": "sender@bench.local"}},
+                "toRecipients": [{"emailAddress": {"address": "fund@bench.local"}}],
+                "ccRecipients": [],
+                "parentFolderId": "inbox",
+            })
+        self.messages.reverse()                      # receivedDateTime desc
+        self.by_id = {m["id"]: m for m in self.messages}
+        self._body = ("<html><body><p>" + "펀드 기준가 안내 " * (spec.body_kb * 1024 // 24 + 1)
+                      + "</p></body></html>")[: spec.body_kb * 1024]
+
+    def body(self, message_id: str) -> str:
+        return f"<!-- {message_id} -->{self._body}"
+
+    def attachment(self, message_id: str, n: int) -> dict:
+        rnd = random.Random(f"{self.spec.seed}:{message_id}:{n}")
+        data = rnd.randbytes(self.spec.attach_kb * 1024)   # 압축 안 되는 데이터 (PDF/XLSX 와 유사)
+        return {
+            "@odata.type": "#microsoft.graph.fileAttachment",
+            "name": f"report_{message_id}_{n}.pdf",
+            "contentType": "application/pdf",
+            "size": len(data),
+            "isInline": False,
+            "contentBytes": base64.b64encode(data).decode("ascii"),
+        }
+
+    def query(self, params: dict[str, str]) -> list[dict]:
+        """`receivedDateTime ge X [and receivedDateTime lt Y]` 필터만 지원."""
+        items = self.messages
+        for clause in params.get("$filter", "").split(" and "):
+            parts = clause.split()
+            if len(parts) == 3 and parts[0] == "receivedDateTime":
+                op, value = parts[1], parts[2]
+                if op == "ge":
+                    items = [m for m in items if m["receivedDateTime"] >= value]
+                elif op == "lt":
+                    items = [m for m in items if m["receivedDateTime"] < value]
+        if params.get("$orderby", "").endswith(" asc"):
+            items = list(reversed(items))
+        return items
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"            # keep-alive — 실제 Graph 와 같이 연결 재사용
+    disable_nagle_algorithm = True           # 헤더/본문 따로 쓸 때 delayed-ACK 40ms 지연 방지
+
+    def log_message(self, format, *args):   # noqa: A002 — 요청 로그로 벤치 출력을 덮지 않음
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        server: FakeGraphServer = self.server.fake_graph
+        spec = server.spec
+        n = server.count_request()
+        if spec.latency_ms:
+            time.sleep(spec.latency_ms / 1000)
+        if spec.throttle_every and n % spec.throttle_every == 0:
+            server.throttled += 1
+            self._send_json(429, {"error": {"code": "TooManyRequests", "message": "throttled"}},
+                            {"Retry-After": str(spec.throttle_retry_after)})
+            return
+        if "Authorization" not in self.headers:
+            self._send_json(401, {"error": {"code": "InvalidAuthenticationToken"}})
+            return
+
+        split = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(split.query).items()}
+        parts = [unquote(p) for p in split.path.strip("/").split("/")]
+        # ["v1.0", "users", user, "messages", (id), ("attachments")]
+        if len(parts) < 4 or parts[1] != "users" or parts[3] != "messages":
+            self._send_json(404, {"error": {"code": "ResourceNotFound", "message": self.path}})
+            return
+        mailbox = server.mailbox
+        if len(parts) == 4:
+            self._list(params, split.path)
+            return
+        message = mailbox.by_id.get(parts[4])
+        if message is None:
+            self._send_json(404, {"error": {"code": "ErrorItemNotFound"}})
+        elif len(parts) == 5:
+            self._send_json(200, {"id": message["id"],
+                                  "body": {"contentType": "html", "content": mailbox.body(message["id"])}})
+        elif parts[5] == "attachments":
+            self._send_json(200, {"value": [mailbox.attachment(message["id"], i)
+                                            for i in range(spec.attachments)]})
+        else:
+            self._send_json(404, {"error": {"code": "ResourceNotFound", "message": self.path}})
+
+    def _list(self, params: dict[str, str], path: str) -> None:
+        server: FakeGraphServer = self.server.fake_graph
+        items = server.mailbox.query(params)
+        top = int(params.get("$top", 10))
+        skip = int(params.get("$skip", 0))
+        page = items[skip: skip + top]
+        select = [f.strip() for f in params.get("$select", "").split(",") if f.strip()]
+        if select:
+            page = [{k: m[k] for k in ("id", *select) if k in m} for m in page]
+        payload: dict = {"value": page}
+        if skip + top < len(items):
+            query = urlencode({**params, "$skip": skip + top})
+            payload["@odata.nextLink"] = f"{server.base_url.rsplit('/v1.0', 1)[0]}{path}?{query}"
+        self._send_json(200, payload)
+
+
+class FakeGraphServer:
+    """`MailboxSpec` 메일함을 제공하는 로컬 Graph 서버 (127.0.0.1, 임의 포트)."""
+
+    def __init__(self, spec: MailboxSpec | None = None, port: int = 0):
+        self.spec = spec or MailboxSpec()
+        self.mailbox = _Mailbox(self.spec)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake_graph = self
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.requests = 0
+        self.throttled = 0
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        """`Config.graph_base_url` 에 넣을 주소."""
+        return f"http://127.0.0.1:{self.port}/v1.0"
+
+    def count_request(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    def start(self) -> "FakeGraphServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=2)
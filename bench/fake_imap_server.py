@@ -0,0 +1,305 @@
+"""fake_imap_server.py — 벤치마크/로컬 검증용 IMAP 서버
+=====================================================
+`MailboxSpec` 합성 메일함을 IMAP4rev1 로 제공하는 최소 서버입니다.
+실제 Exchange 없이 `imap_backend` 의 동작·처리량·IDLE 지연을 측정할 때
+사용합니다. 메일 내용은 `fake_graph_server` 와 같은 규칙(메일 수, 본문
+크기, 첨부 개수·크기, 시드)으로 만듭니다.
+
+`imap_backend` 가 쓰는 명령만 흉내 냅니다::
+
+    CAPABILITY, AUTHENTICATE XOAUTH2 (토큰은 확인하지 않음), LOGIN,
+    SELECT / EXAMINE, UID SEARCH (ALL, UID n:m, SINCE, BEFORE),
+    UID FETCH (UID, INTERNALDATE, RFC822.SIZE, BODY[] / BODY.PEEK[]),
+    IDLE / DONE, NOOP, LOGOUT
+
+• 폴더는 `INBOX` 와 빈 `Sent Items` 두 개입니다.
+• `deliver(n)` 으로 INBOX 에 새 메일을 추가하면 IDLE 중인 연결에
+  `* <n> EXISTS` 를 바로 보냅니다.
+• `latency_ms` 만큼 모든 명령 응답을 늦춥니다.
+
+사용 예::
+
+    server = FakeImapServer(MailboxSpec(count=200, attach_kb=256)).start()
+    ... Config(mail_backend="imap", imap_host="127.0.0.1", imap_port=server.port,
+               imap_ssl=False, ...) ...
+    server.stop()
+"""
+from __future__ import annotations
+
+import random
+import select
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import format_datetime
+
+from fake_graph_server import MailboxSpec
+
+__all__ = ["MailboxSpec", "FakeImapServer"]
+
+KST = timezone(timedelta(hours=9))
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+_UIDVALIDITY = 1700000001
+
+
+def _imap_date(value: str) -> datetime:
+    """`02-Jan-2025` → 그날 00:00 (UTC, 서버 시간대)."""
+    day, mon, year = value.strip('"').split("-")
+    return datetime(int(year), _MONTHS.index(mon.title()) + 1, int(day), tzinfo=timezone.utc)
+
+
+def _internaldate(ts: datetime) -> str:
+    return f'"{ts.day:02d}-{_MONTHS[ts.month - 1]}-{ts.year} {ts:%H:%M:%S %z}"'
+
+
+class _Message:
+    __slots__ = ("uid", "received", "raw")
+
+    def __init__(self, uid: int, received: datetime, raw: bytes):
+        self.uid = uid
+        self.received = received
+        self.raw = raw
+
+
+class _Folder:
+    def __init__(self):
+        self.messages: list[_Message] = []
+        self.uidnext = 1
+
+
+def _build_message(spec: MailboxSpec, n: int, received: datetime, body: str) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = "Bench Sender <sender@bench.local>"
+    msg["To"] = "fund@bench.local"
+    msg["Subject"] = f"[bench] 펀드 메일 {n:06d}"
+    msg["Date"] = format_datetime(received)
+    msg["Message-ID"] = f"<bench-{n:06d}@bench.local>"
+    msg.set_content("펀드 기준가 안내")
+    msg.add_alternative(f"<!-- msg-{n:06d} -->{body}", subtype="html")
+    for i in range(spec.attachments):
+        data = random.Random(f"{spec.seed}:msg-{n:06d}:{i}").randbytes(spec.attach_kb * 1024)
+        msg.add_attachment(data, maintype="application", subtype="pdf",
+                           filename=f"report_msg-{n:06d}_{i}.pdf")
+    return msg.as_bytes().replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True           # 응답을 여러 번 나눠 쓸 때 delayed-ACK 지연 방지
+
+    def setup(self):
+        super().setup()
+        self.folder: _Folder | None = None
+
+    def send(self, line: str | bytes) -> None:
+        self.wfile.write((line.encode("utf-8") if isinstance(line, str) else line) + b"\r\n")
+
+    def handle(self) -> None:
+        server: FakeImapServer = self.server.fake_imap
+        self.send("* OK [CAPABILITY IMAP4rev1 AUTH=XOAUTH2 IDLE UIDPLUS] fake IMAP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            parts = line.decode("utf-8").rstrip("\r\n").split(" ", 2)
+            if len(parts) < 2:
+                self.send("* BAD 명령 형식")
+                continue
+            tag, command, args = parts[0], parts[1].upper(), parts[2] if len(parts) > 2 else ""
+            server.count_request()
+            if server.spec.latency_ms:
+                time.sleep(server.spec.latency_ms / 1000)
+            if command == "LOGOUT":
+                self.send("* BYE")
+                self.send(f"{tag} OK LOGOUT completed")
+                return
+            handler = getattr(self, f"cmd_{command.lower()}", None)
+            if handler is None:
+                self.send(f"{tag} BAD unknown command {command}")
+                continue
+            handler(tag, args)
+            self.wfile.flush()
+
+    # ─────────────────────────── 명령 ───────────────────────────
+
+    def cmd_capability(self, tag: str, args: str) -> None:
+        self.send("* CAPABILITY IMAP4rev1 AUTH=XOAUTH2 IDLE UIDPLUS")
+        self.send(f"{tag} OK CAPABILITY completed")
+
+    def cmd_noop(self, tag: str, args: str) -> None:
+        self.send(f"{tag} OK NOOP completed")
+
+    def cmd_login(self, tag: str, args: str) -> None:
+        self.send(f"{tag} OK LOGIN completed")
+
+    def cmd_authenticate(self, tag: str, args: str) -> None:
+        self.send("+ ")
+        self.wfile.flush()
+        self.rfile.readline()                # base64 XOAUTH2 문자열 — 확인하지 않음
+        self.send(f"{tag} OK AUTHENTICATE completed")
+
+    def cmd_select(self, tag: str, args: str, readonly: bool = False) -> None:
+        server: FakeImapServer = self.server.fake_imap
+        name = args.strip().strip('"')
+        folder = server.folders.get(name) or server.folders.get(name.upper())
+        if folder is None:
+            self.send(f"{tag} NO [NONEXISTENT] 폴더 없음: {name}")
+            return
+        self.folder = folder
+        with server.lock:
+            exists, uidnext = len(folder.messages), folder.uidnext
+        self.send(r"* FLAGS (\Seen \Answered \Flagged \Deleted \Draft)")
+        self.send(f"* {exists} EXISTS")
+        self.send("* 0 RECENT")
+        self.send(f"* OK [UIDVALIDITY {_UIDVALIDITY}] UIDs valid")
+        self.send(f"* OK [UIDNEXT {uidnext}] Predicted next UID")
+        self.send(f"{tag} OK [{'READ-ONLY' if readonly else 'READ-WRITE'}] SELECT completed")
+
+    def cmd_examine(self, tag: str, args: str) -> None:
+        self.cmd_select(tag, args, readonly=True)
+
+    def cmd_uid(self, tag: str, args: str) -> None:
+        sub, _, rest = args.partition(" ")
+        if self.folder is None:
+            self.send(f"{tag} BAD 폴더를 먼저 선택하세요")
+        elif sub.upper() == "SEARCH":
+            self._search(tag, rest)
+        elif sub.upper() == "FETCH":
+            self._fetch(tag, rest)
+        else:
+            self.send(f"{tag} BAD unsupported UID {sub}")
+
+    def cmd_idle(self, tag: str, args: str) -> None:
+        server: FakeImapServer = self.server.fake_imap
+        folder = self.folder
+        with server.lock:
+            seen = len(folder.messages) if folder else 0
+        self.send("+ idling")
+        self.wfile.flush()
+        while True:
+            if folder is not None:
+                with server.lock:
+                    exists = len(folder.messages)
+                if exists != seen:
+                    seen = exists
+                    self.send(f"* {exists} EXISTS")
+                    self.wfile.flush()
+            readable, _, _ = select.select([self.connection], [], [], 0.02)
+            if readable:
+                self.rfile.readline()        # DONE (또는 연결 종료)
+                break
+        self.send(f"{tag} OK IDLE terminated")
+
+    # ─────────────────────────── SEARCH / FETCH ───────────────────────────
+
+    def _uids(self, uid_set: str, messages: list[_Message]) -> list[_Message]:
+        top = messages[-1].uid if messages else 0
+        wanted: list[tuple[int, int]] = []
+        for item in uid_set.split(","):
+            lo, _, hi = item.partition(":")
+            a = top if lo == "*" else int(lo)
+            b = a if not hi else (top if hi == "*" else int(hi))
+            wanted.append((min(a, b), max(a, b)))
+        return [m for m in messages if any(a <= m.uid <= b for a, b in wanted)]
+
+    def _search(self, tag: str, criteria: str) -> None:
+        server: FakeImapServer = self.server.fake_imap
+        with server.lock:
+            result = list(self.folder.messages)
+        tokens = criteria.split()
+        i = 0
+        while i < len(tokens):
+            key = tokens[i].upper()
+            if key == "ALL":
+                i += 1
+            elif key == "UID":
+                result = self._uids(tokens[i + 1], result)
+                i += 2
+            elif key in ("SINCE", "BEFORE"):
+                day = _imap_date(tokens[i + 1])
+                result = [m for m in result if (m.received >= day if key == "SINCE" else m.received < day)]
+                i += 2
+            else:
+                self.send(f"{tag} BAD unsupported SEARCH key {key}")
+                return
+        self.send("* SEARCH" + "".join(f" {m.uid}" for m in result))
+        self.send(f"{tag} OK SEARCH completed")
+
+    def _fetch(self, tag: str, rest: str) -> None:
+        server: FakeImapServer = self.server.fake_imap
+        uid_set, _, items = rest.partition(" ")
+        items = items.strip("()").upper().split()
+        with server.lock:
+            messages = list(self.folder.messages)
+        seqs = {m.uid: n for n, m in enumerate(messages, 1)}
+        for m in self._uids(uid_set, messages):
+            out = [f"UID {m.uid}".encode()]
+            for item in items:
+                if item == "INTERNALDATE":
+                    out.append(f"INTERNALDATE {_internaldate(m.received)}".encode())
+                elif item == "RFC822.SIZE":
+                    out.append(f"RFC822.SIZE {len(m.raw)}".encode())
+                elif item in ("BODY[]", "BODY.PEEK[]", "RFC822"):
+                    name = "RFC822" if item == "RFC822" else "BODY[]"
+                    out.append(f"{name} {{{len(m.raw)}}}\r\n".encode() + m.raw)
+            self.wfile.write(f"* {seqs[m.uid]} FETCH (".encode() + b" ".join(out) + b")\r\n")
+        self.send(f"{tag} OK FETCH completed")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeImapServer:
+    """`MailboxSpec` 메일함을 제공하는 로컬 IMAP 서버 (127.0.0.1, 임의 포트, 평문)."""
+
+    def __init__(self, spec: MailboxSpec | None = None, port: int = 0):
+        self.spec = spec or MailboxSpec()
+        self.lock = threading.Lock()
+        self.folders = {"INBOX": _Folder(), "Sent Items": _Folder()}
+        self._body = ("<html><body><p>" + "펀드 기준가 안내 " * (self.spec.body_kb * 1024 // 24 + 1)
+                      + "</p></body></html>")[: self.spec.body_kb * 1024]
+        self._count = 0
+        start = datetime.strptime(self.spec.day, "%Y-%m-%d").replace(tzinfo=KST)
+        step = timedelta(days=1) / max(self.spec.count, 1)
+        for i in range(self.spec.count):
+            self._append(start + step * i + timedelta(seconds=1))
+        self._httpd = _Server(("127.0.0.1", port), _Handler)
+        self._httpd.fake_imap = self
+        self._thread: threading.Thread | None = None
+        self.requests = 0
+
+    def _append(self, received: datetime) -> None:
+        folder = self.folders["INBOX"]
+        raw = _build_message(self.spec, self._count, received.astimezone(timezone.utc), self._body)
+        with self.lock:
+            folder.messages.append(_Message(folder.uidnext, received.astimezone(timezone.utc), raw))
+            folder.uidnext += 1
+            self._count += 1
+
+    def deliver(self, n: int = 1) -> None:
+        """INBOX 에 지금 시각으로 새 메일 `n` 건 추가 (IDLE 중인 연결에 알림)."""
+        for _ in range(n):
+            self._append(datetime.now(timezone.utc))
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def count_request(self) -> int:
+        with self.lock:
+            self.requests += 1
+            return self.requests
+
+    def start(self) -> "FakeImapServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=2)
@@ -0,0 +1,189 @@
+"""fake_sftp_server.py — 벤치마크/로컬 검증용 paramiko SFTP 서버
+===============================================================
+로컬 디렉터리 하나를 루트로 삼는 최소 SFTP 서버입니다. 실제 SSH 서버
+없이 `upload_to_sftp` 의 동작과 처리량을 측정할 때 사용합니다.
+
+사용 예::
+
+    server = FakeSFTPServer(root_dir, username="u", password="p")
+    server.start()                       # 백그라운드 스레드
+    ... Config(sftp_host="127.0.0.1", sftp_port=server.port, ...) ...
+    server.stop()
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+from pathlib import Path
+
+import paramiko
+from paramiko import SFTPAttributes, SFTPHandle, SFTPServer, SFTPServerInterface
+from paramiko.sftp import SFTP_NO_SUCH_FILE, SFTP_OK
+
+__all__ = ["FakeSFTPServer"]
+
+# 클라이언트 종료 시 서버 쪽 "Connection reset" 로그가 벤치 출력에 섞이지 않게
+logging.getLogger("paramiko.transport").setLevel(logging.CRITICAL)
+
+
+class _Server(paramiko.ServerInterface):
+    def __init__(self, username: str, password: str):
+        self.username = username
+        self.password = password
+
+    def check_auth_password(self, username, password):
+        if username == self.username and password == self.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+
+class _Handle(SFTPHandle):
+    def stat(self):
+        try:
+            return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def chattr(self, attr):
+        return SFTP_OK
+
+
+class _SFTPInterface(SFTPServerInterface):
+    ROOT: Path = Path(".")
+
+    def _real(self, path: str) -> str:
+        return str(self.ROOT / self.canonicalize(path).lstrip("/"))
+
+    def list_folder(self, path):
+        real = self._real(path)
+        try:
+            out = []
+            for name in os.listdir(real):
+                attr = SFTPAttributes.from_stat(os.stat(os.path.join(real, name)))
+                attr.filename = name
+                out.append(attr)
+            return out
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(self._real(path)))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        real = self._real(path)
+        try:
+            binary_flag = getattr(os, "O_BINARY", 0)
+            fd = os.open(real, flags | binary_flag, 0o644)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        if flags & os.O_CREAT and attr is not None:
+            attr._flags &= ~attr.FLAG_PERMISSIONS
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        try:
+            f = os.fdopen(fd, mode)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        handle = _Handle(flags)
+        handle.filename = real
+        handle.readfile = f
+        handle.writefile = f
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(self._real(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def rename(self, oldpath, newpath):
+        try:
+            os.rename(self._real(oldpath), self._real(newpath))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    posix_rename = rename
+
+    def mkdir(self, path, attr):
+        try:
+            os.mkdir(self._real(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def rmdir(self, path):
+        try:
+            os.rmdir(self._real(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def chattr(self, path, attr):
+        return SFTP_OK if os.path.exists(self._real(path)) else SFTP_NO_SUCH_FILE
+
+
+class FakeSFTPServer:
+    """`root_dir` 를 `/` 로 노출하는 로컬 SFTP 서버 (127.0.0.1, 임의 포트)."""
+
+    def __init__(self, root_dir: str | Path, username: str = "bench",
+                 password: str = "bench", port: int = 0):
+        self.root_dir = Path(root_dir).resolve()
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self.username = username
+        self.password = password
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", port))
+        self._sock.listen(8)
+        self.port = self._sock.getsockname()[1]
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._transports: list[paramiko.Transport] = []
+
+    def _serve(self) -> None:
+        iface = type("_Iface", (_SFTPInterface,), {"ROOT": self.root_dir})
+        self._sock.settimeout(0.5)
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except (socket.timeout, OSError):
+                continue
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)   # OpenSSH 와 같이
+            t = paramiko.Transport(conn)
+            t.add_server_key(self.host_key)
+            t.set_subsystem_handler("sftp", SFTPServer, iface)
+            t.start_server(server=_Server(self.username, self.password))
+            self._transports.append(t)
+
+    def start(self) -> "FakeSFTPServer":
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        for t in self._transports:
+            t.close()
+        self._sock.close()
+        if self._thread:
+            self._thread.join(timeout=2)
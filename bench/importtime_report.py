@@ -0,0 +1,105 @@
+"""importtime_report.py — 진입점 import 시간 회귀 측정
+======================================================
+작업 스케줄러가 몇 분마다 새로 띄우는 `main_once` 는 시작 비용이 곧
+실행 비용입니다. `python -X importtime` 으로 진입점 모듈을 import 해서
+
+• 전체 import 시간(여러 번 실행해 최솟값)
+• 누적 시간이 큰 모듈 상위 N 개
+• import 되면 안 되는 모듈(기본: paramiko, msal, 업로드 모듈) 검사
+
+를 출력하고, 금지 모듈이 보이거나 `--budget-ms` 를 넘으면 종료 코드 1 을
+돌려줍니다. 빈 메일함 실행은 업로드·SFTP 코드를 건드리지 않아야 합니다.
+
+사용법
+-----
+$ python bench/importtime_report.py
+$ python bench/importtime_report.py --module main_once --top 15 --budget-ms 250
+$ python bench/importtime_report.py --module main --forbid ""   # 서비스는 paramiko 사용
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+
+DEFAULT_FORBID = "paramiko,msal,sftp_upload,sftp_connection,bundle_upload,zstandard"
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+def measure(module: str) -> list[tuple[int, int, int, str]]:
+    """(self_us, cumulative_us, depth, name) 목록 — import 순서대로."""
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=SRC_DIR, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} 실패:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((int(m[1]), int(m[2]), (len(m[3]) - 1) // 2, m[4]))
+    return rows
+
+
+def _children(rows: list[tuple[int, int, int, str]], module: str) -> list[tuple[int, int, int, str]]:
+    """`module` 이 직접 import 한 모듈 (importtime 은 자식을 부모보다 먼저 출력)."""
+    pending: list[tuple[int, int, int, str]] = []
+    for row in rows:
+        if row[2] == 0:
+            if row[3] == module:
+                return [r for r in pending if r[2] == 1]
+            pending = []
+        else:
+            pending.append(row)
+    return []
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="진입점 import 시간 측정 / 회귀 검사")
+    parser.add_argument("--module", default="main_once", help="측정할 진입점 모듈 (기본: main_once)")
+    parser.add_argument("--repeat", type=int, default=5, help="반복 횟수 — 최솟값 사용 (기본 5)")
+    parser.add_argument("--top", type=int, default=10, help="출력할 상위 모듈 수")
+    parser.add_argument("--forbid", default=DEFAULT_FORBID,
+                        help=f"import 되면 실패로 볼 모듈 (쉼표 구분, 기본: {DEFAULT_FORBID})")
+    parser.add_argument("--budget-ms", type=float, default=0, help="전체 import 시간 상한(ms), 0 = 검사 안 함")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    runs = [measure(args.module) for _ in range(max(1, args.repeat))]
+    totals = [next(r[1] for r in rows if r[3] == args.module and r[2] == 0) for rows in runs]
+    best = runs[totals.index(min(totals))]
+
+    print(f"# {args.module}: import {min(totals) / 1000:.1f} ms "
+          f"(min of {len(runs)}, max {max(totals) / 1000:.1f} ms), 모듈 {len(best)}개")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    # 진입점 바로 아래 모듈을 누적 시간이 큰 순서로
+    direct = sorted(_children(best, args.module), key=lambda r: r[1], reverse=True)
+    for self_us, cum_us, _, name in direct[:args.top]:
+        print(f"{cum_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+    failed = False
+    forbid = {m.strip() for m in args.forbid.split(",") if m.strip()}
+    loaded = {r[3] for r in best}
+    hit = sorted(m for m in forbid if m in loaded or any(n.startswith(m + ".") for n in loaded))
+    if hit:
+        print(f"❌ import 되면 안 되는 모듈: {', '.join(hit)}")
+        failed = True
+    if args.budget_ms and min(totals) / 1000 > args.budget_ms:
+        print(f"❌ import 시간 {min(totals) / 1000:.1f} ms > 상한 {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("✅ OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,676 @@
+"""attach_extract.py — 첨부파일 본문 추출과 검색 색인
+=====================================================
+펀드 공지는 PDF·XLSX·HWP 첨부로 오는데 수집은 파일을 그대로 저장만 하므로
+"X 펀드 기준가 보고서" 를 찾으려면 파일을 하나씩 열어 봐야 합니다. 이
+모듈은 저장된 첨부에서 글자를 뽑아 `data_dir/attach_text.db` 에 전문 검색
+(FTS5) 색인으로 남깁니다.
+
+• 수집이 끝난 DB 를 `extract_queue` 에 넣으면 `AttachTextExtractor`
+  스레드가 꺼내 처리합니다. 수집 스레드는 기다리지 않습니다.
+• 추출은 `ProcessPoolExecutor`(spawn, `ATTACH_EXTRACT_WORKERS` 개)의 낮은
+  우선순위 프로세스에서 합니다. 처리할 파일이 있을 때만 만들고 끝나면
+  닫습니다.
+• 결과는 첨부 sha256 으로 `attach_text` 에 캐시합니다. 같은 내용의 첨부
+  (매일 오는 같은 약관, 같은 보고서의 재전송)는 다시 추출하지 않습니다.
+• `attach_ref` 가 수집 DB 의 `fund_mail_attach` 줄(db_path + id)과 sha256 을
+  이어 주므로 검색 결과에서 메일 제목·수신 시각·원래 파일명을 바로 봅니다.
+
+지원 형식
+--------
+• xlsx/xlsm, docx, pptx, hwpx : 표준 라이브러리(zipfile + XML)
+• hwp (5.0)                    : `olefile` 패키지가 있을 때 (BodyText 문단)
+• pdf                          : `pypdf` 패키지가 있을 때
+• txt/csv                      : UTF-8, 안 되면 CP949
+
+추출기가 없는 형식은 `no_extractor` 로 남기고 패키지를 설치한 뒤 다음에
+같은 파일이 들어오거나 `index` 를 다시 돌리면 추출합니다.
+`ATTACH_EXTRACT_MAX_MB` 보다 큰 파일은 `too_large` 로 건너뜁니다.
+
+사용법
+-----
+$ python attach_extract.py search 기준가            # 3글자 이상은 FTS, 짧으면 LIKE
+$ python attach_extract.py search "KB 스타 채권" --limit 50
+$ python attach_extract.py index                   # 대기열 처리 (단발성 실행용)
+$ python attach_extract.py index --all             # DATA_DIR 의 모든 fm_*.db 색인
+$ python attach_extract.py stats
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import BrokenExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from xml.etree import ElementTree
+
+from exceptions import DBQueryError, DBWriteError
+from logger import get_logger
+import metrics
+
+__all__ = ["AttachTextIndex", "AttachTextExtractor", "drain_extract", "extract_text"]
+
+logger = get_logger()
+
+STATUS_OK = "ok"
+STATUS_EMPTY = "empty"                   # 추출은 됐지만 글자가 없음 (스캔 PDF 등)
+STATUS_UNSUPPORTED = "unsupported"       # 추출할 수 없는 형식
+STATUS_NO_EXTRACTOR = "no_extractor"     # 선택 패키지가 없음 — 설치 후 다시 추출
+STATUS_TOO_LARGE = "too_large"
+STATUS_MISSING = "missing"               # 로컬 파일이 없음 (다음에 다시 확인)
+STATUS_ERROR = "error"                   # 손상된 파일 등
+
+_RETRY_STATUSES = (STATUS_NO_EXTRACTOR, STATUS_MISSING)
+_MAX_CHARS = 1_000_000                   # 파일 1개에서 색인할 최대 글자 수
+_IDLE_WAIT = 300.0                       # 알림이 없을 때 대기열을 다시 확인하는 간격(초)
+
+# 확장자 → (추출기 이름, 필요한 선택 패키지)
+_EXTRACTORS: dict[str, tuple[str, str | None]] = {
+    ".xlsx": ("xlsx", None), ".xlsm": ("xlsx", None),
+    ".docx": ("docx", None), ".pptx": ("pptx", None), ".hwpx": ("hwpx", None),
+    ".hwp": ("hwp", "olefile"), ".pdf": ("pdf", "pypdf"),
+    ".txt": ("text", None), ".csv": ("text", None),
+}
+
+
+# ─────────────────────────────── 추출기 ─────────────────────────────────
+# 작업 프로세스에서 실행된다 — 모듈 최상위 함수만 사용.
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _xml_texts(data: bytes, text_tag: str, break_tag: str) -> list[str]:
+    """`text_tag` 요소의 글자를 모으고 `break_tag` 가 끝날 때마다 줄을 나눈다."""
+    lines: list[str] = []
+    line: list[str] = []
+    for event, elem in ElementTree.iterparse(io.BytesIO(data), events=("end",)):
+        name = _local(elem.tag)
+        if name == text_tag and elem.text:
+            line.append(elem.text)
+        elif name == break_tag:
+            if line:
+                lines.append("".join(line))
+                line = []
+            elem.clear()
+    if line:
+        lines.append("".join(line))
+    return lines
+
+
+def _sorted_members(zf: zipfile.ZipFile, prefix: str) -> list[str]:
+    def key(name: str) -> tuple[int, str]:
+        m = re.search(r"(\d+)\.xml$", name)
+        return (int(m.group(1)) if m else 0, name)
+    return sorted((n for n in zf.namelist() if n.startswith(prefix) and n.endswith(".xml")), key=key)
+
+
+def _extract_xlsx(path: str) -> str:
+    with zipfile.ZipFile(path) as zf:
+        shared: list[str] = []
+        if "xl/sharedStrings.xml" in zf.namelist():
+            shared = _xml_texts(zf.read("xl/sharedStrings.xml"), "t", "si")
+        out: list[str] = []
+        for member in _sorted_members(zf, "xl/worksheets/sheet"):
+            for _, row in ElementTree.iterparse(io.BytesIO(zf.read(member)), events=("end",)):
+                if _local(row.tag) != "row":
+                    continue
+                cells = []
+                for c in row:
+                    kind = c.get("t")
+                    if kind == "inlineStr":
+                        cells.append("".join(t.text or "" for t in c.iter() if _local(t.tag) == "t"))
+                        continue
+                    v = next((x.text for x in c if _local(x.tag) == "v"), None)
+                    if v is None:
+                        continue
+                    if kind == "s":
+                        idx = int(v)
+                        cells.append(shared[idx] if idx < len(shared) else "")
+                    else:
+                        cells.append(v)
+                if cells:
+                    out.append("\t".join(cells))
+                row.clear()
+        return "\n".join(out)
+
+
+def _extract_docx(path: str) -> str:
+    with zipfile.ZipFile(path) as zf:
+        return "\n".join(_xml_texts(zf.read("word/document.xml"), "t", "p"))
+
+
+def _extract_pptx(path: str) -> str:
+    with zipfile.ZipFile(path) as zf:
+        return "\n".join(line for m in _sorted_members(zf, "ppt/slides/slide")
+                         for line in _xml_texts(zf.read(m), "t", "p"))
+
+
+def _extract_hwpx(path: str) -> str:
+    with zipfile.ZipFile(path) as zf:
+        return "\n".join(line for m in _sorted_members(zf, "Contents/section")
+                         for line in _xml_texts(zf.read(m), "t", "p"))
+
+
+_HWPTAG_PARA_TEXT = 67
+# HWP 5.0 문단 글자 중 제어 문자: 1 WCHAR 짜리(char control) 외에는 8 WCHAR(16바이트)를 차지
+_HWP_CHAR_CONTROLS = {0, 10, 13} | set(range(24, 32))
+
+
+def _hwp_para_text(payload: bytes) -> str:
+    chars: list[str] = []
+    i, n = 0, len(payload) - 1
+    while i < n:
+        code = payload[i] | (payload[i + 1] << 8)
+        if code >= 32:
+            chars.append(chr(code))
+            i += 2
+        elif code in _HWP_CHAR_CONTROLS:
+            if code in (10, 13):
+                chars.append("\n")
+            i += 2
+        else:
+            if code == 9:
+                chars.append("\t")
+            i += 16
+    return "".join(chars)
+
+
+def _extract_hwp(path: str) -> str:
+    import olefile
+
+    with olefile.OleFileIO(path) as ole:
+        header = ole.openstream("FileHeader").read()
+        flags = header[36] if len(header) > 36 else 1      # bit0 = 압축, bit1 = 암호
+        if flags & 2:
+            raise ValueError("암호가 걸린 HWP")
+        compressed = bool(flags & 1)
+        sections = sorted((e for e in ole.listdir() if len(e) == 2 and e[0] == "BodyText"),
+                          key=lambda e: int(re.sub(r"\D", "", e[1]) or 0))
+        out: list[str] = []
+        for entry in sections:
+            data = ole.openstream(entry).read()
+            if compressed:
+                data = zlib.decompress(data, -15)
+            pos = 0
+            while pos + 4 <= len(data):
+                head = int.from_bytes(data[pos:pos + 4], "little")
+                tag, size = head & 0x3FF, (head >> 20) & 0xFFF
+                pos += 4
+                if size == 0xFFF:
+                    size = int.from_bytes(data[pos:pos + 4], "little")
+                    pos += 4
+                if tag == _HWPTAG_PARA_TEXT:
+                    out.append(_hwp_para_text(data[pos:pos + size]).rstrip("\n"))
+                pos += size
+        return "\n".join(out)
+
+
+def _extract_pdf(path: str) -> str:
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def _extract_text_file(path: str) -> str:
+    data = Path(path).read_bytes()
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp949", errors="replace")
+
+
+_FUNCS = {"xlsx": _extract_xlsx, "docx": _extract_docx, "pptx": _extract_pptx,
+          "hwpx": _extract_hwpx, "hwp": _extract_hwp, "pdf": _extract_pdf, "text": _extract_text_file}
+
+
+def extract_text(path: str | Path, max_chars: int = _MAX_CHARS) -> tuple[str, str | None, str, str | None]:
+    """파일 1개에서 글자 추출 → (상태, 추출기, 글자, 오류)."""
+    name, _ = _EXTRACTORS.get(Path(path).suffix.lower(), (None, None))
+    if name is None:
+        return STATUS_UNSUPPORTED, None, "", None
+    try:
+        text = _FUNCS[name](str(path))
+    except ImportError as e:
+        return STATUS_NO_EXTRACTOR, name, "", str(e)
+    except Exception as e:  # noqa: BLE001 — 손상된 파일은 결과로 남기고 계속
+        return STATUS_ERROR, name, "", f"{type(e).__name__}: {e}"[:500]
+    text = re.sub(r"[ \t\r\f\v]+\n", "\n", text).strip()[:max_chars]
+    return (STATUS_OK if text else STATUS_EMPTY), name, text, None
+
+
+def _init_worker() -> None:
+    # 수집·업로드보다 CPU 를 양보한다
+    logging.getLogger("fund_mail").setLevel(logging.WARNING)
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), 0x4000)   # BELOW_NORMAL
+        else:
+            os.nice(10)
+    except (OSError, AttributeError):
+        pass
+
+
+def _available(name: str | None, package: str | None) -> bool:
+    return name is not None and (package is None or importlib.util.find_spec(package) is not None)
+
+
+# ─────────────────────────────── 색인 DB ─────────────────────────────────
+
+@dataclass(slots=True, frozen=True)
+class _Ref:
+    attach_id: int
+    email_id: str | None
+    sha256: str | None
+    org_file_name: str | None
+    path: Path
+    file_size: int
+    subject: str | None
+    kst_time: str | None
+
+
+class AttachTextIndex:
+    """`attach_text.db` — sha256 별 추출 결과, FTS 색인, 첨부 연결, 처리 대기열."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with self._connect() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS attach_text (
+                        sha256 TEXT PRIMARY KEY,
+                        status TEXT NOT NULL,          -- ok / empty / unsupported / no_extractor / ...
+                        extractor TEXT,
+                        chars INTEGER NOT NULL DEFAULT 0,
+                        text TEXT,
+                        error TEXT,
+                        extracted_at TEXT
+                    )
+                """)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS attach_ref (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        db_path TEXT NOT NULL,         -- 수집 DB
+                        attach_id INTEGER NOT NULL,    -- 그 DB 의 fund_mail_attach.id
+                        email_id TEXT,
+                        sha256 TEXT,
+                        org_file_name TEXT,
+                        file_path TEXT,
+                        subject TEXT,
+                        kst_time TEXT,
+                        UNIQUE (db_path, attach_id)
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_attach_ref_sha256 ON attach_ref (sha256)")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS extract_queue (
+                        db_path TEXT PRIMARY KEY,
+                        enqueued_at TEXT
+                    )
+                """)
+                if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'attach_text_fts'").fetchone():
+                    try:    # trigram: 한글 부분 일치 (sqlite 3.34+)
+                        conn.execute("CREATE VIRTUAL TABLE attach_text_fts USING fts5("
+                                     "text, content='attach_text', tokenize='trigram')")
+                    except sqlite3.OperationalError:
+                        conn.execute("CREATE VIRTUAL TABLE attach_text_fts USING fts5("
+                                     "text, content='attach_text')")
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 첨부 본문 색인 생성 실패: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # 수집 스레드(enqueue)와 추출 스레드가 함께 쓴다
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    # ── 대기열 ──
+    def enqueue(self, db_path: str | Path) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR IGNORE INTO extract_queue (db_path, enqueued_at) VALUES (?, ?)",
+                             (str(db_path), datetime.now().isoformat(timespec="seconds")))
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 첨부 본문 대기열 추가 실패: {e}")
+
+    def queued(self) -> list[str]:
+        try:
+            with self._connect() as conn:
+                return [r[0] for r in conn.execute("SELECT db_path FROM extract_queue ORDER BY enqueued_at")]
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 첨부 본문 대기열 조회 오류: {e}")
+
+    def dequeue(self, db_path: str | Path) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM extract_queue WHERE db_path = ?", (str(db_path),))
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 첨부 본문 대기열 갱신 실패: {e}")
+
+    # ── 캐시 ──
+    def cached(self, hashes: set[str]) -> set[str]:
+        """이미 결과가 있는 sha256 (다시 시도할 상태는 제외)."""
+        if not hashes:
+            return set()
+        marks = ",".join("?" * len(hashes))
+        try:
+            with self._connect() as conn:
+                return {r[0] for r in conn.execute(
+                    f"SELECT sha256 FROM attach_text WHERE sha256 IN ({marks}) "
+                    f"AND status NOT IN ({','.join('?' * len(_RETRY_STATUSES))})",
+                    (*hashes, *_RETRY_STATUSES))}
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 첨부 본문 캐시 조회 오류: {e}")
+
+    def save(self, db_path: str | Path, refs: list[_Ref],
+             results: dict[str, tuple[str, str | None, str, str | None]]) -> None:
+        """추출 결과와 첨부 연결을 한 트랜잭션으로 기록."""
+        now = datetime.now().isoformat(timespec="seconds")
+        try:
+            with self._connect() as conn:
+                for sha, (status, extractor, text, error) in results.items():
+                    old = conn.execute("SELECT rowid, text FROM attach_text WHERE sha256 = ?", (sha,)).fetchone()
+                    if old is not None:      # 외부 content FTS 는 지울 때 이전 값을 알려 줘야 한다
+                        conn.execute("INSERT INTO attach_text_fts (attach_text_fts, rowid, text) "
+                                     "VALUES ('delete', ?, ?)", old)
+                        conn.execute("DELETE FROM attach_text WHERE rowid = ?", (old[0],))
+                    cur = conn.execute("""
+                        INSERT INTO attach_text (sha256, status, extractor, chars, text, error, extracted_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (sha, status, extractor, len(text), text or None, error, now))
+                    if text:
+                        conn.execute("INSERT INTO attach_text_fts (rowid, text) VALUES (?, ?)",
+                                     (cur.lastrowid, text))
+                conn.executemany("""
+                    INSERT OR REPLACE INTO attach_ref
+                           (db_path, attach_id, email_id, sha256, org_file_name, file_path, subject, kst_time)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(str(db_path), r.attach_id, r.email_id, r.sha256, r.org_file_name, str(r.path),
+                       r.subject, r.kst_time) for r in refs])
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 첨부 본문 저장 실패: {e}")
+
+    # ── 검색 ──
+    def search(self, query: str, limit: int = 20) -> list[dict[str, Any]]:
+        """본문에 `query` 가 있는 첨부 (최근 메일 먼저)."""
+        query = query.strip()
+        if len(query) >= 3:
+            phrase = '"' + query.replace('"', '""') + '"'
+            sql = """
+                SELECT r.kst_time, r.subject, r.org_file_name, r.file_path, r.db_path, r.attach_id,
+                       snippet(attach_text_fts, 0, '[', ']', '…', 12) AS snippet
+                  FROM attach_text_fts f
+                  JOIN attach_text t ON t.rowid = f.rowid
+                  JOIN attach_ref r ON r.sha256 = t.sha256
+                 WHERE attach_text_fts MATCH ?
+                 ORDER BY r.kst_time DESC LIMIT ?
+            """
+            params: tuple = (phrase, limit)
+        else:                    # trigram 은 3글자부터 — 짧은 검색어는 전체 훑기
+            sql = """
+                SELECT r.kst_time, r.subject, r.org_file_name, r.file_path, r.db_path, r.attach_id,
+                       substr(t.text, max(1, instr(t.text, ?) - 20), 60) AS snippet
+                  FROM attach_text t
+                  JOIN attach_ref r ON r.sha256 = t.sha256
+                 WHERE t.text LIKE ? ESCAPE '\\'
+                 ORDER BY r.kst_time DESC LIMIT ?
+            """
+            like = "%" + re.sub(r"([%_\\])", r"\\\1", query) + "%"
+            params = (query, like, limit)
+        try:
+            with self._connect() as conn:
+                conn.row_factory = sqlite3.Row
+                return [dict(r) for r in conn.execute(sql, params)]
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 첨부 본문 검색 오류: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        try:
+            with self._connect() as conn:
+                by_status = dict(conn.execute("SELECT status, COUNT(*) FROM attach_text GROUP BY status"))
+                refs = conn.execute("SELECT COUNT(*), COUNT(DISTINCT sha256) FROM attach_ref").fetchone()
+                queued = conn.execute("SELECT COUNT(*) FROM extract_queue").fetchone()[0]
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 첨부 본문 색인 조회 오류: {e}")
+        return {"status": by_status, "attachments": refs[0], "unique": refs[1], "queued": queued}
+
+
+# ─────────────────────────────── 처리 ─────────────────────────────────
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_refs(db_path: Path) -> list[_Ref]:
+    """수집 DB 의 첨부 목록 (save_folder 는 data_dir 기준 = DB 폴더의 부모)."""
+    base = db_path.parent.parent
+    try:
+        with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as conn:
+            rows = conn.execute("""
+                SELECT a.id, a.email_id, a.sha256, a.org_file_name, a.save_folder, a.phy_file_name,
+                       a.file_size, m.subject, m.kst_time
+                  FROM fund_mail_attach a
+                  LEFT JOIN fund_mail m ON m.email_id = a.email_id
+            """).fetchall()
+    except sqlite3.Error as e:
+        raise DBQueryError(f"❌ 첨부 목록 조회 오류: {db_path}: {e}")
+    return [_Ref(r[0], r[1], r[2], r[3], base / (r[4] or "") / (r[5] or ""), r[6] or 0, r[7], r[8])
+            for r in rows]
+
+
+class _Pool:
+    """처리할 파일이 있을 때만 만드는 작업 프로세스 풀."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._pool = None
+
+    def get(self):
+        if self._pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            ctx = multiprocessing.get_context("spawn")
+            exe = Path(sys.executable)
+            if exe.name.lower().startswith("pythonservice"):     # pywin32 서비스 호스트로는 spawn 불가
+                ctx.set_executable(str(Path(sys.exec_prefix) / "python.exe"))
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                             initializer=_init_worker)
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+def index_db(config, db_path: str | Path, index: AttachTextIndex, pool: _Pool,
+             stop_event: threading.Event | None = None) -> tuple[int, int]:
+    """수집 DB 1개의 첨부를 색인. (새로 추출한 파일 수, 캐시로 건너뛴 파일 수)."""
+    db_path = Path(db_path)
+    refs = _read_refs(db_path)
+    with metrics.stage("read"):
+        for i, ref in enumerate(refs):
+            if not ref.sha256 and ref.path.is_file():      # 예전 DB — sha256 컬럼이 비어 있음
+                refs[i] = replace(ref, sha256=_sha256_file(ref.path))
+        by_sha: dict[str, _Ref] = {r.sha256: r for r in refs if r.sha256}
+        todo = set(by_sha) - index.cached(set(by_sha))
+
+    max_bytes = config.attach_extract_max_mb * 1024 * 1024
+    results: dict[str, tuple[str, str | None, str, str | None]] = {}
+    futures = {}
+    for sha in todo:
+        ref = by_sha[sha]
+        name, package = _EXTRACTORS.get(ref.path.suffix.lower(), (None, None))
+        if name is None:
+            results[sha] = (STATUS_UNSUPPORTED, None, "", None)
+        elif not _available(name, package):
+            results[sha] = (STATUS_NO_EXTRACTOR, name, "", f"{package} 패키지 없음")
+        elif not ref.path.is_file():
+            results[sha] = (STATUS_MISSING, name, "", str(ref.path))
+        elif ref.path.stat().st_size > max_bytes:
+            results[sha] = (STATUS_TOO_LARGE, name, "", None)
+        else:
+            futures[pool.get().submit(extract_text, str(ref.path))] = sha
+
+    with metrics.stage("extract"):
+        pending = list(futures.items())
+        while pending:
+            if stop_event is not None and stop_event.is_set():
+                break                            # 남은 결과는 버리고 다음 실행에서 다시
+            future, sha = pending.pop(0)
+            name = _EXTRACTORS[by_sha[sha].path.suffix.lower()][0]
+            try:
+                results[sha] = future.result()
+            except BrokenExecutor as e:              # BrokenProcessPool
+                # 작업 프로세스가 죽음 (큰 파일로 메모리 부족, 추출기 비정상 종료 등) —
+                # 이 파일은 오류로 남기고 새 풀에서 나머지를 다시 추출
+                logger.warning(f"⚠️ 첨부 본문 추출 중 작업 프로세스 종료: {by_sha[sha].path.name} — 오류로 기록")
+                results[sha] = (STATUS_ERROR, name, "", f"작업 프로세스 종료: {e}"[:500])
+                pool.close()
+                pending = [(pool.get().submit(extract_text, str(by_sha[s].path)), s) for _, s in pending]
+            except Exception as e:
+                results[sha] = (STATUS_ERROR, name, "", f"{type(e).__name__}: {e}"[:500])
+            metrics.incr("extract_bytes", by_sha[sha].file_size)
+    if stop_event is not None and stop_event.is_set():
+        return 0, 0
+
+    with metrics.stage("db"):
+        index.save(db_path, refs, results)
+    extracted = sum(1 for s in results.values() if s[0] in (STATUS_OK, STATUS_EMPTY))
+    metrics.incr("extract_files", len(futures))
+    metrics.incr("extract_cache_hits", len(by_sha) - len(todo))
+    return extracted, len(by_sha) - len(todo)
+
+
+def drain_extract(config, index: AttachTextIndex | None = None,
+                  stop_event: threading.Event | None = None) -> int:
+    """대기열의 수집 DB 를 모두 색인하고 처리한 DB 수를 반환."""
+    index = index or AttachTextIndex(config.attach_text_file)
+    queued = index.queued()
+    if not queued:
+        return 0
+    pool = _Pool(config.attach_extract_workers)
+    done = 0
+    try:
+        for db_path in queued:
+            if stop_event is not None and stop_event.is_set():
+                break
+            if not Path(db_path).exists():
+                logger.warning(f"⚠️ 첨부 본문 색인: DB 파일이 없어 대기열에서 제외: {db_path}")
+                index.dequeue(db_path)
+                continue
+            with metrics.start_run(config, "extract"):
+                extracted, hits = index_db(config, db_path, index, pool, stop_event)
+            if stop_event is not None and stop_event.is_set():
+                break
+            index.dequeue(db_path)
+            done += 1
+            if extracted or hits:
+                logger.info(f"🔎 첨부 본문 색인: {Path(db_path).name} 추출 {extracted}건, 중복 {hits}건")
+    finally:
+        pool.close()
+    return done
+
+
+class AttachTextExtractor:
+    """추출 대기열을 비우는 백그라운드 스레드 (서비스·데몬용)."""
+
+    def __init__(self, config):
+        self.config = config
+        self.index = AttachTextIndex(config.attach_text_file)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="attach-extract", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, db_path: str | Path) -> None:
+        """수집 DB 를 대기열에 넣고 스레드를 깨운다."""
+        self.index.enqueue(db_path)
+        self._wake.set()
+
+    def stop(self, timeout: float = 30) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                drain_extract(self.config, self.index, self._stop)
+            except Exception:  # noqa: BLE001 — 추출 스레드는 죽지 않는다
+                logger.exception("⛔ 첨부 본문 색인 중 예외")
+            self._wake.wait(_IDLE_WAIT)
+
+
+# ─────────────────────────────── CLI ─────────────────────────────────
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="첨부파일 본문 추출·검색")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("search", help="첨부 본문 검색")
+    p.add_argument("query")
+    p.add_argument("--limit", type=int, default=20)
+    p = sub.add_parser("index", help="대기열(또는 지정한 DB) 색인")
+    p.add_argument("db", nargs="*", type=Path, help="수집 DB (없으면 대기열)")
+    p.add_argument("--all", action="store_true", help="DATA_DIR 아래 모든 fm_*.db")
+    sub.add_parser("stats", help="색인 현황")
+    return parser.parse_args()
+
+
+def main() -> None:
+    from config import Config
+
+    args = _parse_args()
+    cfg = Config.load()
+    index = AttachTextIndex(cfg.attach_text_file)
+    if args.cmd == "search":
+        rows = index.search(args.query, args.limit)
+        for r in rows:
+            snippet = re.sub(r"\s+", " ", r["snippet"] or "")
+            print(f"{r['kst_time'] or '':<19}  {r['subject'] or ''}\n"
+                  f"    {r['org_file_name']}  ({r['file_path']})\n    {snippet}")
+        print(f"{len(rows)}건")
+    elif args.cmd == "index":
+        for db in args.db or (sorted(cfg.data_dir.rglob("fm_*.db")) if args.all else []):
+            index.enqueue(db.resolve())
+        t0 = time.perf_counter()
+        done = drain_extract(cfg, index)
+        print(f"DB {done}개 색인 ({time.perf_counter() - t0:.1f}s)")
+    else:
+        stats = index.stats()
+        print(f"첨부 {stats['attachments']}건 (고유 {stats['unique']}), 대기 DB {stats['queued']}개")
+        for status, n in sorted(stats["status"].items()):
+            print(f"  {status:<13} {n}")
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()           # PyInstaller exe 에서 작업 프로세스 실행
+    main()
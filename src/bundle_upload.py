@@ -0,0 +1,208 @@
+"""bundle_upload.py — 수집 결과 묶음(bundle) 업로드
+====================================================
+`SFTP_BUNDLE` 이 설정되면 한 번의 수집 결과(DB + 첨부파일)를 파일마다
+따로 올리지 않고 압축 파일 하나로 묶어 올립니다.
+
+• 묶음은 로컬에 만들지 않고 원격 파일에 바로 스트리밍으로 씁니다.
+  각 로컬 파일은 한 번만 읽히며, 읽는 동안 sha256 도 함께 계산합니다.
+• 마지막 멤버로 `manifest.json`(파일명·크기·sha256)을 넣습니다.
+• 쓰는 동안 묶음 자체의 크기·sha256 도 계산해, 원격 크기와 (지원 시)
+  check-file 결과로 검증합니다.
+• `<이름>.part` 로 쓴 뒤 완료되면 rename 하므로 서버에는 완성된 묶음만
+  보입니다. 스트리밍이라 이어받기는 하지 않고, 실패하면 처음부터 다시 씁니다.
+• 서버에서는 `extract_bundle.py` 로 풀면 기존과 같은 폴더 구조가 됩니다.
+
+형식
+----
+zip      : 표준 라이브러리만 사용 (기본)
+tar.zst  : `zstandard` 패키지가 설치돼 있을 때만. 없으면 zip 으로 대체
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import tarfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+import paramiko
+
+from exceptions import SFTPUploadError
+from logger import get_logger
+import metrics
+from sftp_connection import remote_check_sha256
+from upload_manifest import UploadManifest
+
+try:
+    import zstandard  # 선택 의존성
+except ModuleNotFoundError:  # pragma: no cover
+    zstandard = None
+
+__all__ = ["BUNDLE_FORMATS", "MANIFEST_NAME", "bundle_format", "upload_bundle"]
+
+logger = get_logger()
+
+BUNDLE_FORMATS = ("zip", "tar.zst")
+MANIFEST_NAME = "manifest.json"
+
+# 이미 압축된 형식은 다시 deflate 하지 않는다 (CPU 만 쓰고 크기는 그대로)
+_STORED_EXTS = {".zip", ".xlsx", ".xlsm", ".docx", ".pptx", ".hwpx",
+                ".jpg", ".jpeg", ".png", ".gif", ".7z", ".gz", ".rar"}
+
+
+class _SequentialWriter(io.RawIOBase):
+    """tell/seek 을 감춘 쓰기 래퍼 — zipfile 이 뒤로 돌아가 헤더를 고쳐 쓰지 않고
+    data descriptor 를 써서 원격 파일에 순차(pipelined) 쓰기만 하도록 한다.
+    쓰는 김에 묶음 전체의 크기와 sha256 도 계산한다(원격 검증용)."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._h = hashlib.sha256()
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._raw.write(b)
+        self._h.update(b)
+        self.size += len(b)
+        return len(b)
+
+    def hexdigest(self) -> str:
+        return self._h.hexdigest()
+
+
+def bundle_format(config) -> str:
+    """설정된 묶음 형식. tar.zst 인데 zstandard 가 없으면 zip."""
+    fmt = config.sftp_bundle
+    if fmt == "tar.zst" and zstandard is None:
+        logger.warning("⚠️ zstandard 패키지가 없어 zip 으로 묶습니다.")
+        return "zip"
+    return fmt
+
+
+def _copy_hashing(src, dst, buffer_size: int) -> tuple[int, str]:
+    h = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: src.read(buffer_size), b""):
+        h.update(chunk)
+        dst.write(chunk)
+        size += len(chunk)
+    return size, h.hexdigest()
+
+
+def _write_zip(fp, members: list[tuple[Path, str]], buffer_size: int) -> list[dict]:
+    entries = []
+    with zipfile.ZipFile(fp, "w") as zf:
+        for path, arcname in members:
+            zinfo = zipfile.ZipInfo.from_file(path, arcname)
+            if path.suffix.lower() in _STORED_EXTS:
+                zinfo.compress_type = zipfile.ZIP_STORED
+            else:
+                zinfo.compress_type = zipfile.ZIP_DEFLATED
+            with open(path, "rb") as src, zf.open(zinfo, "w", force_zip64=True) as dst:
+                size, sha256 = _copy_hashing(src, dst, buffer_size)
+            entries.append({"name": arcname, "size": size, "sha256": sha256})
+        zf.writestr(MANIFEST_NAME, _manifest_bytes(entries), zipfile.ZIP_DEFLATED)
+    return entries
+
+
+class _HashingReader:
+    def __init__(self, raw):
+        self._raw = raw
+        self._h = hashlib.sha256()
+
+    def read(self, n=-1):
+        data = self._raw.read(n)
+        self._h.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._h.hexdigest()
+
+
+def _write_tar_zst(fp, members: list[tuple[Path, str]], buffer_size: int) -> list[dict]:
+    entries = []
+    cctx = zstandard.ZstdCompressor(level=3)
+    with cctx.stream_writer(fp, closefd=False) as zw, \
+            tarfile.open(fileobj=zw, mode="w|", bufsize=buffer_size) as tar:
+        for path, arcname in members:
+            tarinfo = tar.gettarinfo(str(path), arcname)
+            with open(path, "rb") as src:
+                reader = _HashingReader(src)
+                tar.addfile(tarinfo, reader)
+            entries.append({"name": arcname, "size": tarinfo.size, "sha256": reader.hexdigest()})
+        data = _manifest_bytes(entries)
+        tarinfo = tarfile.TarInfo(MANIFEST_NAME)
+        tarinfo.size = len(data)
+        tarinfo.mtime = int(datetime.now().timestamp())
+        tar.addfile(tarinfo, io.BytesIO(data))
+    return entries
+
+
+def _manifest_bytes(entries: list[dict]) -> bytes:
+    return json.dumps({
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "files": entries,
+    }, ensure_ascii=False, indent=1).encode("utf-8")
+
+
+def upload_bundle(sftp: paramiko.SFTPClient, config, manifest: UploadManifest,
+                  db_path, attach_paths: list[Path], remote_dir: str) -> bool:
+    """
+    DB 와 첨부파일을 하나의 묶음으로 `remote_dir` 에 스트리밍 업로드.
+
+    업로드 매니페스트에는 DB 파일 기준으로 기록한다(DB 가 그대로면 재업로드 생략).
+
+    Returns
+    -------
+    bool
+        실제로 전송했으면 True, 이미 올라가 있어 건너뛰었으면 False
+    """
+    db_path = Path(db_path)
+    fmt = bundle_format(config)
+    remote_path = f"{remote_dir}/{db_path.stem}.{fmt}"
+
+    st = db_path.stat()
+    entry = manifest.get(db_path)
+    if entry and entry.is_done_for(remote_path, st.st_size, st.st_mtime_ns):
+        logger.debug("묶음 업로드 완료 기록 있음, 건너뜀: %s", remote_path)
+        return False
+
+    members = [(db_path, db_path.name)] + [(p, f"attach/{p.name}") for p in attach_paths]
+    part_path = remote_path + ".part"
+    writer = _write_zip if fmt == "zip" else _write_tar_zst
+    with sftp.open(part_path, "wb", bufsize=config.sftp_buffer_size) as fp:
+        fp.set_pipelined(config.sftp_pipelined)
+        out = _SequentialWriter(fp)
+        entries = writer(out, members, config.sftp_buffer_size)
+
+    # 쓰면서 계산한 크기·해시로 검증 — 로컬에는 묶음이 없으므로 다시 읽을 것도 없다
+    r_size = sftp.stat(part_path).st_size
+    if r_size != out.size:
+        sftp.remove(part_path)
+        raise SFTPUploadError(f"❌ 묶음 크기 불일치: {part_path} ({r_size} != {out.size})")
+    if config.sftp_verify == "check":
+        remote_sha = remote_check_sha256(sftp, part_path)
+        if remote_sha is not None and remote_sha != out.hexdigest():
+            sftp.remove(part_path)
+            raise SFTPUploadError(f"❌ 묶음 sha256 불일치: {part_path}")
+    try:
+        sftp.posix_rename(part_path, remote_path)
+    except IOError:               # posix-rename 확장이 없는 서버
+        try:
+            sftp.remove(remote_path)
+        except IOError:
+            pass
+        sftp.rename(part_path, remote_path)
+
+    metrics.incr("upload_files")
+    metrics.incr("upload_bytes", out.size)
+    db_sha256 = entries[0]["sha256"]
+    manifest.mark_done(db_path, remote_path, st.st_size, st.st_mtime_ns, db_sha256)
+    total = sum(e["size"] for e in entries)
+    logger.info(f"📦 묶음 업로드 완료: {remote_path} (파일 {len(entries)}개, 원본 {total:,} bytes)")
+    return True
@@ -13,12 +13,10 @@
 """
 from __future__ import annotations
 
-import json
 import os
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
 
 from dotenv import load_dotenv
 
@@ -26,6 +24,28 @@ __all__ = ["Config"]
 UTC = timezone.utc
 KST = timezone(timedelta(hours=9))
 
+# SFTP 전송 튜닝 기본값 (paramiko 기본값과 동일)
+SFTP_WINDOW_SIZE = 2 * 1024 * 1024
+SFTP_MAX_PACKET_SIZE = 32 * 1024
+SFTP_BUFFER_SIZE = 32 * 1024
+SFTP_KEEPALIVE = 30
+
+# 서비스 스케줄러 기본값
+SCHEDULER_INTERVAL = 300
+SCHEDULER_MIN_INTERVAL = 60
+SCHEDULER_BUSINESS_INTERVAL = 120
+SCHEDULER_MAX_INTERVAL = 1800
+BUSINESS_HOURS = (8, 19)                 # KST 시(hour) [시작, 끝)
+BUSINESS_DAYS = (0, 1, 2, 3, 4)          # 월~금 (datetime.weekday)
+_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Microsoft Graph 엔드포인트 (벤치마크에서는 로컬 가짜 서버 주소로 바꾼다)
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+
+# IMAP 수집 (MAIL_BACKEND=imap)
+IMAP_HOST = "outlook.office365.com"
+IMAP_FOLDERS = ("INBOX", "Sent Items")
+
 
 @dataclass(slots=True, frozen=True)
 class Config:
@@ -47,6 +67,74 @@ class Config:
     sftp_pw: str
     sftp_base_dir: str 
 
+    # ─────────────────────── SFTP 전송 튜닝 (선택) ─────────────────────────
+    sftp_window_size: int = SFTP_WINDOW_SIZE          # SSH 채널 윈도 크기
+    sftp_max_packet_size: int = SFTP_MAX_PACKET_SIZE  # SSH 최대 패킷 크기
+    sftp_buffer_size: int = SFTP_BUFFER_SIZE          # 로컬 read / 원격 write 단위
+    sftp_prefetch: bool = True                        # 원격 읽기 시 prefetch 사용
+    sftp_pipelined: bool = True                       # 쓰기 응답을 기다리지 않고 연속 전송
+    sftp_compress: bool = False                       # SSH zlib 압축
+    sftp_ciphers: tuple[str, ...] = ()                # 선호 cipher 순서 (빈 값 = paramiko 기본)
+    sftp_keepalive: int = SFTP_KEEPALIVE              # SSH keepalive 간격(초), 0 = 끔
+    sftp_dir_cache_persist: bool = True               # 원격 디렉터리 캐시를 파일에도 저장
+    sftp_bundle: str = ""                             # "" = 파일별 업로드, "zip" / "tar.zst" = 묶음
+    sftp_verify: str = "check"                        # "check" = check-file/표본 비교, "size" = 크기만
+
+    # ─────────────────────── 업로드 대기열 (선택) ──────────────────────────
+    outbox_retry_base: int = 30                       # 첫 재시도 대기(초), 실패마다 2배
+    outbox_retry_max: int = 1800                      # 재시도 대기 상한(초)
+
+    # ─────────────────────────── 스케줄러 (선택) ───────────────────────────
+    scheduler_jitter: int = 0                         # 매 실행에 더하는 무작위 지연 상한(초)
+    scheduler_interval: int = SCHEDULER_INTERVAL      # 기본 수집 간격(초)
+    scheduler_adaptive: bool = True                   # 수집 건수·업무 시간으로 간격 조절
+    scheduler_min_interval: int = SCHEDULER_MIN_INTERVAL  # 바쁠 때 간격 하한(초)
+    scheduler_business_interval: int = SCHEDULER_BUSINESS_INTERVAL  # 업무 시간 기준 간격(초)
+    scheduler_max_interval: int = SCHEDULER_MAX_INTERVAL  # 한가할 때 간격 상한(초)
+    scheduler_busy_count: int = 5                     # 이 건수 이상이면 간격을 줄임
+    business_hours: tuple[int, int] = BUSINESS_HOURS  # KST 업무 시간 [시작, 끝)
+    business_days: tuple[int, ...] = BUSINESS_DAYS    # 업무 요일 (0=월)
+
+    # ─────────────────────────── 상주 데몬 (선택) ──────────────────────────
+    daemon_port: int = 0                              # 127.0.0.1 수신 포트, 0 = 빈 포트 자동 선택
+    daemon_timeout: int = 900                         # main_once 가 수집 결과를 기다리는 최대 시간(초)
+
+    # ─────────────────────────── 성능 지표 (선택) ──────────────────────────
+    metrics_enabled: bool = True                      # metrics.jsonl / .prom 기록
+    metrics_prom_dir: Path | None = None              # .prom 파일 폴더 (기본: log_dir)
+    run_history_days: int = 180                       # run_history.db 보관 일수, 0 = 모두 보관
+    health_port: int = 0                              # /health · /metrics 포트, 0 = 끔
+    health_host: str = "127.0.0.1"                    # 수신 주소 (외부 수집기면 0.0.0.0)
+    health_stale_seconds: int = 0                     # 이보다 오래 성공 없으면 stalled, 0 = 간격 × 3
+    log_sample_head: int = 10                         # 메일 단위 로그: 처음 N건은 모두 기록, 0 = 모두 기록
+    log_sample_every: int = 100                       # 그 뒤로는 N건마다 1건
+
+    # ─────────────────────────── Graph API (선택) ──────────────────────────
+    graph_base_url: str = GRAPH_BASE_URL              # 끝의 / 없이, 예) http://127.0.0.1:8080/v1.0
+    graph_cassette: Path | None = None                # Graph 응답 녹화 파일 (폴더면 실행마다 새 파일)
+    graph_cassette_mode: str = ""                     # "" = 끔, "record" = 녹화, "replay" = 재생
+
+    # ─────────────────────────── IMAP 수집 (선택) ──────────────────────────
+    mail_backend: str = "graph"                       # "graph" = Graph 폴링, "imap" = IMAP UID 동기화
+    imap_host: str = IMAP_HOST
+    imap_port: int = 993
+    imap_ssl: bool = True                             # 로컬 가짜 서버만 0
+    imap_folders: tuple[str, ...] = IMAP_FOLDERS      # 동기화할 폴더
+    imap_fetch_batch: int = 50                        # UID FETCH 1회에 받을 메일 수
+    imap_idle: bool = True                            # 서비스: IDLE 로 새 메일이 오면 바로 수집
+
+    # ─────────────────────────── 첨부 본문 색인 (선택) ──────────────────────
+    attach_extract: bool = False                      # 수집한 첨부의 글자를 attach_text.db 에 색인
+    attach_extract_workers: int = 2                   # 추출 프로세스 수
+    attach_extract_max_mb: int = 50                   # 이보다 큰 첨부는 건너뜀
+
+    # ─────────────────────────── 메일 태그 (선택) ─────────────────────────
+    tag_keywords_file: Path | None = None             # 펀드·거래상대방 키워드 CSV, None = 태그 안 함
+
+    # ─────────────────────────── 로컬 보관 정책 (선택) ──────────────────────
+    retention_days: int = 0                           # 업로드 확인 N일 뒤 로컬 DB·첨부 삭제, 0 = 보관
+    retention_max_gb: int = 0                         # 로컬 파일 상한(GB), 넘으면 업로드된 것부터 삭제, 0 = 끔
+
     # ──────────────────────────── 클래스메서드 ────────────────────────────
     @classmethod
     def load(cls, env_file: str | Path = ".env") -> "Config":
@@ -82,6 +170,87 @@ class Config:
             val = os.getenv(key)
             return to_type(val) if to_type is int else val
 
+        def _opt_int(key: str, default: int) -> int:
+            val = os.getenv(key)
+            if val in (None, ""):
+                return default
+            try:
+                return int(val)
+            except ValueError:
+                raise EnvironmentError(f"[Config] {key} 는 정수여야 합니다: {val}") from None
+
+        def _opt_bool(key: str, default: bool) -> bool:
+            val = os.getenv(key)
+            if val in (None, ""):
+                return default
+            return val.strip().lower() in ("1", "true", "yes", "y", "on")
+
+        def _opt_list(key: str) -> tuple[str, ...]:
+            val = os.getenv(key) or ""
+            return tuple(v.strip() for v in val.split(",") if v.strip())
+
+        sftp_bundle = (os.getenv("SFTP_BUNDLE") or "").strip().lower()
+        if sftp_bundle not in ("", "zip", "tar.zst"):
+            raise EnvironmentError(
+                f"[Config] SFTP_BUNDLE 은 zip 또는 tar.zst 여야 합니다: {sftp_bundle}"
+            )
+
+        sftp_verify = (os.getenv("SFTP_VERIFY") or "check").strip().lower()
+        if sftp_verify not in ("check", "size"):
+            raise EnvironmentError(
+                f"[Config] SFTP_VERIFY 는 check 또는 size 여야 합니다: {sftp_verify}"
+            )
+
+        try:
+            hours = (os.getenv("BUSINESS_HOURS") or "").strip()
+            business_hours = (tuple(int(h) for h in hours.split("-", 1)) if hours
+                              else BUSINESS_HOURS)
+            if len(business_hours) != 2 or not 0 <= business_hours[0] < business_hours[1] <= 24:
+                raise ValueError
+        except ValueError:
+            raise EnvironmentError(
+                f"[Config] BUSINESS_HOURS 는 08-19 형식이어야 합니다: {hours}"
+            ) from None
+
+        days = _opt_list("BUSINESS_DAYS")
+        unknown = [d for d in days if d.lower()[:3] not in _WEEKDAYS]
+        if unknown:
+            raise EnvironmentError(
+                f"[Config] BUSINESS_DAYS 는 mon,tue,... 형식이어야 합니다: {', '.join(unknown)}"
+            )
+        business_days = (tuple(sorted({_WEEKDAYS.index(d.lower()[:3]) for d in days}))
+                         if days else BUSINESS_DAYS)
+
+        graph_base_url = (os.getenv("GRAPH_BASE_URL") or GRAPH_BASE_URL).strip().rstrip("/")
+        if not graph_base_url.startswith(("https://", "http://")):
+            raise EnvironmentError(
+                f"[Config] GRAPH_BASE_URL 은 http(s):// 로 시작해야 합니다: {graph_base_url}"
+            )
+
+        mail_backend = (os.getenv("MAIL_BACKEND") or "graph").strip().lower()
+        if mail_backend not in ("graph", "imap"):
+            raise EnvironmentError(
+                f"[Config] MAIL_BACKEND 는 graph 또는 imap 이어야 합니다: {mail_backend}"
+            )
+
+        graph_cassette_mode = (os.getenv("GRAPH_CASSETTE_MODE") or "").strip().lower()
+        if graph_cassette_mode not in ("", "record", "replay"):
+            raise EnvironmentError(
+                f"[Config] GRAPH_CASSETTE_MODE 는 record 또는 replay 여야 합니다: {graph_cassette_mode}"
+            )
+        graph_cassette = (Path(os.getenv("GRAPH_CASSETTE")).expanduser().resolve()
+                          if os.getenv("GRAPH_CASSETTE") else None)
+        if graph_cassette_mode and graph_cassette is None:
+            raise EnvironmentError(
+                f"[Config] GRAPH_CASSETTE_MODE={graph_cassette_mode} 에는 GRAPH_CASSETTE 경로가 필요합니다"
+            )
+
+        health_port = _opt_int("HEALTH_PORT", 0)
+        if not 0 <= health_port <= 65535:
+            raise EnvironmentError(
+                f"[Config] HEALTH_PORT 는 0~65535 여야 합니다: {health_port}"
+            )
+
         return cls(
             email_user_id=_cast("EMAIL_ID", str),
             email_pw=_cast("EMAIL_PW", str),
@@ -95,6 +264,57 @@ class Config:
             sftp_id=_cast("SFTP_ID", str),
             sftp_pw=_cast("SFTP_PW", str),
             sftp_base_dir=_cast("SFTP_BASE_DIR", str),
+            sftp_window_size=_opt_int("SFTP_WINDOW_SIZE", SFTP_WINDOW_SIZE),
+            sftp_max_packet_size=_opt_int("SFTP_MAX_PACKET_SIZE", SFTP_MAX_PACKET_SIZE),
+            sftp_buffer_size=_opt_int("SFTP_BUFFER_SIZE", SFTP_BUFFER_SIZE),
+            sftp_prefetch=_opt_bool("SFTP_PREFETCH", True),
+            sftp_pipelined=_opt_bool("SFTP_PIPELINED", True),
+            sftp_compress=_opt_bool("SFTP_COMPRESS", False),
+            sftp_ciphers=_opt_list("SFTP_CIPHERS"),
+            sftp_keepalive=_opt_int("SFTP_KEEPALIVE", SFTP_KEEPALIVE),
+            sftp_dir_cache_persist=_opt_bool("SFTP_DIR_CACHE_PERSIST", True),
+            sftp_bundle=sftp_bundle,
+            sftp_verify=sftp_verify,
+            outbox_retry_base=_opt_int("OUTBOX_RETRY_BASE", 30),
+            outbox_retry_max=_opt_int("OUTBOX_RETRY_MAX", 1800),
+            scheduler_jitter=_opt_int("SCHEDULER_JITTER", 0),
+            scheduler_interval=_opt_int("SCHEDULER_INTERVAL", SCHEDULER_INTERVAL),
+            scheduler_adaptive=_opt_bool("SCHEDULER_ADAPTIVE", True),
+            scheduler_min_interval=_opt_int("SCHEDULER_MIN_INTERVAL", SCHEDULER_MIN_INTERVAL),
+            scheduler_business_interval=_opt_int("SCHEDULER_BUSINESS_INTERVAL",
+                                                 SCHEDULER_BUSINESS_INTERVAL),
+            scheduler_max_interval=_opt_int("SCHEDULER_MAX_INTERVAL", SCHEDULER_MAX_INTERVAL),
+            scheduler_busy_count=_opt_int("SCHEDULER_BUSY_COUNT", 5),
+            business_hours=business_hours,
+            business_days=business_days,
+            daemon_port=_opt_int("DAEMON_PORT", 0),
+            daemon_timeout=_opt_int("DAEMON_TIMEOUT", 900),
+            metrics_enabled=_opt_bool("METRICS_ENABLED", True),
+            metrics_prom_dir=(Path(os.getenv("METRICS_PROM_DIR")).expanduser().resolve()
+                              if os.getenv("METRICS_PROM_DIR") else None),
+            run_history_days=_opt_int("RUN_HISTORY_DAYS", 180),
+            health_port=health_port,
+            health_host=(os.getenv("HEALTH_HOST") or "127.0.0.1").strip(),
+            health_stale_seconds=_opt_int("HEALTH_STALE_SECONDS", 0),
+            log_sample_head=max(0, _opt_int("LOG_SAMPLE_HEAD", 10)),
+            log_sample_every=max(0, _opt_int("LOG_SAMPLE_EVERY", 100)),
+            graph_base_url=graph_base_url,
+            graph_cassette=graph_cassette,
+            graph_cassette_mode=graph_cassette_mode,
+            mail_backend=mail_backend,
+            imap_host=(os.getenv("IMAP_HOST") or IMAP_HOST).strip(),
+            imap_port=_opt_int("IMAP_PORT", 993),
+            imap_ssl=_opt_bool("IMAP_SSL", True),
+            imap_folders=_opt_list("IMAP_FOLDERS") or IMAP_FOLDERS,
+            imap_fetch_batch=max(1, _opt_int("IMAP_FETCH_BATCH", 50)),
+            imap_idle=_opt_bool("IMAP_IDLE", True),
+            attach_extract=_opt_bool("ATTACH_EXTRACT", False),
+            attach_extract_workers=max(1, _opt_int("ATTACH_EXTRACT_WORKERS", 2)),
+            attach_extract_max_mb=_opt_int("ATTACH_EXTRACT_MAX_MB", 50),
+            tag_keywords_file=(Path(os.getenv("TAG_KEYWORDS_FILE")).expanduser()
+                               if os.getenv("TAG_KEYWORDS_FILE") else None),
+            retention_days=max(0, _opt_int("RETENTION_DAYS", 0)),
+            retention_max_gb=max(0, _opt_int("RETENTION_MAX_GB", 0)),
         )
 
     # ───────────────────────────── 헬퍼 메서드 ─────────────────────────────
@@ -107,11 +327,49 @@ class Config:
 
     @property
     def last_time_file(self) -> Path:
-        """`LAST_TIME.json` 전체 경로."""
-        if not self.data_dir.exists():
-            self.data_dir.mkdir(parents=True, exist_ok=True)
+        """`LAST_TIME.json` 전체 경로 (폴더는 저장 시 `run_state` 가 만든다)."""
         return self.data_dir / "LAST_TIME.json"
 
+    @property
+    def upload_manifest_file(self) -> Path:
+        """SFTP 업로드 매니페스트(sqlite) 전체 경로."""
+        return self.data_dir / "upload_manifest.db"
+
+    @property
+    def upload_outbox_file(self) -> Path:
+        """SFTP 업로드 대기열(sqlite) 전체 경로."""
+        return self.data_dir / "upload_outbox.db"
+
+    @property
+    def run_lock_file(self) -> Path:
+        """프로세스 간 실행 잠금 파일 전체 경로."""
+        return self.data_dir / "fund_mail.lock"
+
+    @property
+    def daemon_file(self) -> Path:
+        """실행 중인 데몬의 포트·토큰(`daemon.json`) 전체 경로."""
+        return self.data_dir / "daemon.json"
+
+    @property
+    def attach_text_file(self) -> Path:
+        """첨부 본문 색인(sqlite, `attach_text` · FTS) 전체 경로."""
+        return self.data_dir / "attach_text.db"
+
+    @property
+    def file_catalog_file(self) -> Path:
+        """로컬 파일 목록(sqlite, 보관 기간 정리용) 전체 경로."""
+        return self.data_dir / "file_catalog.db"
+
+    @property
+    def run_history_file(self) -> Path:
+        """실행 이력(sqlite, `run_history` 테이블) 전체 경로."""
+        return self.data_dir / "run_history.db"
+
+    @property
+    def remote_dir_cache_file(self) -> Path:
+        """확인된 원격 디렉터리 목록(`remote_dirs.json`) 전체 경로."""
+        return self.data_dir / "remote_dirs.json"
+
     # ──────────────────────── 커서 로딩 헬퍼 ────────────────────────────
     @property
     def last_mail_fetch_time(self) -> datetime:
@@ -120,23 +378,11 @@ class Config:
         1. `LAST_TIME.json` 의 `{"last_fetch_time": "ISO‑UTC"}` 값을 읽습니다.
         2. 파일이 없거나 파싱에 실패하면 **오늘 00:00(KST)** 를 UTC 로 변환해
            반환합니다.
+
+        파일은 프로세스당 한 번만 읽고 메모리 값을 돌려줍니다 (`run_state`).
         """
-        if self.last_time_file.exists():
-            try:
-                with self.last_time_file.open("r", encoding="utf-8") as fh:
-                    data: dict[str, Any] = json.load(fh)
-                ts_str = data.get("last_fetch_time")
-                if ts_str:
-                    ts = datetime.fromisoformat(ts_str.replace("Z", "+00:00"))
-                    if ts.tzinfo is None:
-                        ts = ts.replace(tzinfo=UTC)
-                    return ts.astimezone(UTC)
-            except Exception:  # noqa: BLE001 (폭넓게 잡고 폴백)
-                pass  # 폴백으로 이동
-
-        # 폴백: 오늘 00:00 KST → UTC
-        midnight_local = datetime.now(KST).replace(hour=0, minute=0, second=0, microsecond=0)
-        return midnight_local.astimezone(UTC)
+        from run_state import get_run_state  # runtime import — logger 순환 방지
+        return get_run_state(self).last_fetch_time
 
     @property
     def last_email_id(self) -> str:
@@ -145,10 +391,5 @@ class Config:
         `LAST_TIME.json` 의 `{"last_email_id": "ID"}` 값을 읽습니다.
         파일이 없거나 파싱에 실패하면 빈 문자열을 반환합니다.
         """
-        if self.last_time_file.exists():
-            try:
-                with self.last_time_file.open("r", encoding="utf-8") as fh:
-                    data: dict[str, Any] = json.load(fh)
-                return data.get("last_email_id", "")
-            except Exception:
-                pass
+        from run_state import get_run_state
+        return get_run_state(self).last_email_id
@@ -0,0 +1,333 @@
+"""daemon.py — 상주 수집 데몬
+============================
+서비스 대신 작업 스케줄러로 `main_once` 를 돌리는 환경에서, 매번 프로세스
+시작·import·토큰 발급·SSH 핸드셰이크를 반복하지 않도록 수집기를 상주시킵니다.
+
+• 데몬은 msal 토큰 캐시, Graph HTTP 세션, SFTP 연결(`SFTPConnectionManager`)과
+  업로드 스레드(`OutboxUploader`)를 유지합니다.
+• `127.0.0.1` 에서만 요청을 받습니다. 포트와 임의 토큰은 `data_dir/daemon.json`
+  에 적어 두고, 토큰이 맞는 요청만 처리합니다.
+• `main_once` 는 `trigger_daemon()` 으로 수집을 요청하고 결과를 기다립니다.
+  데몬이 없으면(파일 없음 / pid 없음 / 연결 거부) None 을 받아 직접 수집합니다.
+  daemon.json 이 남아 있는데 그 포트를 다른 프로그램이 쓰는 경우도 응답이
+  이 데몬의 것이 아니면(JSON 아님, 토큰으로 만든 nonce 서명 불일치) None 입니다.
+• 수집은 `run_lock` 으로 서비스·main_once 와 겹치지 않습니다.
+• `HEALTH_PORT` 를 주면 `/health` · `/metrics` 도 엽니다 (`health_server.py`).
+
+프로토콜: 한 줄짜리 JSON 요청 → 한 줄짜리 JSON 응답 ::
+
+    → {"token": "...", "cmd": "collect", "nonce": "..."}      # 또는 "ping"
+    ← {"status": "ok", "db_path": "...", "new_count": 3, "elapsed": 1.2, "proof": "..."}
+    ← {"status": "busy", "proof": "..."}  /  {"status": "error", "error": "...", "proof": "..."}
+
+`proof` 는 HMAC-SHA256(token, nonce) — 응답이 토큰을 아는 이 데몬의 것인지 확인.
+
+사용법
+-----
+$ python daemon.py                 # DAEMON_PORT (기본: 빈 포트 자동 선택)
+$ python daemon.py --port 8765
+
+이 모듈의 최상위 import 는 가볍게 유지합니다 — `main_once` 가 클라이언트로
+import 하므로 수집·업로드 모듈은 데몬을 띄울 때만 불러옵니다.
+"""
+from __future__ import annotations
+
+import argparse
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from logger import get_logger
+from run_lock import RunLock
+
+__all__ = ["CollectDaemon", "trigger_daemon"]
+
+logger = get_logger()
+
+_HOST = "127.0.0.1"
+_CONNECT_TIMEOUT = 2.0          # 데몬 연결 대기(초) — 넘으면 데몬 없음으로 판단
+_REQUEST_TIMEOUT = 10.0         # 데몬이 요청 한 줄을 기다리는 시간(초)
+_MAX_LINE = 64 * 1024
+
+
+# ─────────────────────────────── 클라이언트 ───────────────────────────────
+
+def _read_daemon_file(path: Path) -> dict | None:
+    try:
+        info = json.loads(path.read_text(encoding="utf-8"))
+        return info if info.get("port") and info.get("token") else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _proof(token: str, nonce) -> str:
+    return hmac.new(token.encode("utf-8"), str(nonce).encode("utf-8"), "sha256").hexdigest()
+
+
+def _pid_alive(pid) -> bool:
+    """pid 프로세스가 살아 있는가 (알 수 없으면 True — 연결해서 확인)."""
+    try:
+        pid = int(pid)
+    except (TypeError, ValueError):
+        return True
+    if os.name == "nt":
+        import ctypes                    # os.kill(pid, 0) 은 Windows 에서 프로세스를 종료시킨다
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:                      # PermissionError 등 — 프로세스는 있음
+        return True
+    return True
+
+
+def trigger_daemon(config, cmd: str = "collect", timeout: float | None = None) -> dict | None:
+    """
+    실행 중인 데몬에 `cmd` 를 보내고 응답을 반환한다.
+
+    데몬이 없거나 응답이 이 데몬의 것이 아니면 None — 호출한 쪽이 직접 수집한다.
+    (daemon.json 없음 / pid 없음 / 연결 실패 / 응답 없음·시간 초과·JSON 아님 /
+    proof 불일치). 데몬이 아직 수집 중이면 `run_lock` 을 잡고 있으므로 직접
+    수집으로 넘어가도 겹쳐 실행되지 않는다.
+    """
+    info = _read_daemon_file(config.daemon_file)
+    if info is None:
+        return None
+    where = f"데몬(pid {info.get('pid')}, 포트 {info['port']})"
+    if not _pid_alive(info.get("pid")):
+        logger.info(f"{where}이 실행 중이 아니어서(daemon.json 이 남음) 직접 수집합니다.")
+        return None
+    nonce = secrets.token_hex(8)
+    try:
+        sock = socket.create_connection((_HOST, info["port"]), timeout=_CONNECT_TIMEOUT)
+    except OSError as e:
+        logger.info(f"{where}에 연결할 수 없어 직접 수집합니다: {e}")
+        return None
+    try:
+        with sock:
+            sock.settimeout(config.daemon_timeout if timeout is None else timeout)
+            request = {"token": info["token"], "cmd": cmd, "nonce": nonce}
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline(_MAX_LINE)
+        response = json.loads(line) if line else None
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ {where} 응답 오류, 직접 수집합니다: {e}")
+        return None
+    if not isinstance(response, dict) or not hmac.compare_digest(
+            str(response.pop("proof", "")), _proof(info["token"], nonce)):
+        logger.warning(f"⚠️ {where}의 응답이 fund_mail 데몬의 것이 아니어서 직접 수집합니다.")
+        return None
+    return response
+
+
+# ──────────────────────────────── 데몬 ────────────────────────────────────
+
+class _Handler(socketserver.StreamRequestHandler):
+    timeout = _REQUEST_TIMEOUT
+
+    def handle(self) -> None:
+        daemon: CollectDaemon = self.server.collect_daemon
+        try:
+            request = json.loads(self.rfile.readline(_MAX_LINE))
+            token = str(request.get("token", ""))
+        except (OSError, ValueError, AttributeError):
+            return
+        if not hmac.compare_digest(token, daemon.token):
+            logger.warning("⚠️ 데몬: 토큰이 맞지 않는 요청을 거부했습니다.")
+            response = {"status": "error", "error": "unauthorized"}
+        elif request.get("cmd") == "ping":
+            response = {"status": "ok", "pid": os.getpid()}
+        elif request.get("cmd") == "collect":
+            response = daemon.collect()
+        else:
+            response = {"status": "error", "error": f"unknown cmd: {request.get('cmd')}"}
+        if "nonce" in request:           # 클라이언트가 이 데몬의 응답인지 확인
+            response["proof"] = _proof(daemon.token, request["nonce"])
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class CollectDaemon:
+    """토큰·Graph 세션·SFTP 연결을 유지하며 요청이 오면 1회 수집하는 상주 프로세스."""
+
+    def __init__(self, config, port: int | None = None):
+        # 무거운 모듈은 데몬을 만들 때만 import (클라이언트 경로는 가볍게)
+        from sftp_connection import SFTPConnectionManager
+        from upload_outbox import OutboxUploader
+
+        self.config = config
+        self.token = secrets.token_urlsafe(32)
+        self.run_lock = RunLock(config.run_lock_file)
+        self.sftp = SFTPConnectionManager(config)
+        self.uploader = OutboxUploader(config, connection=self.sftp)
+        self.extractor = None
+        if config.attach_extract:
+            from attach_extract import AttachTextExtractor
+            self.extractor = AttachTextExtractor(config)
+        self._collect_lock = threading.Lock()   # 데몬 안에서 동시 요청 직렬화
+        self._server = _Server((_HOST, config.daemon_port if port is None else port), _Handler)
+        self._server.collect_daemon = self
+        self._thread: threading.Thread | None = None
+        self.collect_count = 0
+        self.health = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def collect(self) -> dict:
+        """1회 수집 — 다른 요청이나 다른 프로세스가 수집 중이면 busy."""
+        from db_actions import count_emails
+        from fetch_email import fetch_email_from_office365
+        import run_history
+
+        if not self._collect_lock.acquire(blocking=False):
+            return {"status": "busy"}
+        try:
+            if not self.run_lock.acquire():
+                logger.warning("⏭️ 다른 프로세스가 수집 중이라 이번 요청은 건너뜁니다.")
+                return {"status": "busy"}
+            started = time.monotonic()
+            try:
+                with run_history.track(self.config, "daemon"):
+                    logger.info("⏺️ 데몬 수집 시작: %s", datetime.now())
+                    db_path = fetch_email_from_office365(self.config)
+                    if db_path:            # 대기열에는 수집이 이미 넣었다
+                        self.uploader.notify()
+                        if self.extractor is not None:
+                            self.extractor.enqueue(db_path)
+                    new_count = count_emails(db_path)
+            finally:
+                self.run_lock.release()
+            self.collect_count += 1
+            elapsed = time.monotonic() - started
+            logger.info("⏺️ 데몬 수집 완료: 새 메일 %d건 (%.2fs)", new_count, elapsed)
+            return {"status": "ok", "db_path": str(db_path) if db_path else None,
+                    "new_count": new_count, "elapsed": round(elapsed, 3)}
+        except Exception as e:  # noqa: BLE001 — 오류는 응답으로 돌려주고 데몬은 계속
+            logger.exception("⛔ 데몬 수집 중 예외")
+            return {"status": "error", "error": str(e)}
+        finally:
+            self._collect_lock.release()
+
+    def health_state(self) -> dict:
+        """`/health` 에 보일 데몬 상태 (수집은 요청이 올 때만 하므로 stalled 판단 없음)."""
+        return {
+            "state": "serving",
+            "collect_count": self.collect_count,
+            "upload_pending": self.uploader.outbox.pending_count(),
+        }
+
+    def _write_daemon_file(self) -> None:
+        path = self.config.daemon_file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps({
+            "pid": os.getpid(),
+            "port": self.port,
+            "token": self.token,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+        }), encoding="utf-8")
+        try:
+            os.chmod(tmp, 0o600)         # 토큰은 같은 사용자만 읽도록 (Windows 에서는 무시됨)
+        except OSError:
+            pass
+        os.replace(tmp, path)
+
+    def _remove_daemon_file(self) -> None:
+        info = _read_daemon_file(self.config.daemon_file)
+        if info and info.get("token") == self.token:   # 다른 데몬이 덮어썼으면 건드리지 않음
+            self.config.daemon_file.unlink(missing_ok=True)
+
+    def _begin(self) -> None:
+        self.uploader.start()            # 이전 실행에서 남은 대기열도 함께 처리
+        if self.extractor is not None:
+            self.extractor.start()
+        self._write_daemon_file()
+        if self.config.health_port:
+            from health_server import HealthServer
+            try:
+                self.health = HealthServer(self.config, self.health_state, name="daemon").start()
+            except OSError as e:
+                logger.warning(f"⚠️ 상태 엔드포인트를 열 수 없습니다 (HEALTH_PORT={self.config.health_port}): {e}")
+        logger.info(f"🟢 fund_mail 데몬 시작: {_HOST}:{self.port} (pid {os.getpid()})")
+
+    def serve_forever(self) -> None:
+        """현재 스레드에서 요청을 처리 (Ctrl-C 로 종료)."""
+        self._begin()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.close()
+
+    def start(self) -> None:
+        """백그라운드 스레드에서 요청 처리 시작."""
+        self._begin()
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="collect-daemon", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """`start()` 로 띄운 데몬 종료."""
+        self._server.shutdown()
+        if self._thread is not None:
+            self._thread.join(timeout=60)
+        self.close()
+
+    def close(self) -> None:
+        self._remove_daemon_file()
+        self._server.server_close()
+        if self.health is not None:
+            self.health.stop()
+            self.health = None
+        self.uploader.stop()             # 진행 중인 업로드가 끝나길 기다림
+        if self.extractor is not None:
+            self.extractor.stop()
+        self.sftp.close()
+        logger.info("🔴 fund_mail 데몬 종료")
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="fund_mail 상주 수집 데몬 (main_once 요청 처리)")
+    parser.add_argument("--port", type=int, help="127.0.0.1 수신 포트 (기본: DAEMON_PORT, 0 = 자동)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    from config import Config
+
+    args = _parse_args()
+    cfg = Config.load()
+    try:
+        if trigger_daemon(cfg, cmd="ping", timeout=_CONNECT_TIMEOUT):
+            logger.error("❌ 이미 실행 중인 데몬이 있습니다: %s", cfg.daemon_file)
+            sys.exit(1)
+    except (OSError, ValueError):
+        pass                             # 응답 없는 이전 데몬 파일 — 새로 띄운다
+    daemon = CollectDaemon(cfg, port=args.port)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("🔴 사용자가 데몬을 중단했습니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 
 import sqlite3
 
-from exceptions import DBCreateError, DBWriteError
+from exceptions import DBCreateError, DBQueryError, DBWriteError
 from logger import get_logger
 
 logger = get_logger()
@@ -44,9 +44,25 @@ def create_db_tables(db_path):
             org_file_name TEXT,
             phy_file_name TEXT,
             file_size INTEGER DEFAULT 0,
+            sha256 TEXT,  -- 저장 시 계산한 첨부파일 sha256 (업로드 검증용)
             FOREIGN KEY (parent_id) REFERENCES fund_mail(id) ON DELETE CASCADE
         )
     """)        
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS fund_mail_tag (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            parent_id INTEGER,  -- fund_mail 테이블의 id
+            email_id TEXT,
+            kind TEXT,  -- fund / code / counterparty ... (키워드 파일의 kind)
+            tag TEXT,  -- 대표 이름 (키워드 파일의 tag)
+            keyword TEXT,  -- 처음 맞은 키워드
+            in_subject INTEGER DEFAULT 0,  -- 제목에 있었으면 1
+            hits INTEGER DEFAULT 0,  -- 제목+본문에서 맞은 횟수
+            FOREIGN KEY (parent_id) REFERENCES fund_mail(id) ON DELETE CASCADE
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_fund_mail_tag_tag ON fund_mail_tag (kind, tag)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_fund_mail_tag_parent ON fund_mail_tag (parent_id)")
     conn.commit()
     conn.close()
     logger.info(f"✅ DB 테이블이 생성되었습니다: {db_path}")
@@ -99,18 +115,39 @@ def save_email_data_to_db(email_data_list, db_path):
                      attach["save_folder"],
                      attach["org_file_name"],
                      attach["phy_file_name"], 
-                     attach['file_size'])
+                     attach['file_size'],
+                     attach.get('sha256'))
                     for attach in email.get("attach_files", [])
                 ]
                 cur.executemany("""
                     INSERT INTO fund_mail_attach
-                          (parent_id, email_id, save_folder, org_file_name, phy_file_name, file_size)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                          (parent_id, email_id, save_folder, org_file_name, phy_file_name, file_size, sha256)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
                 """, attach_rows)
                 attach_count = attach_count + len(attach_rows)
+
+                # --- 3) 태그 INSERT (mail_tagger.tag_email_list 가 채운 경우) ---
+                if email.get("tags"):
+                    cur.executemany("""
+                        INSERT INTO fund_mail_tag
+                              (parent_id, email_id, kind, tag, keyword, in_subject, hits)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, [(parent_id, email["email_id"], t["kind"], t["tag"], t["keyword"],
+                           t["in_subject"], t["hits"]) for t in email["tags"]])
             # with-블록을 무사히 통과해야만 COMMIT 발생
             logger.info("✅ 이메일 %d건, 첨부파일 %d개 트랜잭션 저장 완료", len(email_data_list), attach_count)
         return db_path
     except sqlite3.Error as e:
         # 예외 발생 시 자동 ROLLBACK
         raise DBWriteError("❌ DB 저장 실패 - 전체 롤백됨")
+
+
+def count_emails(db_path) -> int:
+    """DB 에 저장된 메일 건수 (db_path 가 None 이면 0)."""
+    if not db_path:
+        return 0
+    try:
+        with sqlite3.connect(db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM fund_mail").fetchone()[0]
+    except sqlite3.Error as e:
+        raise DBQueryError(f"❌ 메일 건수 조회 오류: {e}")
@@ -22,3 +22,15 @@ class DBQueryError(FundMailError):
 
 class SFTPUploadError(FundMailError):
     """SFTP 업로드 실패"""
+
+class GraphCassetteError(FundMailError):
+    """Graph 응답 녹화 파일(cassette) 기록/재생 실패"""
+
+class PstImportError(FundMailError):
+    """PST 백업 가져오기 실패"""
+
+class TagKeywordError(FundMailError):
+    """태그 키워드 파일 읽기 실패"""
+
+class RunStateError(FundMailError):
+    """수집 커서(LAST_TIME.json) 저장 실패"""
@@ -0,0 +1,179 @@
+"""
+extract_bundle.py
+
+사용법 (SFTP 서버에서 실행)
+-----
+$ python extract_bundle.py /home/kdy987/fund_mail/2025_06_30/fm_2025_06_30_10_05.zip
+$ python extract_bundle.py /home/kdy987/fund_mail/2025_06_30 --delete   # 폴더 안 묶음 전부
+
+`SFTP_BUNDLE` 모드로 올라온 묶음(zip / tar.zst)을 풀어서 파일별 업로드와
+같은 구조(`<날짜>/fm_*.db`, `<날짜>/attach/*`)로 만든다. 각 파일은 임시
+이름으로 쓰면서 sha256 을 계산하고, 묶음 안 `manifest.json` 과 비교해
+일치할 때만 제자리로 옮긴다.
+
+서버에는 fund_mail 설정(.env)이 없으므로 표준 라이브러리만 사용한다
+(tar.zst 는 `zstandard` 패키지가 필요).
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.json"
+_CHUNK_SIZE = 1024 * 1024
+
+
+class BundleError(Exception):
+    """묶음 해제/검증 실패"""
+
+
+def _safe_target(dest: Path, name: str) -> Path:
+    target = (dest / name).resolve()
+    if dest.resolve() not in target.parents:
+        raise BundleError(f"묶음 밖 경로는 풀 수 없습니다: {name}")
+    return target
+
+
+def _write_member(src, target: Path) -> tuple[int, str]:
+    """임시 파일에 쓰면서 sha256 계산 — 검증 후 `_commit` 으로 옮긴다."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".extracting")
+    h = hashlib.sha256()
+    size = 0
+    with open(tmp, "wb") as out:
+        for chunk in iter(lambda: src.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return size, h.hexdigest()
+
+
+def _commit(target: Path) -> None:
+    os.replace(target.with_name(target.name + ".extracting"), target)
+
+
+def _discard(targets: list[Path]) -> None:
+    for t in targets:
+        t.with_name(t.name + ".extracting").unlink(missing_ok=True)
+
+
+def _verify(name: str, size: int, sha256: str, expected: dict[str, dict]) -> None:
+    exp = expected.get(name)
+    if exp is None:
+        raise BundleError(f"manifest 에 없는 파일: {name}")
+    if exp["size"] != size or exp["sha256"] != sha256:
+        raise BundleError(f"검증 실패: {name} (size {size}/{exp['size']})")
+
+
+def extract_zip(bundle: Path, dest: Path) -> int:
+    with zipfile.ZipFile(bundle) as zf:
+        expected = {e["name"]: e for e in json.loads(zf.read(MANIFEST_NAME))["files"]}
+        targets = []
+        try:
+            for info in zf.infolist():
+                if info.filename == MANIFEST_NAME or info.is_dir():
+                    continue
+                target = _safe_target(dest, info.filename)
+                targets.append(target)
+                with zf.open(info) as src:
+                    size, sha256 = _write_member(src, target)
+                _verify(info.filename, size, sha256, expected)
+            if len(targets) != len(expected):
+                raise BundleError(f"파일 개수 불일치: {len(targets)} != {len(expected)}")
+        except Exception:
+            _discard(targets)
+            raise
+    for t in targets:
+        _commit(t)
+    return len(targets)
+
+
+def extract_tar_zst(bundle: Path, dest: Path) -> int:
+    try:
+        import zstandard
+    except ModuleNotFoundError as e:
+        raise BundleError("tar.zst 를 풀려면 zstandard 패키지가 필요합니다") from e
+
+    # 스트리밍 형식이라 manifest 가 맨 뒤에 있다 → 먼저 모두 풀고 마지막에 검증
+    results: dict[str, tuple[int, str]] = {}
+    targets = []
+    manifest = None
+    try:
+        with open(bundle, "rb") as raw, \
+                zstandard.ZstdDecompressor().stream_reader(raw) as zr, \
+                tarfile.open(fileobj=zr, mode="r|") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                src = tar.extractfile(member)
+                if member.name == MANIFEST_NAME:
+                    manifest = json.loads(src.read())
+                    continue
+                target = _safe_target(dest, member.name)
+                targets.append(target)
+                results[member.name] = _write_member(src, target)
+        if manifest is None:
+            raise BundleError("manifest.json 이 없습니다")
+        expected = {e["name"]: e for e in manifest["files"]}
+        for name, (size, sha256) in results.items():
+            _verify(name, size, sha256, expected)
+        if len(results) != len(expected):
+            raise BundleError(f"파일 개수 불일치: {len(results)} != {len(expected)}")
+    except Exception:
+        _discard(targets)
+        raise
+    for t in targets:
+        _commit(t)
+    return len(targets)
+
+
+def extract_bundle(bundle: Path, dest: Path | None = None) -> int:
+    """묶음을 `dest`(기본: 묶음이 있는 폴더)에 풀고 파일 개수를 반환."""
+    dest = dest or bundle.parent
+    if bundle.name.endswith(".zip"):
+        return extract_zip(bundle, dest)
+    if bundle.name.endswith(".tar.zst"):
+        return extract_tar_zst(bundle, dest)
+    raise BundleError(f"지원하지 않는 묶음 형식: {bundle.name}")
+
+
+def _find_bundles(path: Path) -> list[Path]:
+    if path.is_dir():
+        return sorted(p for p in path.iterdir()
+                      if p.name.endswith((".zip", ".tar.zst")) and p.name.startswith("fm_"))
+    return [path]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="fund_mail 업로드 묶음(zip / tar.zst) 해제")
+    parser.add_argument("paths", nargs="+", type=Path, help="묶음 파일 또는 묶음이 있는 폴더")
+    parser.add_argument("--dest", type=Path, help="풀 위치 (기본: 묶음이 있는 폴더)")
+    parser.add_argument("--delete", action="store_true", help="검증까지 끝난 묶음은 삭제")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    failed = 0
+    for path in args.paths:
+        for bundle in _find_bundles(path):
+            try:
+                count = extract_bundle(bundle, args.dest)
+            except Exception as e:  # noqa: BLE001 — 다음 묶음은 계속
+                failed += 1
+                print(f"❌ {bundle}: {e}", file=sys.stderr)
+                continue
+            print(f"✅ {bundle}: 파일 {count}개")
+            if args.delete:
+                bundle.unlink()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
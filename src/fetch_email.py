@@ -1,17 +1,24 @@
+import hashlib
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
-import sqlite3
-import paramiko
 import json
-from msal import ConfidentialClientApplication
 from datetime import datetime, time, timezone, timedelta
-from pathlib import Path
+from typing import Any
 from zoneinfo import ZoneInfo
 
+from config import GRAPH_BASE_URL
 from exceptions import AttachFileFetchError, TokenError
-from exceptions import EmailFetchError
-from logger import get_logger
+from exceptions import EmailFetchError, FundMailError
+from logger import LogSampler, get_logger
 from db_actions import create_db_tables, save_email_data_to_db
+import file_catalog
+from mail_tagger import tag_email_list
+from run_state import get_run_state
+import graph_cassette
+import metrics
+from upload_outbox import UploadOutbox
 from utils import truncate_filepath  
 
 logger = get_logger()
@@ -19,34 +26,74 @@ logger = get_logger()
 KST = ZoneInfo("Asia/Seoul")
 IMAGE_SIZE_THRESHOLD = 20 * 1024     # 20 KB 이하 이미지 = 로고로 간주
 
+# (tenant, client) → msal 앱. 앱을 재사용해야 msal 의 토큰 캐시가 살아 있어
+# 서비스 모드에서 매 실행마다 토큰 엔드포인트를 호출하지 않는다.
+_msal_apps: dict[tuple[str, str], Any] = {}
+# 실행 간 재사용하는 Graph HTTP 세션 — 서비스/데몬에서는 TLS 연결이 유지된다.
+# 수집은 실행 잠금으로 한 번에 하나만 돌므로 공유해도 안전하다.
+_graph_session: requests.Session | None = None
+# Graph 가 429(throttling)/503/504 를 주면 Retry-After 만큼 기다렸다가 다시 요청
+_GRAPH_RETRIES = 5
+
+
+class _GraphRetry(Retry):
+    """재시도할 때마다 `graph_retries` 지표를 올리는 Retry."""
+
+    def increment(self, *args, **kwargs):
+        metrics.incr("graph_retries")
+        return super().increment(*args, **kwargs)
+
 
 def get_graph_token(config):
-    """Microsoft Graph API용 토큰 발급"""
+    """Microsoft Graph API용 토큰 발급 (유효한 토큰이 캐시에 있으면 재사용)"""
+    return get_access_token(config, 'https://graph.microsoft.com/.default')
+
+def get_access_token(config, scope: str):
+    """client credentials 토큰 발급 — Graph / IMAP(outlook.office365.com) 공용"""
     TENANT_ID = config.tenant_id
     CLIENT_ID = config.client_id
     CLIENT_SECRET = config.client_secret
 
-    authority = f'https://login.microsoftonline.com/{TENANT_ID}'
-    app = ConfidentialClientApplication(
-        CLIENT_ID, authority=authority, client_credential=CLIENT_SECRET)
-    
-    # Graph API 스코프
-    result = app.acquire_token_for_client(['https://graph.microsoft.com/.default'])
+    app = _msal_apps.get((TENANT_ID, CLIENT_ID))
+    if app is None:
+        from msal import ConfidentialClientApplication  # 지연 import — 토큰 캐시가 비었을 때만
+        authority = f'https://login.microsoftonline.com/{TENANT_ID}'
+        app = _msal_apps[(TENANT_ID, CLIENT_ID)] = ConfidentialClientApplication(
+            CLIENT_ID, authority=authority, client_credential=CLIENT_SECRET)
+
+    result = app.acquire_token_for_client([scope])
     
     if 'access_token' in result:
         return result.get('access_token')
     else:
-        logger.error("토큰 발급 실패:", result.get('error_description'))
+        logger.error("토큰 발급 실패: %s", result.get('error_description'))
         return None
 
+def get_graph_session(headers: dict) -> requests.Session:
+    """재사용 Graph 세션에 이번 토큰 헤더를 씌워 반환"""
+    global _graph_session
+    if _graph_session is None:
+        _graph_session = requests.Session()
+        retry = _GraphRetry(total=_GRAPH_RETRIES, backoff_factor=1,
+                            status_forcelist=(429, 503, 504), allowed_methods={"GET"},
+                            respect_retry_after_header=True, raise_on_status=False)
+        _graph_session.mount("https://", HTTPAdapter(max_retries=retry))
+        _graph_session.mount("http://", HTTPAdapter(max_retries=retry))
+    _graph_session.headers.update(headers)
+    return _graph_session
+
 def get_ymd_path_and_dbpath(config, one_day: str = None):
-    ''' 현재 날짜를 'YYYY_MM_DD' 형식으로 반환 폴더 경로 및 DB명 생성'''
+    ''' 현재 날짜를 'YYYY_MM_DD' 형식으로 반환 폴더 경로 및 DB명 생성
+
+    DB 이름은 초 단위까지 쓰고, 그래도 같은 이름이 있으면 번호를 붙인다 —
+    이미 업로드 대기열에 있거나 업로드 중인 DB 에 다음 실행이 덧붙이지 않도록.
+    '''
     data_dir = config.data_dir
     if one_day:
-        ymd_time = one_day.replace("-","_") + datetime.now().strftime('_%H_%M')
+        ymd_time = one_day.replace("-","_") + datetime.now().strftime('_%H_%M_%S')
         ymd_path = data_dir / ymd_time[:10]  # '2025-06-23' 형태
     else:    
-        ymd_time = datetime.now().strftime('%Y_%m_%d_%H_%M')
+        ymd_time = datetime.now().strftime('%Y_%m_%d_%H_%M_%S')
         ymd_path = data_dir / ymd_time[:10]  # '2025-06-23' 형태
     
     if not ymd_path.exists():
@@ -54,53 +101,69 @@ def get_ymd_path_and_dbpath(config, one_day: str = None):
         logger.info(f"날짜별 폴더 생성: {ymd_path}")
 
     db_path =  ymd_path / f'fm_{ymd_time}.db'
+    seq = 1
+    while db_path.exists():
+        db_path = ymd_path / f'fm_{ymd_time}_{seq}.db'
+        seq += 1
     return ymd_path, db_path
 
 def save_last_email_id_and_time(last_mail_time, last_email_id, title, config):
     """
-    마지막 이메일 수집 시각을 LAST_TIME.json에 저장
+    마지막 이메일 수집 시각을 LAST_TIME.json에 저장 (임시 파일 → os.replace)
+
+    저장에 실패하면 `RunStateError` — 로그만 남기고 성공으로 끝내면 다음 실행이
+    같은 메일을 다시 받아 저장한다.
     """
-    last_time_file: Path = config.last_time_file
+    # 1) 문자열이면 그대로, 2) datetime이면 ISO 문자열로, 3) None이면 현재 UTC
+    if isinstance(last_mail_time, str):
+        ts = last_mail_time
+    elif last_mail_time is None:
+        ts = datetime.now(timezone.utc).isoformat()
+    else:
+        ts = last_mail_time.isoformat()
 
-    # 파일이 없으면 빈 JSON 생성
-    if not last_time_file.exists():
-        last_time_file.write_text("{}")
+    data = get_run_state(config).commit(ts, last_email_id, title,
+                                        utc_to_kst(ts, as_iso=False))  # KST로 변환
+    logger.info(f"✏️ 마지막 이메일 수집 시각 저장: [{json.dumps(data, ensure_ascii=False)}]")
 
-    try:
-        # 1) 문자열이면 그대로, 2) datetime이면 ISO 문자열로, 3) None이면 현재 UTC
-        if isinstance(last_mail_time, str):
-            ts = last_mail_time
-        elif last_mail_time is None:
-            ts = datetime.now(timezone.utc).isoformat()
-        else:
-            ts = last_mail_time.isoformat()
-
-        with last_time_file.open("r+", encoding="utf-8") as f:
-            data = json.load(f)
-            data["last_fetch_time"] = ts
-            data["last_email_id"] = last_email_id
-            data["last_fetch_time_kst"] = utc_to_kst(ts, as_iso=False)  # KST로 변환
-            data["title"] = title  # 제목 추가
-            f.seek(0)
-            json.dump(data, f, indent=4, ensure_ascii=False)
-            f.truncate()
-        logger.info(f"✏️ 마지막 이메일 수집 시각 저장: [{json.dumps(data, ensure_ascii=False)}]")
+def has_new_mail(graph: requests.Session, MAIL_USER: str, cursor_str: str, last_email_id: str,
+                 base_url: str = GRAPH_BASE_URL) -> bool:
+    """
+    커서 이후 가장 최근 메일 1건의 id 만 조회하는 가벼운 확인 요청.
 
-    except Exception as e:
-        logger.error(f"❌ 마지막 이메일 수집 시각 저장 오류: {e}")
+    `ge cursor` 조건이라 마지막으로 받은 메일이 항상 포함되므로, 최신 메일이
+    그 메일이면 새 메일이 없는 것이다.
+    """
+    url = f"{base_url}/users/{MAIL_USER}/messages"
+    params = {
+        "$filter": f"receivedDateTime ge {cursor_str}",
+        "$orderby": "receivedDateTime desc",
+        "$top": 1,
+        "$select": "id,receivedDateTime",
+    }
+    with metrics.stage("probe"):
+        r = graph.get(url, params=params, timeout=30)
+    metrics.incr("graph_requests")
+    if r.status_code != 200:
+        raise EmailFetchError(f"❌ 새 메일 확인 실패: {r.status_code} - {r.text}")
+    latest = r.json().get("value", [])
+    return bool(latest) and latest[0].get("id") != last_email_id
 
-def get_message_body(graph: requests.Session,MAIL_USER:str, message_id: str) -> str | None:
+def get_message_body(graph: requests.Session,MAIL_USER:str, message_id: str,
+                     base_url: str = GRAPH_BASE_URL) -> str | None:
     """
     단건 조회로 본문 가져오기 (text 형식).
     graph 세션에는 반드시  Authorization: Bearer <token>  헤더가 포함돼 있어야 합니다.
     """
     # url = f"https://graph.microsoft.com/v1.0/me/messages/{message_id}"
-    url = f"https://graph.microsoft.com/v1.0/users/{MAIL_USER}/messages/{message_id}"
+    url = f"{base_url}/users/{MAIL_USER}/messages/{message_id}"
     params  = {"$select": "body"}              # body 외 필드가 필요하면 , 로 추가
     # headers = {'Prefer': 'outlook.body-content-type="text"'}  # → 평문으로 받기
     headers = {'Prefer': 'outlook.body-content-type="html"'}  # → 평문으로 받기
 
-    r = graph.get(url, params=params, headers=headers, timeout=30)
+    with metrics.stage("body"):
+        r = graph.get(url, params=params, headers=headers, timeout=30)
+    metrics.incr("graph_requests")
 
     if r.status_code != 200:
         logger.error(f"❌ 메일 본문 조회 실패 {r.status_code}: {r.text}")
@@ -313,12 +376,13 @@ def make_physical_file_name(prefix: str = "", ext: str = "") -> str:
     return f"{prefix}_{micros}{ext}"
 
 def download_attachments(MAIL_USER, email_id, headers, ymd_path, kst_time: str, config) -> list:
-    """첨부파일 다운로드"""
-    url = f'https://graph.microsoft.com/v1.0/users/{MAIL_USER}/messages/{email_id}/attachments'
+    """첨부파일 다운로드 (본문·목록과 같은 Graph 세션 사용 — 연결 재사용)"""
+    url = f'{config.graph_base_url}/users/{MAIL_USER}/messages/{email_id}/attachments'
     
     try:
-        response = requests.get(url, headers=headers)
-        
+        response = get_graph_session(headers).get(url, timeout=120)
+        metrics.incr("graph_requests")
+
         if response.status_code == 200:
             attachments = response.json().get('value', [])
             attach_count = 0
@@ -345,6 +409,8 @@ def download_attachments(MAIL_USER, email_id, headers, ymd_path, kst_time: str,
                     import base64
                     file_data = base64.b64decode(content)
                     file_size = len(file_data)  
+                    # 쓰기 전에 메모리에 있는 데이터로 한 번에 해시 — 업로드 검증에 사용
+                    file_sha256 = hashlib.sha256(file_data).hexdigest()
                     date_prefix = kst_time[:10].replace("-", "")
                     ext = os.path.splitext(filename)[1]
                     physical_filename = make_physical_file_name(prefix=date_prefix, ext=ext)  
@@ -354,6 +420,8 @@ def download_attachments(MAIL_USER, email_id, headers, ymd_path, kst_time: str,
                     save_folder = str(attach_path.relative_to(config.data_dir))
                     with open(filepath, 'wb') as f:
                         f.write(file_data)
+                    metrics.incr("attachments")
+                    metrics.incr("attach_bytes", file_size)
                     attach_files.append({
                         'parent_id': None,
                         'email_id': email_id,
@@ -361,6 +429,7 @@ def download_attachments(MAIL_USER, email_id, headers, ymd_path, kst_time: str,
                         'phy_file_name': physical_filename,
                         'save_folder': save_folder,
                         'file_size': file_size,
+                        'sha256': file_sha256,
                     })
         else:
             raise AttachFileFetchError(f"첨부파일 API 호출 실패: {response.status_code} - {response.text}")
@@ -374,10 +443,24 @@ def fetch_email_from_office365(config, one_day:str = None):
     LAST_TIME.json 파일에서 마지막 이메일 수집 시각을 읽어오고,
     없으면 그날의 00:00:00 시각을 반환합니다.
     그 시각 이후의 메일을 모두 가져와서 db에 저장, attachments를 다운로드합니다.
+
+    단계별 소요 시간과 요청 수는 `metrics` 에 실행 1건으로 기록됩니다.
+    GRAPH_CASSETTE_MODE 가 record/replay 면 Graph 응답을 녹화/재생합니다.
+    MAIL_BACKEND=imap 이면 같은 결과를 IMAP 으로 만듭니다(`imap_backend`).
     """
+    if config.mail_backend == "imap":
+        import imap_backend
+        return imap_backend.fetch_email_from_imap(config, one_day)
+    with metrics.start_run(config, "fetch", one_day=one_day), \
+            graph_cassette.cassette(config, get_graph_session({}), one_day):
+        return _fetch_email_from_office365(config, one_day)
+
+def _fetch_email_from_office365(config, one_day:str = None):
     MAIL_USER = config.email_user_id
 
-    token = get_graph_token(config)
+    with metrics.stage("token"):
+        # 재생 모드는 녹화된 응답만 쓰므로 토큰을 발급받지 않는다
+        token = "replay" if config.graph_cassette_mode == "replay" else get_graph_token(config)
     if not token:
         raise TokenError("❌ Graph API 토큰 발급 실패")
 
@@ -386,7 +469,8 @@ def fetch_email_from_office365(config, one_day:str = None):
         'Content-Type': 'application/json'
     }
     
-    # LAST_TIME.json에서 최종 email_id를 가져온다.
+    # LAST_TIME.json에서 최종 email_id를 가져온다. (다른 프로세스가 바꿨을 때만 다시 읽음)
+    get_run_state(config).refresh()
     last_email_id = config.last_email_id
     is_first_fetch = False
     if one_day: # 하루동안의 메일
@@ -423,12 +507,19 @@ def fetch_email_from_office365(config, one_day:str = None):
     # cursor_str = cursor.astimezone(timezone.utc)          \
     #                  .strftime('%Y-%m-%dT%H:%M:%SZ')  # → '2025-06-23T15:00:00Z'    
     # 예: '2025-06-23T15:00:00Z'    
-    url = f'https://graph.microsoft.com/v1.0/users/{MAIL_USER}/messages'
+    url = f'{config.graph_base_url}/users/{MAIL_USER}/messages'
     
     try:
-        graph = requests.Session()
-        graph.headers.update(headers)  # 세션에 헤더 추가
-        response = graph.get(url, headers=headers, params=params)
+        graph = get_graph_session(headers)  # 세션에 헤더 추가 (연결 재사용)
+        # 주기 수집: 새 메일이 없으면 폴더 생성·목록 조회·LAST_TIME.json 갱신 없이 종료
+        if not one_day and not is_first_fetch \
+                and not has_new_mail(graph, MAIL_USER, cursor_str, last_email_id,
+                                 config.graph_base_url):
+            logger.info(f"새 메일 없음 (기준 시각: {utc_to_kst(cursor_str)})")
+            return None
+        with metrics.stage("list"):
+            response = graph.get(url, headers=headers, params=params)
+        metrics.incr("graph_requests")
         # 현재 시각을 UTC로 변환
         db_path = None
         ymd_path = None
@@ -440,6 +531,8 @@ def fetch_email_from_office365(config, one_day:str = None):
             logger.info(f"✅ {len(emails)}개의 이메일을 가져왔습니다. 새로운 메일:{len(emails)-1}, 마지막 1개는 체크용임")
             last_mail_time = None
             count = 0
+            per_mail_log = LogSampler(logger, config.log_sample_head,
+                                      config.log_sample_every)   # 메일 단위 로그는 샘플링
             logger.info("--------------------------------------------------------")
             for email in emails:
                 email_id = email.get('id', 'ID 없음')
@@ -452,7 +545,6 @@ def fetch_email_from_office365(config, one_day:str = None):
                 to_recipients  = ', '.join(r.get('emailAddress', {}).get('address') for r in email.get('toRecipients', []) if r.get('emailAddress', {}).get('address')) or '받는 사람 없음'
                 cc_recipients  = ', '.join(r.get('emailAddress', {}).get('address') for r in email.get('ccRecipients', []) if r.get('emailAddress', {}).get('address')) or '참조 없음'
 
-                content = get_message_body(graph, MAIL_USER, email_id) or '내용 없음'                
                 kst_time = utc_to_kst(received_time, as_iso=False)  # KST로 변환
 
                 # last_mail_time은 가장 최근 시각으로 설정
@@ -466,10 +558,13 @@ def fetch_email_from_office365(config, one_day:str = None):
                 if last_email_id == email_id:
                     logger.info(f"마지막 이메일 ID와 일치합니다. 수집을 중단합니다.")
                     break    
+                # 본문은 실제로 저장할 메일만 조회 (체크용 마지막 메일은 생략)
+                content = get_message_body(graph, MAIL_USER, email_id, config.graph_base_url) or '내용 없음'
                 # 첨부파일이 있는 경우 다운로드
                 attach_files= []
                 if email.get('hasAttachments'):
-                    attach_files = download_attachments( MAIL_USER, email['id'], headers, ymd_path, kst_time, config)
+                    with metrics.stage("attach"):
+                        attach_files = download_attachments( MAIL_USER, email['id'], headers, ymd_path, kst_time, config)
 
                 email_time = receive_time_to_format_str(received_time)  # '2021-03-02 04:34:29.008971' 형식으로 변환
                 msg_kind = 'receive'
@@ -495,19 +590,29 @@ def fetch_email_from_office365(config, one_day:str = None):
                     'attach_files': attach_files if not is_first_fetch else []
                 })
                 count += 1
-                logger.info(f"{count} : {subject} ({kst_time}), 첨부파일 개수: {len(attach_files) if not is_first_fetch else 0}")
+                per_mail_log.info("%d : %s (%s), 첨부파일 개수: %d", count, subject, kst_time,
+                                  len(attach_files) if not is_first_fetch else 0)
+            per_mail_log.summary("메일")
             logger.info("--------------------------------------------------------")
             # 처음이면 last_time.json저장    
             if is_first_fetch:
-                save_last_email_id_and_time(last_mail_time, last_email_id, subject, config)
+                with metrics.stage("state"):
+                    save_last_email_id_and_time(last_mail_time, last_email_id, subject, config)
             elif email_data_list:
                 last_email_id = email_data_list[0]['email_id']
                 title = email_data_list[0]['subject']
-                create_db_tables(db_path)  # DB 초기화
+                tag_email_list(config, email_data_list)   # 펀드·거래상대방 태그 (TAG_KEYWORDS_FILE)
+                with metrics.stage("db"):
+                    create_db_tables(db_path)  # DB 초기화
+                    # DB에 저장 — 커서보다 먼저 커밋해야 실패 시 다음 실행에서 다시 받는다
+                    db_path = save_email_data_to_db(email_data_list, db_path)
+                    file_catalog.record_run(config, db_path, email_data_list)   # 보관 정책용 파일 목록
+                    # 업로드 대기열도 커서보다 먼저 — 대기열에 없는 DB 가 남지 않도록
+                    UploadOutbox(config.upload_outbox_file).enqueue(db_path)
+                metrics.incr("messages", len(email_data_list))
                 # 마지막 이메일 ID와 시각 저장
-                save_last_email_id_and_time(last_mail_time, last_email_id, title, config)
-                # DB에 저장 
-                db_path = save_email_data_to_db(email_data_list, db_path)
+                with metrics.stage("state"):
+                    save_last_email_id_and_time(last_mail_time, last_email_id, title, config)
             else:
                 kst = utc_to_kst(last_mail_time, as_iso=False) if last_mail_time else '알 수 없음'
                 logger.warning(f"⚠️ 시각: {kst} 으로부터 수신된 이메일이 없습니다.")
@@ -516,6 +621,8 @@ def fetch_email_from_office365(config, one_day:str = None):
         else:
             raise EmailFetchError(f"❌ API 호출 실패: {response.status_code} - {response.text}")
             
+    except FundMailError:
+        raise                           # DB·커서·대기열 오류는 그대로 (RunStateError 등)
     except Exception as e:
         raise EmailFetchError(f"❌ 이메일 수집시 알려지지 않은 오류: {e}")
 
@@ -0,0 +1,443 @@
+"""file_catalog.py — data_dir 파일 목록과 보관 정책
+=================================================
+`data_dir` 에는 날짜 폴더마다 수집 DB(`fm_*.db`)와 `attach/` 첨부가 계속
+쌓입니다. 무엇을 지워도 되는지 알려고 몇 년 치 폴더를 `os.walk` 로 훑으면
+몇 분이 걸리므로, 파일을 쓸 때와 업로드가 확인될 때 `data_dir/file_catalog.db`
+에 기록해 두고 정리는 이 목록만 보고 합니다.
+
+• 수집 1회(DB 1개)가 `catalog_run` 1줄, 그 DB 와 첨부 파일이 `catalog_file`
+  여러 줄입니다. 수집 직후(`record_run`)에 넣고, 업로드 대기열이 업로드를
+  마치면(`record_upload`, 원격 크기·해시 확인 뒤) 업로드 시각을 적습니다.
+• 보관 정책 (`prune`) — 업로드가 확인된 수집만 지웁니다.
+  - `RETENTION_DAYS`   : 업로드 후 N일 지난 로컬 DB·첨부 삭제 (0 = 끔)
+  - `RETENTION_MAX_GB` : 목록의 로컬 파일 합계가 넘으면 오래 전에 업로드된
+    수집부터 삭제 (0 = 끔). 아직 올리지 못한 파일은 지우지 않습니다.
+• 업로드 스레드(`upload_outbox`)가 업로드를 마칠 때 한 시간에 한 번 정리합니다.
+  삭제한 파일은 업로드 매니페스트에서도 지우고, 비게 된 `attach/`·날짜
+  폴더도 지웁니다.
+• 목록이 생기기 전 파일은 `backfill` 로 한 번만 훑어 넣습니다.
+
+사용법
+-----
+$ python file_catalog.py stats
+$ python file_catalog.py prune --dry-run          # 지울 대상만 출력
+$ python file_catalog.py prune --days 30
+$ python file_catalog.py backfill                 # 기존 fm_*.db 등록 (업로드 여부는 대기열 기록으로)
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from exceptions import DBQueryError, DBWriteError
+from logger import get_logger
+
+__all__ = ["FileCatalog", "PruneResult", "maybe_prune", "prune", "record_run", "record_upload"]
+
+logger = get_logger()
+
+GB = 1024 ** 3
+_PRUNE_EVERY = 3600               # 업로드 스레드에서 정리하는 최소 간격(초)
+
+
+@dataclass(slots=True)
+class PruneResult:
+    runs: int = 0
+    files: int = 0
+    bytes: int = 0
+    missing: int = 0              # 이미 없던 파일 (다른 곳에서 지움)
+    errors: int = 0               # 지우지 못한 파일 (열려 있음 등) — 다음에 다시
+
+
+class FileCatalog:
+    """`file_catalog.db` — 수집별 로컬 파일과 업로드 시각."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with self._connect() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS catalog_run (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        db_path TEXT NOT NULL UNIQUE,    -- 수집 DB
+                        created_at TEXT NOT NULL,
+                        uploaded_at TEXT,                -- 업로드 확인 시각, 아직이면 NULL
+                        deleted_at TEXT,                 -- 로컬 파일 정리 시각
+                        files INTEGER NOT NULL DEFAULT 0,
+                        bytes INTEGER NOT NULL DEFAULT 0 -- 로컬에 남은 바이트
+                    )
+                """)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS catalog_file (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        run_id INTEGER NOT NULL REFERENCES catalog_run(id),
+                        path TEXT NOT NULL UNIQUE,
+                        kind TEXT NOT NULL,              -- db / attach
+                        size INTEGER NOT NULL DEFAULT 0,
+                        deleted_at TEXT
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_catalog_run_uploaded "
+                             "ON catalog_run (uploaded_at) WHERE deleted_at IS NULL")
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_catalog_file_run ON catalog_file (run_id)")
+                conn.execute("CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value TEXT)")
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 파일 목록 생성 실패: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # 수집 스레드(record_run)와 업로드 스레드(record_upload, prune)가 함께 쓴다
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    # ── 기록 ──
+    def add_run(self, db_path: str | Path, files: list[tuple[str, str, int]]) -> None:
+        """수집 1회의 파일 `(경로, 종류, 크기)` 추가 — 같은 DB 에 다시 저장했으면 합친다.
+
+        다시 저장한 DB 는 새 파일이 아직 업로드되지 않았으므로 업로드 시각을 지운다
+        (업로드 대기열이 다시 올리면 `mark_uploaded`).
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        try:
+            with self._connect() as conn:
+                conn.execute("""
+                    INSERT INTO catalog_run (db_path, created_at) VALUES (?, ?)
+                    ON CONFLICT(db_path) DO UPDATE SET uploaded_at = NULL, deleted_at = NULL
+                """, (str(db_path), now))
+                run_id = conn.execute("SELECT id FROM catalog_run WHERE db_path = ?",
+                                      (str(db_path),)).fetchone()[0]
+                conn.executemany("""
+                    INSERT INTO catalog_file (run_id, path, kind, size) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET size = excluded.size, deleted_at = NULL
+                """, [(run_id, str(p), kind, size) for p, kind, size in files])
+                conn.execute("""
+                    UPDATE catalog_run
+                       SET files = (SELECT COUNT(*) FROM catalog_file WHERE run_id = ? AND deleted_at IS NULL),
+                           bytes = (SELECT COALESCE(SUM(size), 0) FROM catalog_file
+                                     WHERE run_id = ? AND deleted_at IS NULL)
+                     WHERE id = ?
+                """, (run_id, run_id, run_id))
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 파일 목록 기록 실패: {e}")
+
+    def has_run(self, db_path: str | Path) -> bool:
+        try:
+            with self._connect() as conn:
+                return conn.execute("SELECT 1 FROM catalog_run WHERE db_path = ?",
+                                    (str(db_path),)).fetchone() is not None
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 파일 목록 조회 오류: {e}")
+
+    def mark_uploaded(self, db_path: str | Path, when: str | None = None) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute("UPDATE catalog_run SET uploaded_at = ? WHERE db_path = ?",
+                             (when or datetime.now().isoformat(timespec="seconds"), str(db_path)))
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 파일 목록 기록 실패: {e}")
+
+    # ── 정리 대상 ──
+    def expired_runs(self, before: datetime) -> list[tuple[int, str, int]]:
+        """`before` 전에 업로드가 확인된, 로컬 파일이 남은 수집 `(id, db_path, bytes)`."""
+        return self._runs("uploaded_at < ?", (before.isoformat(timespec="seconds"),))
+
+    def uploaded_runs(self) -> list[tuple[int, str, int]]:
+        """업로드가 확인된, 로컬 파일이 남은 수집 — 오래 전에 올린 것부터."""
+        return self._runs("uploaded_at IS NOT NULL", ())
+
+    def _runs(self, where: str, params: tuple) -> list[tuple[int, str, int]]:
+        try:
+            with self._connect() as conn:
+                return conn.execute(f"""
+                    SELECT id, db_path, bytes FROM catalog_run
+                     WHERE deleted_at IS NULL AND {where}
+                     ORDER BY uploaded_at, id
+                """, params).fetchall()
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 파일 목록 조회 오류: {e}")
+
+    def run_files(self, run_id: int) -> list[tuple[int, str, int]]:
+        try:
+            with self._connect() as conn:
+                return conn.execute("""
+                    SELECT id, path, size FROM catalog_file
+                     WHERE run_id = ? AND deleted_at IS NULL
+                     ORDER BY kind DESC, id            -- 첨부 먼저, DB 는 마지막에
+                """, (run_id,)).fetchall()
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 파일 목록 조회 오류: {e}")
+
+    def mark_deleted(self, run_id: int, file_ids: list[int], remaining: int) -> None:
+        """삭제한 파일 표시. 남은 파일이 없으면 수집도 정리 완료."""
+        now = datetime.now().isoformat(timespec="seconds")
+        try:
+            with self._connect() as conn:
+                conn.executemany("UPDATE catalog_file SET deleted_at = ? WHERE id = ?",
+                                 [(now, i) for i in file_ids])
+                conn.execute("""
+                    UPDATE catalog_run
+                       SET files = (SELECT COUNT(*) FROM catalog_file WHERE run_id = ? AND deleted_at IS NULL),
+                           bytes = (SELECT COALESCE(SUM(size), 0) FROM catalog_file
+                                     WHERE run_id = ? AND deleted_at IS NULL),
+                           deleted_at = CASE WHEN ? = 0 THEN ? END
+                     WHERE id = ?
+                """, (run_id, run_id, remaining, now, run_id))
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 파일 목록 기록 실패: {e}")
+
+    def total_bytes(self) -> int:
+        try:
+            with self._connect() as conn:
+                return conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM catalog_run "
+                                    "WHERE deleted_at IS NULL").fetchone()[0]
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 파일 목록 조회 오류: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        try:
+            with self._connect() as conn:
+                row = conn.execute("""
+                    SELECT COUNT(*), COALESCE(SUM(files), 0), COALESCE(SUM(bytes), 0),
+                           COALESCE(SUM(uploaded_at IS NULL), 0),
+                           COALESCE(SUM(CASE WHEN uploaded_at IS NULL THEN bytes END), 0),
+                           MIN(uploaded_at)
+                      FROM catalog_run WHERE deleted_at IS NULL
+                """).fetchone()
+                deleted = conn.execute("SELECT COUNT(*) FROM catalog_run "
+                                       "WHERE deleted_at IS NOT NULL").fetchone()[0]
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 파일 목록 조회 오류: {e}")
+        return {"runs": row[0], "files": row[1], "bytes": row[2], "not_uploaded": row[3],
+                "not_uploaded_bytes": row[4], "oldest_upload": row[5], "pruned_runs": deleted}
+
+    # ── 메타 ──
+    def get_meta(self, key: str) -> str | None:
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value FROM catalog_meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 파일 목록 조회 오류: {e}")
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO catalog_meta (key, value) VALUES (?, ?)", (key, value))
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 파일 목록 기록 실패: {e}")
+
+
+# ─────────────────────────────── 기록 ─────────────────────────────────
+
+def _run_files_from_records(config, db_path: Path, email_data_list: list[dict]) -> list[tuple[str, str, int]]:
+    files = [(str(db_path), "db", db_path.stat().st_size)]
+    for email in email_data_list:
+        for a in email.get("attach_files", []):
+            files.append((str(config.data_dir / a["save_folder"] / a["phy_file_name"]), "attach",
+                          a.get("file_size") or 0))
+    return files
+
+
+def _run_files_from_db(config, db_path: Path) -> list[tuple[str, str, int]]:
+    """목록에 없던 수집 DB — DB 안의 첨부 목록으로 (파일 시스템은 훑지 않음)."""
+    try:
+        with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as conn:
+            rows = conn.execute("SELECT save_folder, phy_file_name, file_size FROM fund_mail_attach").fetchall()
+    except sqlite3.Error as e:
+        raise DBQueryError(f"❌ 첨부 목록 조회 오류: {db_path}: {e}")
+    return [(str(db_path), "db", db_path.stat().st_size)] + [
+        (str(config.data_dir / (folder or "") / (name or "")), "attach", size or 0)
+        for folder, name, size in rows]
+
+
+def record_run(config, db_path: str | Path, email_data_list: list[dict]) -> None:
+    """수집 직후 — 이번에 쓴 DB·첨부를 목록에 넣는다. 실패해도 수집은 계속한다."""
+    try:
+        FileCatalog(config.file_catalog_file).add_run(
+            db_path, _run_files_from_records(config, Path(db_path), email_data_list))
+    except Exception as e:  # noqa: BLE001 — 목록 기록 실패로 수집을 실패시키지 않음
+        logger.warning(f"⚠️ 파일 목록 기록 실패: {db_path}: {e}")
+
+
+def record_upload(config, db_path: str | Path) -> None:
+    """업로드 확인 후 — 업로드 시각 기록 (목록에 없던 DB 면 DB 내용으로 등록)."""
+    try:
+        catalog = FileCatalog(config.file_catalog_file)
+        if not catalog.has_run(db_path):
+            catalog.add_run(db_path, _run_files_from_db(config, Path(db_path)))
+        catalog.mark_uploaded(db_path)
+    except Exception as e:  # noqa: BLE001
+        logger.warning(f"⚠️ 파일 목록에 업로드 기록 실패: {db_path}: {e}")
+
+
+# ─────────────────────────────── 정리 ─────────────────────────────────
+
+def _remove_empty_dirs(paths: set[Path], stop: Path) -> None:
+    """비게 된 `attach/`·날짜 폴더 삭제 (`stop` 위로는 올라가지 않음)."""
+    for folder in sorted(paths, key=lambda p: len(p.parts), reverse=True):
+        while folder != stop and stop in folder.parents:
+            try:
+                folder.rmdir()                   # 비어 있지 않으면 OSError
+            except OSError:
+                break
+            folder = folder.parent
+
+
+def _delete_run(catalog: FileCatalog, run_id: int, result: PruneResult, dry_run: bool,
+                touched: set[Path]) -> list[str]:
+    files = catalog.run_files(run_id)
+    deleted_ids, deleted_paths = [], []
+    for file_id, path, size in files:
+        if dry_run:
+            result.files += 1
+            result.bytes += size
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            result.missing += 1
+        except OSError as e:
+            result.errors += 1
+            logger.warning(f"⚠️ 보관 기간 정리: 파일을 지울 수 없습니다 (다음에 다시): {path}: {e}")
+            continue
+        else:
+            result.files += 1
+            result.bytes += size
+        deleted_ids.append(file_id)
+        deleted_paths.append(path)
+        touched.add(Path(path).parent)
+    if not dry_run:
+        catalog.mark_deleted(run_id, deleted_ids, len(files) - len(deleted_ids))
+    result.runs += 1
+    return deleted_paths
+
+
+def prune(config, days: int | None = None, max_gb: float | None = None,
+          dry_run: bool = False) -> PruneResult:
+    """업로드가 확인된 수집의 로컬 파일을 보관 정책대로 지운다."""
+    days = config.retention_days if days is None else days
+    max_gb = config.retention_max_gb if max_gb is None else max_gb
+    catalog = FileCatalog(config.file_catalog_file)
+    result = PruneResult()
+    touched: set[Path] = set()
+    deleted_paths: list[str] = []
+    done: set[int] = set()
+
+    if days > 0:
+        for run_id, _, _ in catalog.expired_runs(datetime.now() - timedelta(days=days)):
+            deleted_paths += _delete_run(catalog, run_id, result, dry_run, touched)
+            done.add(run_id)
+    if max_gb > 0:
+        limit = int(max_gb * GB)
+        total = catalog.total_bytes() - (result.bytes if dry_run else 0)
+        for run_id, _, nbytes in catalog.uploaded_runs():
+            if total <= limit:
+                break
+            if run_id in done:
+                continue
+            deleted_paths += _delete_run(catalog, run_id, result, dry_run, touched)
+            total -= nbytes
+        if total > limit:
+            logger.warning(f"⚠️ 로컬 파일 {total / GB:.1f} GB 가 RETENTION_MAX_GB({max_gb}) 를 넘지만 "
+                           f"나머지는 아직 업로드되지 않아 지우지 않습니다.")
+
+    if not dry_run:
+        _remove_empty_dirs(touched, config.data_dir)
+        if deleted_paths:
+            _forget_uploads(config, deleted_paths)
+        catalog.set_meta("last_prune", str(time.time()))
+    if result.runs and not dry_run:
+        logger.info(f"🧹 보관 기간 정리: 수집 {result.runs}건, 파일 {result.files}개, "
+                    f"{result.bytes / 1024 / 1024:.1f} MB 삭제")
+    return result
+
+
+def _forget_uploads(config, paths: list[str]) -> None:
+    from upload_manifest import UploadManifest
+
+    try:
+        UploadManifest(config.upload_manifest_file).forget(paths)
+    except Exception as e:  # noqa: BLE001 — 매니페스트 줄이 남아도 동작에는 문제없음
+        logger.warning(f"⚠️ 업로드 매니페스트 정리 실패: {e}")
+
+
+def maybe_prune(config) -> PruneResult | None:
+    """보관 정책이 켜져 있고 마지막 정리 후 한 시간이 지났으면 정리 (업로드 스레드용)."""
+    if config.retention_days <= 0 and config.retention_max_gb <= 0:
+        return None
+    try:
+        last = FileCatalog(config.file_catalog_file).get_meta("last_prune")
+        if last is not None and time.time() - float(last) < _PRUNE_EVERY:
+            return None
+        return prune(config)
+    except Exception as e:  # noqa: BLE001 — 정리 실패는 업로드에 영향 없음
+        logger.warning(f"⚠️ 보관 기간 정리 실패: {e}")
+        return None
+
+
+def backfill(config) -> int:
+    """목록이 생기기 전의 수집 DB 를 등록 (한 번만 data_dir 를 훑는다).
+
+    업로드 대기열에서 완료된 DB 는 그 완료 시각을 업로드 시각으로 쓴다.
+    """
+    catalog = FileCatalog(config.file_catalog_file)
+    done_at: dict[str, str] = {}
+    if config.upload_outbox_file.exists():
+        try:
+            with sqlite3.connect(config.upload_outbox_file) as conn:
+                done_at = dict(conn.execute("SELECT db_path, done_at FROM upload_outbox "
+                                            "WHERE status = 'done' AND done_at IS NOT NULL"))
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 업로드 대기열 조회 오류: {e}")
+    added = 0
+    for db_path in sorted(config.data_dir.glob("*/fm_*.db")):
+        if catalog.has_run(db_path):
+            continue
+        catalog.add_run(db_path, _run_files_from_db(config, db_path))
+        if str(db_path) in done_at:
+            catalog.mark_uploaded(db_path, done_at[str(db_path)])
+        added += 1
+    return added
+
+
+# ─────────────────────────────── CLI ─────────────────────────────────
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="data_dir 파일 목록과 보관 정책")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="목록 현황")
+    p = sub.add_parser("prune", help="보관 정책대로 로컬 파일 삭제")
+    p.add_argument("--days", type=int, help="업로드 후 N일 지난 파일 (기본: RETENTION_DAYS)")
+    p.add_argument("--max-gb", type=float, help="로컬 파일 상한 GB (기본: RETENTION_MAX_GB)")
+    p.add_argument("--dry-run", action="store_true", help="지우지 않고 대상만 출력")
+    sub.add_parser("backfill", help="목록에 없는 기존 수집 DB 등록")
+    return parser.parse_args()
+
+
+def main() -> None:
+    from config import Config
+
+    args = _parse_args()
+    cfg = Config.load()
+    if args.cmd == "stats":
+        s = FileCatalog(cfg.file_catalog_file).stats()
+        print(f"수집 {s['runs']}건, 파일 {s['files']}개, {s['bytes'] / GB:.2f} GB "
+              f"(업로드 전 {s['not_uploaded']}건 {s['not_uploaded_bytes'] / GB:.2f} GB)")
+        print(f"가장 오래된 업로드: {s['oldest_upload'] or '-'}, 정리된 수집: {s['pruned_runs']}건")
+    elif args.cmd == "prune":
+        r = prune(cfg, args.days, args.max_gb, dry_run=args.dry_run)
+        label = "삭제 대상" if args.dry_run else "삭제"
+        print(f"{label}: 수집 {r.runs}건, 파일 {r.files}개, {r.bytes / 1024 / 1024:.1f} MB"
+              + (f", 이미 없음 {r.missing}개" if r.missing else "")
+              + (f", 실패 {r.errors}개" if r.errors else ""))
+    else:
+        print(f"등록한 수집 DB: {backfill(cfg)}개")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""graph_cassette.py — Graph 응답 녹화/재생
+==========================================
+운영에서 느렸거나 실패한 수집을 그대로 다시 돌려 보기 위한 도구입니다.
+
+• record : 수집 1회 동안 Graph 요청/응답(목록 페이지, 본문, 첨부)을
+  gzip JSON-lines 파일(`.cassette.gz`) 하나에 기록합니다.
+• replay : 같은 파일에서 응답을 꺼내 `fetch_email_from_office365` 에
+  돌려줍니다. 네트워크·토큰 발급 없이 로컬 속도로 돌므로 DB·파일·업로드
+  단계를 네트워크 편차 없이 프로파일링할 수 있습니다.
+
+설정은 `.env` 의 `GRAPH_CASSETTE` (파일 또는 폴더) 와
+`GRAPH_CASSETTE_MODE` (record / replay) 입니다. 폴더를 주면 녹화는
+실행마다 `graph_<시각>.cassette.gz` 를 새로 만들고(최근 50개 유지),
+재생은 가장 최근 파일을 씁니다.
+
+정리(sanitize)
+-------------
+• 요청 헤더(Authorization 토큰 포함)는 저장하지 않습니다.
+• URL 의 Graph 주소와 메일 계정은 `{user}` 로 바꿔 저장하므로 다른
+  계정·가짜 서버 주소에서도 재생됩니다.
+• 응답 본문(메일 내용·첨부)은 그대로 들어 있으므로 파일은 소유자만 읽을
+  수 있게 만듭니다(0600).
+
+재생은 녹화 시작 시점의 커서(LAST_TIME.json)를 먼저 되돌려 같은 요청이
+같은 순서로 나가게 합니다 (커서 없이 녹화한 첫 수집이면 커서를 지움).
+수집 DB·첨부·커서를 새로 쓰므로 운영과 다른 `DATA_DIR` 에서만 재생합니다 —
+LAST_TIME.json 이나 수집 DB 가 있는 폴더는 재생 표시 파일
+(`.graph_cassette_replay`)이 없으면 `GraphCassetteError` 로 거부합니다.
+녹화에 없는 요청도 `GraphCassetteError`.
+"""
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import os
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from exceptions import GraphCassetteError
+from logger import get_logger
+from run_state import get_run_state
+
+__all__ = ["cassette", "read_header"]
+
+logger = get_logger()
+
+FORMAT_VERSION = 1
+SUFFIX = ".cassette.gz"
+_KEEP_HEADERS = ("Content-Type", "Retry-After")
+_KEEP = 50                      # 폴더에 녹화할 때 남길 최근 파일 수
+_REPLAY_MARKER = ".graph_cassette_replay"   # 재생 전용 DATA_DIR 표시
+
+
+def _request_key(request: requests.PreparedRequest, config) -> str:
+    """`GET /users/{user}/messages?$filter=...` — 주소·계정을 뺀 요청 식별자."""
+    url = urlsplit(request.url)
+    path = url.path
+    base_path = urlsplit(config.graph_base_url).path.rstrip("/")
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path):]
+    for user in {config.email_user_id, quote(config.email_user_id)}:
+        path = path.replace(f"/users/{user}/", "/users/{user}/")
+        if path.endswith(f"/users/{user}"):
+            path = path[: -len(user)] + "{user}"
+    query = urlencode(sorted(parse_qsl(url.query, keep_blank_values=True)),
+                      safe="$:,@", quote_via=quote)
+    return f"{request.method} {path}" + (f"?{query}" if query else "")
+
+
+def _resolve(path: Path, mode: str) -> Path:
+    if not path.is_dir():
+        return path
+    if mode == "record":
+        return path / f"graph_{datetime.now():%Y%m%d_%H%M%S}{SUFFIX}"
+    files = sorted(path.glob(f"*{SUFFIX}"), key=lambda p: p.stat().st_mtime)
+    if not files:
+        raise GraphCassetteError(f"재생할 녹화 파일이 없습니다: {path}")
+    return files[-1]
+
+
+def read_header(path: str | Path) -> dict:
+    """녹화 파일 첫 줄(녹화 시각·one_day·시작 커서)."""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            header = json.loads(fh.readline())
+    except (OSError, ValueError) as e:
+        raise GraphCassetteError(f"녹화 파일을 읽을 수 없습니다: {path}: {e}") from e
+    if header.get("cassette") != FORMAT_VERSION:
+        raise GraphCassetteError(f"지원하지 않는 녹화 파일 형식입니다: {path}")
+    return header
+
+
+class _RecordAdapter(BaseAdapter):
+    """실제 어댑터로 보내고 응답을 녹화 파일에 한 줄씩 추가."""
+
+    def __init__(self, inner: BaseAdapter, fh, config):
+        super().__init__()
+        self.inner = inner
+        self.fh = fh
+        self.config = config
+        self.count = 0
+
+    def send(self, request, **kwargs):
+        response = self.inner.send(request, **kwargs)
+        entry = {
+            "key": _request_key(request, self.config),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {k: response.headers[k] for k in _KEEP_HEADERS if k in response.headers},
+        }
+        content = response.content
+        try:
+            entry["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["b64"] = base64.b64encode(content).decode("ascii")
+        self.fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.count += 1
+        return response
+
+    def close(self):
+        pass                               # 실제 어댑터는 세션이 계속 쓴다
+
+
+class _ReplayAdapter(BaseAdapter):
+    """녹화된 응답을 요청 식별자별로 녹화 순서대로 돌려준다."""
+
+    def __init__(self, path: Path, config):
+        super().__init__()
+        self.config = config
+        self.entries: dict[str, deque[dict]] = defaultdict(deque)
+        self.count = 0
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            fh.readline()                  # 헤더
+            for line in fh:
+                entry = json.loads(line)
+                self.entries[entry["key"]].append(entry)
+
+    def send(self, request, **kwargs):
+        key = _request_key(request, self.config)
+        queue = self.entries.get(key)
+        if not queue:
+            raise GraphCassetteError(f"녹화에 없는 요청입니다: {key}")
+        entry = queue.popleft() if len(queue) > 1 else queue[0]   # 마지막 응답은 계속 재사용
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason")
+        response.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        response._content = (entry["text"].encode("utf-8") if "text" in entry
+                             else base64.b64decode(entry["b64"]))
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        self.count += 1
+        return response
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def _record(config, session: requests.Session, one_day: str | None) -> Iterator[None]:
+    path = _resolve(config.graph_cassette, "record")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    state = get_run_state(config)
+    state.refresh()
+    prefix = config.graph_base_url
+    fh = gzip.open(tmp, "wt", encoding="utf-8")
+    adapter = _RecordAdapter(session.get_adapter(prefix), fh, config)
+    try:
+        fh.write(json.dumps({
+            "cassette": FORMAT_VERSION,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "one_day": one_day,
+            "state": {"last_fetch_time": state.data.get("last_fetch_time"),
+                      "last_email_id": state.last_email_id},
+        }, ensure_ascii=False) + "\n")
+        session.mount(prefix, adapter)
+        yield
+    finally:
+        # 실패한 실행도 남긴다 — 디버깅 대상
+        session.adapters.pop(prefix, None)
+        fh.close()
+        try:
+            os.chmod(tmp, 0o600)           # 메일 내용 포함 (Windows 에서는 무시됨)
+        except OSError:
+            pass
+        os.replace(tmp, path)
+        logger.info(f"📼 Graph 응답 {adapter.count}건 녹화: {path}")
+        if config.graph_cassette.is_dir():
+            for old in sorted(config.graph_cassette.glob(f"graph_[0-9]*{SUFFIX}"))[:-_KEEP]:
+                old.unlink(missing_ok=True)
+
+
+def _claim_replay_dir(config) -> None:
+    """재생해도 되는 DATA_DIR 인지 확인하고 재생 전용으로 표시한다.
+
+    운영 폴더(LAST_TIME.json 이나 날짜 폴더의 수집 DB 가 있음)는 이전 재생이
+    표시해 둔 폴더가 아니면 거부 — 운영 커서를 녹화 시점으로 되돌리지 않도록.
+    """
+    data_dir = config.data_dir
+    marker = data_dir / _REPLAY_MARKER
+    if marker.exists():
+        return
+    if config.last_time_file.exists() or next(data_dir.glob("*/fm_*.db"), None) is not None:
+        raise GraphCassetteError(
+            f"❌ 녹화 재생은 운영과 다른 빈 DATA_DIR 에서만 합니다 (커서·DB 덮어쓰기 방지): {data_dir}")
+    data_dir.mkdir(parents=True, exist_ok=True)
+    marker.write_text("graph_cassette replay\n", encoding="utf-8")
+
+
+@contextmanager
+def _replay(config, session: requests.Session, one_day: str | None) -> Iterator[None]:
+    path = _resolve(config.graph_cassette, "replay")
+    header = read_header(path)
+    if header.get("one_day") != one_day:
+        logger.warning(f"⚠️ 녹화(one_day={header.get('one_day')})와 재생(one_day={one_day}) 조건이 다릅니다.")
+    _claim_replay_dir(config)
+    recorded = header.get("state") or {}
+    # 녹화 시작 시점의 커서로 되돌려 같은 요청이 나가게 한다.
+    # 커서 없이 녹화한 첫 수집이면 커서를 비워 같은 "최신 1건" 요청이 나가게 한다
+    get_run_state(config).commit(recorded.get("last_fetch_time"), recorded.get("last_email_id") or "",
+                                 "(graph_cassette replay)")
+    adapter = _ReplayAdapter(path, config)
+    prefix = config.graph_base_url
+    session.mount(prefix, adapter)
+    logger.info(f"📼 Graph 녹화 재생: {path} ({header.get('recorded_at')})")
+    try:
+        yield
+    finally:
+        session.adapters.pop(prefix, None)
+        logger.info(f"📼 Graph 응답 {adapter.count}건 재생")
+
+
+def cassette(config, session: requests.Session, one_day: str | None = None):
+    """`GRAPH_CASSETTE_MODE` 에 따라 이 세션의 Graph 요청을 녹화/재생 (끄면 아무 일도 안 함)."""
+    if config.graph_cassette_mode == "record":
+        return _record(config, session, one_day)
+    if config.graph_cassette_mode == "replay":
+        return _replay(config, session, one_day)
+    return _noop()
+
+
+@contextmanager
+def _noop() -> Iterator[None]:
+    yield
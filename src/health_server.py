@@ -0,0 +1,183 @@
+"""health_server.py — 상주 프로세스 상태/지표 HTTP 엔드포인트
+=============================================================
+서비스(`TaskScheduler`)와 데몬이 살아서 수집하고 있는지를 로그를 읽지
+않고 확인하기 위한 작은 HTTP 서버입니다. `HEALTH_PORT` 를 주면 켜집니다.
+
+• `GET /health`  : JSON — 상태, 마지막 수집 성공 후 경과 시간, 스케줄러
+  상태(실행 중 / 멈춤, 현재 간격, 멈추게 한 예외), 업로드 대기열 건수.
+  정상이면 200, 멈췄거나(stopped) 수집이 오래 성공하지 않았으면(stalled) 503.
+• `GET /metrics` : Prometheus text format — 실행 수, 카운터 합계, 실행·단계
+  소요 시간 히스토그램(`metrics.render_prometheus`)과 위 상태 게이지.
+
+상태 판단
+--------
+• stopped  : 스케줄러가 예외로 멈춤 (서비스는 RUNNING 이어도)
+• stalled  : 마지막 수집 성공(없으면 서버 시작)이 `HEALTH_STALE_SECONDS`
+  보다 오래됨. 0 이면 서비스는 현재 간격 × 3, 데몬은 판단하지 않음
+  (수집 요청이 언제 올지 모름).
+• starting : 아직 성공한 수집은 없지만 기준 시간 안
+• ok
+
+기본은 `127.0.0.1` 에서만 받습니다(`HEALTH_HOST`). 인증이 없으므로 외부
+수집기를 위해 열 때는 방화벽으로 막아 주세요.
+
+사용 예::
+
+    health = HealthServer(cfg, state=lambda: {"state": "running", ...}).start()
+    ...
+    health.stop()
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+import metrics
+from logger import get_logger
+
+__all__ = ["HealthServer"]
+
+logger = get_logger()
+
+STATUS_OK = "ok"
+STATUS_STARTING = "starting"
+STATUS_STALLED = "stalled"
+STATUS_STOPPED = "stopped"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):   # noqa: A002 — 주기적 조회로 로그를 채우지 않음
+        pass
+
+    def _send(self, status: int, body: str, content_type: str) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:  # noqa: N802
+        server: HealthServer = self.server.health
+        path = self.path.split("?", 1)[0].rstrip("/")
+        try:
+            if path == "/health":
+                report = server.health()
+                code = 200 if report["status"] in (STATUS_OK, STATUS_STARTING) else 503
+                self._send(code, json.dumps(report, ensure_ascii=False) + "\n",
+                           "application/json; charset=utf-8")
+            elif path == "/metrics":
+                self._send(200, server.render_metrics(), "text/plain; version=0.0.4; charset=utf-8")
+            else:
+                self._send(404, "not found\n", "text/plain; charset=utf-8")
+        except Exception as e:  # noqa: BLE001 — 조회 실패가 수집 프로세스를 건드리지 않도록
+            logger.warning(f"⚠️ 상태 조회 처리 실패 ({path}): {e}")
+            self._send(500, f"{type(e).__name__}: {e}\n", "text/plain; charset=utf-8")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class HealthServer:
+    """`/health` · `/metrics` 를 응답하는 백그라운드 HTTP 서버.
+
+    `state` 는 조회마다 불려 현재 상태를 돌려준다::
+
+        {"state": "running" | "stopped", "stale_after": 초 | None, ...그 밖의 표시 항목}
+
+    숫자 값(`interval_seconds`, `upload_pending` 등)은 `/metrics` 에 게이지로도 나간다.
+    """
+
+    def __init__(self, config, state: Callable[[], dict[str, Any]], name: str = "service",
+                 port: int | None = None):
+        self.config = config
+        self.name = name
+        self._state = state
+        self._server = _Server((config.health_host, config.health_port if port is None else port),
+                               _Handler)
+        self._server.health = self
+        self._thread: threading.Thread | None = None
+        self.started_at = time.time()
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "HealthServer":
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="health-server", daemon=True)
+        self._thread.start()
+        logger.info(f"🩺 상태 엔드포인트: http://{self.config.health_host}:{self.port}/health")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # ─────────────────────────────── 응답 ─────────────────────────────────
+
+    def health(self) -> dict[str, Any]:
+        now = time.time()
+        state = dict(self._state())
+        default_stale = state.pop("stale_after", None)
+        stale_after = self.config.health_stale_seconds or default_stale
+        last_ok = metrics.last_success("fetch")
+        age = now - (last_ok or self.started_at)
+
+        if state.get("state") == STATUS_STOPPED:
+            status = STATUS_STOPPED
+        elif stale_after and age > stale_after:
+            status = STATUS_STALLED
+        elif last_ok is None:
+            status = STATUS_STARTING
+        else:
+            status = STATUS_OK
+
+        last_fetch = metrics.last_run("fetch")
+        return {
+            "status": status,
+            "mode": self.name,
+            "pid": os.getpid(),
+            "uptime": round(now - self.started_at, 1),
+            "last_success_at": (datetime.fromtimestamp(last_ok).isoformat(timespec="seconds")
+                                if last_ok else None),
+            "last_success_age": round(now - last_ok, 1) if last_ok else None,
+            "stale_after": stale_after,
+            "last_fetch_status": last_fetch["status"] if last_fetch else None,
+            **state,
+        }
+
+    def render_metrics(self) -> str:
+        report = self.health()
+        lines = [
+            "# HELP fund_mail_up 상태 (1 = ok/starting, 0 = stalled/stopped)",
+            "# TYPE fund_mail_up gauge",
+            f"fund_mail_up {int(report['status'] in (STATUS_OK, STATUS_STARTING))}",
+            "# HELP fund_mail_uptime_seconds 프로세스 상태 서버 가동 시간",
+            "# TYPE fund_mail_uptime_seconds gauge",
+            f"fund_mail_uptime_seconds {report['uptime']}",
+        ]
+        if report["last_success_age"] is not None:
+            lines += [
+                "# HELP fund_mail_last_success_age_seconds 마지막 수집 성공 후 경과 시간",
+                "# TYPE fund_mail_last_success_age_seconds gauge",
+                f"fund_mail_last_success_age_seconds {report['last_success_age']}",
+            ]
+        for key, value in report.items():
+            if key in ("pid", "uptime", "last_success_age", "stale_after"):
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines += [f"# TYPE fund_mail_{key} gauge", f"fund_mail_{key} {value}"]
+        return "\n".join(lines) + "\n" + metrics.render_prometheus()
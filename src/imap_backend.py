@@ -0,0 +1,414 @@
+"""imap_backend.py — IMAP 수집 백엔드 (UID 동기화 + IDLE)
+=========================================================
+`MAIL_BACKEND=imap` 이면 `fetch_email_from_office365` 가 Graph 대신 이
+모듈로 수집합니다. 결과(DB 스키마, `email_data_list` 레코드, 첨부 저장
+위치, LAST_TIME.json 커밋 순서)는 Graph 경로와 같습니다.
+
+• 연결 : XOAUTH2(`outlook.office365.com/.default` client credentials
+  토큰)로 로그인한 `IMAPClient` 1개를 실행 간에 유지합니다. 끊겼으면 다음
+  실행에서 다시 연결합니다.
+• 동기화 : 폴더별(`IMAP_FOLDERS`) UIDVALIDITY·마지막 UID 를 LAST_TIME.json
+  의 `imap` 키에 저장하고 그 뒤 UID 만 받습니다. 커서가 없거나
+  UIDVALIDITY 가 바뀌었으면 `last_fetch_time` 이후(INTERNALDATE)로 다시
+  찾고, 그것도 없으면(처음 실행) 지금 위치만 기록합니다 — Graph 의 첫 실행과
+  같습니다.
+• FETCH : 먼저 INTERNALDATE·RFC822.SIZE 만 받고, 본문+첨부(`BODY.PEEK[]`)는
+  `IMAP_FETCH_BATCH` 건(최대 32MiB)씩 한 번에 받습니다. 읽음 표시는 바꾸지
+  않습니다.
+• IDLE : `ImapIdleWatcher` 가 별도 연결로 INBOX 에 IDLE 을 걸어 두고 새
+  메일(EXISTS)이 오면 콜백합니다. 서비스(`TaskScheduler`)는 이 알림으로
+  주기를 기다리지 않고 바로 수집하고, 주기 폴링은 그대로 둡니다(놓친 알림 대비).
+
+`email_id` 는 Graph id 대신 `imap:<폴더>:<UIDVALIDITY>:<UID>` 입니다.
+`one_day` 수집은 그날(KST) 받은 메일을 찾아 저장하고 UID 커서는 바꾸지
+않습니다.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email import policy
+from email.parser import BytesParser
+from email.utils import getaddresses
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from imapclient import IMAPClient
+from imapclient.exceptions import IMAPClientError
+
+import metrics
+from db_actions import create_db_tables, save_email_data_to_db
+import file_catalog
+from exceptions import AttachFileFetchError, EmailFetchError, TokenError
+from fetch_email import (KST, get_access_token, get_ymd_path_and_dbpath, is_logo_like,
+                         make_physical_file_name)
+from logger import LogSampler, get_logger
+from mail_tagger import tag_email_list
+from run_state import get_run_state
+from upload_outbox import UploadOutbox
+
+__all__ = ["ImapConnection", "ImapIdleWatcher", "fetch_email_from_imap", "get_imap_token"]
+
+logger = get_logger()
+
+UTC = timezone.utc
+IMAP_SCOPE = "https://outlook.office365.com/.default"
+_BATCH_BYTES = 32 * 1024 * 1024      # FETCH 1회 최대 크기 (메모리 상한)
+_IDLE_RENEW = 25 * 60                 # Exchange 는 IDLE 을 30분 전후로 끊는다 → 그 전에 다시 건다
+_IDLE_POLL = 5                        # stop() 반응 시간(초)
+_RECONNECT_MAX = 300                  # 재연결 대기 상한(초)
+_FETCH_META = [b"INTERNALDATE", b"RFC822.SIZE"]
+_FETCH_BODY = [b"INTERNALDATE", b"BODY.PEEK[]"]
+
+# 실행 간 재사용하는 IMAP 연결 — 수집은 실행 잠금으로 한 번에 하나만 돈다.
+_connection: "ImapConnection | None" = None
+
+_CONNECTION_ERRORS = (IMAPClientError, OSError)
+
+
+def get_imap_token(config) -> str | None:
+    """IMAP XOAUTH2 용 토큰 (msal 토큰 캐시 공유)."""
+    return get_access_token(config, IMAP_SCOPE)
+
+
+class ImapConnection:
+    """인증된 `IMAPClient` 하나를 유지 (끊겼으면 다시 연결)."""
+
+    def __init__(self, config):
+        self.config = config
+        self.client: IMAPClient | None = None
+
+    def connect(self) -> IMAPClient:
+        if self.client is not None:
+            try:
+                self.client.noop()
+                return self.client
+            except _CONNECTION_ERRORS:
+                logger.info("🔄 IMAP 연결이 끊겨 다시 연결합니다.")
+                self.close()
+        token = get_imap_token(self.config)
+        if not token:
+            raise TokenError("❌ IMAP 토큰 발급 실패")
+        client = IMAPClient(self.config.imap_host, port=self.config.imap_port,
+                            ssl=self.config.imap_ssl, timeout=120)
+        client.normalise_times = False          # INTERNALDATE 를 시간대 포함 datetime 으로
+        try:
+            client.oauth2_login(self.config.email_user_id, token)
+        except _CONNECTION_ERRORS as e:
+            try:
+                client.shutdown()
+            except _CONNECTION_ERRORS:
+                pass
+            raise EmailFetchError(f"❌ IMAP 로그인 실패: {e}") from e
+        self.client = client
+        return client
+
+    def close(self) -> None:
+        client, self.client = self.client, None
+        if client is None:
+            return
+        try:
+            client.logout()
+        except _CONNECTION_ERRORS:
+            try:
+                client.shutdown()
+            except _CONNECTION_ERRORS:
+                pass
+
+
+def get_imap_connection(config) -> ImapConnection:
+    global _connection
+    if _connection is None or _connection.config is not config:
+        if _connection is not None:
+            _connection.close()
+        _connection = ImapConnection(config)
+    return _connection
+
+
+# ─────────────────────────────── 레코드 ─────────────────────────────────
+
+def _addresses(value: Any) -> list[tuple[str, str]]:
+    return [(name, addr) for name, addr in getaddresses([str(value)]) if addr] if value else []
+
+
+def _save_attachments(msg, email_id: str, ymd_path: Path, kst_time: str, config) -> list[dict]:
+    """첨부 파트를 Graph 경로와 같은 규칙(로고 제외, 물리 파일명, sha256)으로 저장."""
+    attach_files = []
+    attach_path = ymd_path / "attach"
+    for part in msg.iter_attachments():
+        filename = part.get_filename()
+        if not filename or part.get_content_maintype() == "message":
+            continue                                  # 첨부 메일(itemAttachment)은 Graph 처럼 건너뜀
+        file_data = part.get_payload(decode=True) or b""
+        info = {"isInline": part.get_content_disposition() == "inline",
+                "contentType": part.get_content_type(), "size": len(file_data)}
+        if is_logo_like(info):
+            logger.debug("본문 로고로 판단, 저장 생략: %s (%s)", filename, info["contentType"])
+            continue
+        if not attach_path.exists():
+            attach_path.mkdir(parents=True, exist_ok=True)
+            logger.info(f"✅ 첨부파일 폴더 생성: {attach_path}")
+        ext = os.path.splitext(filename)[1]
+        date_prefix = kst_time[:10].replace("-", "")
+        physical_filename = make_physical_file_name(prefix=date_prefix, ext=ext)
+        while (attach_path / physical_filename).exists():     # 같은 마이크로초에 저장한 첨부
+            physical_filename = make_physical_file_name(prefix=date_prefix, ext=ext)
+        try:
+            with open(attach_path / physical_filename, "wb") as f:
+                f.write(file_data)
+        except OSError as e:
+            raise AttachFileFetchError(f"❌ 첨부파일 저장 실패: {filename}: {e}") from e
+        metrics.incr("attachments")
+        metrics.incr("attach_bytes", len(file_data))
+        attach_files.append({
+            "parent_id": None,
+            "email_id": email_id,
+            "org_file_name": os.path.basename(filename),
+            "phy_file_name": physical_filename,
+            "save_folder": str(attach_path.relative_to(config.data_dir)),
+            "file_size": len(file_data),
+            "sha256": hashlib.sha256(file_data).hexdigest(),
+        })
+    return attach_files
+
+
+def _message_record(raw: bytes, internal_date: datetime, email_id: str, folder: str,
+                    ymd_path: Path, config) -> dict:
+    """RFC822 메시지 → `fetch_email_from_office365` 와 같은 email_data 레코드."""
+    msg = BytesParser(policy=policy.default).parsebytes(raw)
+    from_list = _addresses(msg.get("From"))
+    from_name, from_address = from_list[0] if from_list else ("", "")
+    sender_list = _addresses(msg.get("Sender"))
+    sender_name, sender_address = sender_list[0] if sender_list else (from_name, from_address)
+
+    received = internal_date if internal_date.tzinfo else internal_date.replace(tzinfo=UTC)
+    kst_time = received.astimezone(KST).strftime("%Y-%m-%d %H:%M:%S")
+    body = msg.get_body(preferencelist=("html", "plain"))
+    content = body.get_content() if body is not None else ""
+
+    return {
+        "email_id": email_id,
+        "subject": str(msg.get("Subject") or "") or "제목 없음",
+        "sender_address": sender_address,
+        "sender_name": sender_name,
+        "from_address": from_address,
+        "from_name": from_name,
+        "to_recipients": ", ".join(a for _, a in _addresses(msg.get("To"))) or "받는 사람 없음",
+        "cc_recipients": ", ".join(a for _, a in _addresses(msg.get("Cc"))) or "참조 없음",
+        "email_time": received.astimezone(UTC).strftime("%Y-%m-%d %H:%M:%S"),   # UTC 시각
+        "kst_time": kst_time,                                                   # KST 시각
+        "content": content or "내용 없음",
+        "note": None,
+        "msg_kind": "sent" if sender_address == config.email_user_id else "receive",
+        "folder_path": folder,
+        "attach_files": _save_attachments(msg, email_id, ymd_path, kst_time, config),
+    }
+
+
+# ─────────────────────────────── 동기화 ─────────────────────────────────
+
+def _kst_day_range(one_day: str) -> tuple[datetime, datetime]:
+    start = datetime.strptime(one_day, "%Y-%m-%d").replace(tzinfo=KST)
+    return start, start + timedelta(days=1)
+
+
+def _candidates(client: IMAPClient, last_uid: int | None, uidnext: int | None,
+                since: datetime | None, one_day: str | None
+                ) -> tuple[list[int], Callable[[datetime], bool] | None]:
+    """받을 UID 후보와 INTERNALDATE 조건 (UID 커서로 찾으면 조건 없음)."""
+    if one_day:
+        start, end = _kst_day_range(one_day)
+        # SINCE/BEFORE 는 서버 시간대 기준 날짜라 하루씩 넓혀 찾고 INTERNALDATE 로 거른다
+        uids = client.search(["SINCE", start.date() - timedelta(days=1),
+                              "BEFORE", end.date() + timedelta(days=1)])
+        return uids, lambda t: start <= t < end
+    if last_uid is not None:
+        if uidnext is not None and uidnext <= last_uid + 1:
+            return [], None                           # 새 UID 없음 — SEARCH 생략
+        return [u for u in client.search(["UID", f"{last_uid + 1}:*"]) if u > last_uid], None
+    if since is None:
+        return [], None
+    # Graph 커서(마지막 메일 시각)에서 이어받기 — 그 메일은 이미 저장됨
+    return client.search(["SINCE", since.date() - timedelta(days=1)]), lambda t: t > since
+
+
+def _batches(meta: dict[int, dict], uids: list[int], batch_size: int) -> Iterator[list[int]]:
+    """UID 를 `batch_size` 건 / `_BATCH_BYTES` 이하 묶음으로."""
+    batch: list[int] = []
+    size = 0
+    for uid in uids:
+        n = int(meta[uid].get(b"RFC822.SIZE", 0))
+        if batch and (len(batch) >= batch_size or size + n > _BATCH_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append(uid)
+        size += n
+    if batch:
+        yield batch
+
+
+def fetch_email_from_imap(config, one_day: str | None = None):
+    """IMAP 으로 새 메일을 받아 DB 에 저장하고 DB 경로를 반환 (없으면 None)."""
+    with metrics.start_run(config, "fetch", one_day=one_day, backend="imap"):
+        try:
+            return _fetch_email_from_imap(config, one_day)
+        except _CONNECTION_ERRORS as e:
+            get_imap_connection(config).close()       # 다음 실행은 새 연결로
+            raise EmailFetchError(f"❌ IMAP 수집 실패: {e}") from e
+
+
+def _fetch_email_from_imap(config, one_day: str | None):
+    state = get_run_state(config)
+    state.refresh()
+    cursors: dict[str, dict] = dict(state.data.get("imap") or {})
+    since = state.last_fetch_time if state.data.get("last_fetch_time") else None
+
+    with metrics.stage("token"):
+        client = get_imap_connection(config).connect()
+    ymd_path, db_path = get_ymd_path_and_dbpath(config, one_day)
+
+    email_data_list: list[dict] = []
+    new_cursors = dict(cursors)
+    per_mail_log = LogSampler(logger, config.log_sample_head, config.log_sample_every)
+    for folder in config.imap_folders:
+        with metrics.stage("list"):
+            info = client.select_folder(folder, readonly=True)
+            uidvalidity = int(info[b"UIDVALIDITY"])
+            uidnext = int(info[b"UIDNEXT"]) if b"UIDNEXT" in info else None
+            cursor = cursors.get(folder)
+            last_uid = None
+            if cursor and cursor.get("uidvalidity") == uidvalidity:
+                last_uid = int(cursor["last_uid"])
+            elif cursor and not one_day:
+                logger.warning(f"⚠️ {folder} UIDVALIDITY 가 바뀌어 마지막 수집 시각 이후로 다시 찾습니다.")
+            uids, accept = _candidates(client, last_uid, uidnext, since, one_day)
+            meta = client.fetch(uids, _FETCH_META) if uids else {}
+            metrics.incr("imap_requests", 2 if uids else 1)
+            uids = sorted(u for u in uids
+                          if u in meta and (accept is None or accept(meta[u][b"INTERNALDATE"])))
+
+        if not one_day:
+            if last_uid is None:
+                if since is None:
+                    logger.warning(f"⚠️ {folder}: 이전 수집 기록이 없어 지금 위치만 기록합니다.")
+                top = uidnext - 1 if uidnext else max(client.search(["ALL"]), default=0)
+                last_uid = max([top, *uids])
+            else:
+                last_uid = max([last_uid, *uids])
+            new_cursors[folder] = {"uidvalidity": uidvalidity, "last_uid": last_uid}
+
+        for batch in _batches(meta, uids, config.imap_fetch_batch):
+            with metrics.stage("body"):
+                data = client.fetch(batch, _FETCH_BODY)
+            metrics.incr("imap_requests")
+            for uid in batch:
+                item = data.get(uid)
+                if item is None or b"BODY[]" not in item:
+                    raise EmailFetchError(f"❌ IMAP FETCH 응답에 메일이 없습니다: {folder} UID {uid}")
+                with metrics.stage("attach"):
+                    record = _message_record(item[b"BODY[]"], item[b"INTERNALDATE"],
+                                             f"imap:{folder}:{uidvalidity}:{uid}", folder, ymd_path, config)
+                email_data_list.append(record)
+                per_mail_log.info("%d : %s (%s), 첨부파일 개수: %d", len(email_data_list),
+                                  record["subject"], record["kst_time"], len(record["attach_files"]))
+    per_mail_log.summary("메일")
+
+    # Graph 경로처럼 최신 메일이 맨 앞 (커서·제목 기록용)
+    email_data_list.sort(key=lambda r: r["kst_time"], reverse=True)
+    if email_data_list:
+        tag_email_list(config, email_data_list)
+        with metrics.stage("db"):
+            create_db_tables(db_path)
+            db_path = save_email_data_to_db(email_data_list, db_path)   # 커서보다 먼저 커밋
+            file_catalog.record_run(config, db_path, email_data_list)
+            UploadOutbox(config.upload_outbox_file).enqueue(db_path)   # 대기열도 커서보다 먼저
+        metrics.incr("messages", len(email_data_list))
+    else:
+        logger.warning("⚠️ IMAP: 새로 받은 메일이 없습니다.")
+        db_path = None
+
+    if not one_day and (email_data_list or new_cursors != cursors):
+        with metrics.stage("state"):
+            _commit_cursor(state, email_data_list, new_cursors)
+    return db_path
+
+
+def _commit_cursor(state, email_data_list: list[dict], cursors: dict[str, dict]) -> None:
+    data = state.data
+    if email_data_list:
+        newest = email_data_list[0]
+        kst = datetime.strptime(newest["kst_time"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=KST)
+        state.commit(kst.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"), newest["email_id"],
+                     newest["subject"], newest["kst_time"], imap=cursors)
+        logger.info(f"💾 마지막 이메일 시각 저장: {newest['kst_time']} - {newest['subject']}")
+    else:
+        state.commit(data.get("last_fetch_time"), data.get("last_email_id"), data.get("title"),
+                     data.get("last_fetch_time_kst", ""), imap=cursors)
+
+
+# ─────────────────────────────── IDLE ───────────────────────────────────
+
+class ImapIdleWatcher:
+    """별도 연결로 `folder` 에 IDLE 을 걸어 두고 새 메일이 오면 `on_new_mail()` 호출."""
+
+    def __init__(self, config, on_new_mail: Callable[[], None], folder: str = "INBOX"):
+        self.config = config
+        self.on_new_mail = on_new_mail
+        self.folder = folder
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.notifications = 0
+
+    def start(self) -> "ImapIdleWatcher":
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="imap-idle", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def _loop(self) -> None:
+        failures = 0
+        while not self._stop.is_set():
+            connection = ImapConnection(self.config)
+            try:
+                client = connection.connect()
+                client.select_folder(self.folder, readonly=True)
+                logger.info(f"📡 IMAP IDLE 대기 시작: {self.folder}")
+                failures = 0
+                self._idle(client)
+            except Exception as e:  # noqa: BLE001 — 감시 스레드는 죽지 않고 다시 연결
+                failures += 1
+                wait = min(_RECONNECT_MAX, 2 ** failures)
+                logger.warning(f"⚠️ IMAP IDLE 연결 오류, {wait}s 뒤 다시 연결: {e}")
+                self._stop.wait(wait)
+            finally:
+                connection.close()
+
+    def _idle(self, client: IMAPClient) -> None:
+        while not self._stop.is_set():
+            client.idle()
+            renew_at = time.monotonic() + _IDLE_RENEW
+            new_mail = False
+            try:
+                while not self._stop.is_set() and time.monotonic() < renew_at:
+                    responses = client.idle_check(timeout=_IDLE_POLL)
+                    if any(len(r) > 1 and r[1] in (b"EXISTS", b"RECENT") for r in responses):
+                        new_mail = True
+                        break
+            finally:
+                client.idle_done()
+            if new_mail:
+                self.notifications += 1
+                try:
+                    self.on_new_mail()
+                except Exception:  # noqa: BLE001
+                    logger.exception("⛔ 새 메일 알림 처리 중 예외")
@@ -0,0 +1,80 @@
+"""interval_policy.py — 적응형 수집 간격
+========================================
+서비스 스케줄러가 매 실행 후 다음 실행까지의 간격을 정합니다.
+
+• 업무 시간(KST, `BUSINESS_HOURS` / `BUSINESS_DAYS`)에는 더 짧은 업무 시간
+  간격(`SCHEDULER_BUSINESS_INTERVAL`)이 기준이고, 빈 실행이 이어져도 기본
+  간격(`SCHEDULER_INTERVAL`)을 넘지 않습니다.
+• 최근 실행에서 새 메일이 `SCHEDULER_BUSY_COUNT` 건 이상이면 간격을 절반씩
+  줄여 `SCHEDULER_MIN_INTERVAL` 까지 내려갑니다.
+• 빈 실행이 이어지면 1.5배씩 늘려 업무 시간 밖에서는
+  `SCHEDULER_MAX_INTERVAL` 까지 올라갑니다 (토큰·목록 조회 호출 절약).
+• 새 메일이 조금이라도 오면 다시 기준 간격(업무 시간이면 업무 시간 간격)으로
+  돌아옵니다.
+
+`SCHEDULER_ADAPTIVE=0` 이면 항상 기본 간격을 씁니다.
+
+사용 예::
+
+    policy = IntervalPolicy(cfg, base_interval=300)
+    interval = policy.next_interval(new_count)   # 초
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from logger import get_logger
+
+__all__ = ["IntervalPolicy"]
+
+logger = get_logger()
+
+KST = timezone(timedelta(hours=9))
+
+_SHRINK = 0.5      # 바쁠 때 간격 배율
+_GROW = 1.5        # 빈 실행마다 간격 배율
+
+
+class IntervalPolicy:
+    """최근 수집 건수와 업무 시간으로 다음 수집 간격(초)을 정한다."""
+
+    def __init__(self, config, base_interval: float | None = None):
+        self.config = config
+        self.base = float(base_interval or config.scheduler_interval)
+        self.min = float(min(config.scheduler_min_interval, self.base))
+        self.max = float(max(config.scheduler_max_interval, self.base))
+        self.business = float(min(max(config.scheduler_business_interval, self.min), self.base))
+        self.current = self.base
+        self.empty_runs = 0            # 연속 빈 실행 횟수
+
+    def in_business_hours(self, now: datetime | None = None) -> bool:
+        now = (now or datetime.now(KST)).astimezone(KST)
+        start, end = self.config.business_hours
+        return now.weekday() in self.config.business_days and start <= now.hour < end
+
+    def next_interval(self, new_count: int, now: datetime | None = None) -> float:
+        """이번 실행에서 새로 받은 메일 건수로 다음 간격을 정하고 로그로 남긴다."""
+        if not self.config.scheduler_adaptive:
+            return self.base
+
+        business = self.in_business_hours(now)
+        home = self.business if business else self.base   # 새 메일이 오면 돌아갈 간격
+        upper = self.base if business else self.max
+
+        if new_count >= self.config.scheduler_busy_count:
+            self.empty_runs = 0
+            self.current = max(self.min, min(self.current, home) * _SHRINK)
+            reason = "메일 많음"
+        elif new_count > 0:
+            self.empty_runs = 0
+            self.current = home
+            reason = "새 메일"
+        else:
+            self.empty_runs += 1
+            self.current = home if self.empty_runs == 1 else self.current * _GROW
+            reason = f"연속 빈 실행 {self.empty_runs}회"
+        self.current = min(max(self.current, self.min), upper)
+
+        logger.info("⏱️ 다음 수집 간격 %.0fs (새 메일 %d건, %s, %s)", self.current, new_count,
+                    reason, "업무 시간" if business else "업무 시간 외")
+        return self.current
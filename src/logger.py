@@ -4,6 +4,16 @@
   지정되지 않은 경우 `./logs` 로 자동 대체합니다.
 • 디렉터리가 없으면 `mkdir(parents=True, exist_ok=True)` 로 자동 생성합니다.
 • 로그 파일이 5 MB 를 초과하면 최대 3개까지 순환 보관(`RotatingFileHandler`).
+• 로그 파일은 첫 기록 시점에 엽니다. import 만으로 `.env` 를 읽거나
+  폴더를 만들지 않으므로 단발성 실행의 시작이 빨라집니다.
+• 로거에는 `QueueHandler` 하나만 붙이고, 파일·콘솔 쓰기와 회전 검사는
+  백그라운드 `QueueListener` 스레드가 합니다. 수집 루프는 큐에 넣고 바로
+  돌아갑니다. 남은 기록은 프로세스 종료(atexit) 때 모두 씁니다.
+• 콘솔 출력은 `LOG_CONSOLE` (기본: 콘솔이 있으면 켬) 또는
+  `set_console(False)` 로 끕니다. Windows 서비스(`FUND_MAIL_SERVICE=1`)는
+  `LOG_CONSOLE=1` 이 아니면 끕니다.
+• 반복문 안의 메일 단위 로그는 `LogSampler` 로 처음 몇 건과 N건마다만
+  남기고 나머지는 건수로 요약합니다.
 • `get_logger(name)` 로 원하는 이름의 로거를 얻거나, 모듈 전역 `logger`
   를 바로 사용하세요.
 
@@ -18,20 +28,36 @@
 """
 from __future__ import annotations
 
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 from typing import Optional
 
 # ─────────────────────────────── 설정 상수 ────────────────────────────────
 _MAX_BYTES: int = 10 * 1024 * 1024   # 10 MB
 _BACKUP_COUNT: int = 10
+_SAMPLE_HEAD: int = 10               # LogSampler: 처음 N건은 모두 기록
+_SAMPLE_EVERY: int = 100             # 그 뒤로는 N건마다 1건
+_TRUE = ("1", "true", "yes", "y", "on")
+
+_listeners: list[QueueListener] = []
+_console = {"enabled": None}         # None = LOG_CONSOLE / 서비스 여부로 판단
 
 # ────────────────────────────── 내부 헬퍼 ─────────────────────────────────
 
 def _determine_log_dir() -> Path:
     """`Config.LOG_DIR` 값을 확인하여 Path 를 반환한다. 지정되지 않았거나
-    예외가 발생하면 ./logs 로 폴백한다."""
+    예외가 발생하면 ./logs 로 폴백한다.
+
+    진입점이 이미 `Config.load()` 를 불렀다면 환경 변수에 `LOG_DIR` 가 있으므로
+    `.env` 를 다시 읽지 않는다."""
+    env_dir = os.getenv("LOG_DIR")
+    if env_dir:
+        return Path(env_dir).expanduser().resolve()
     try:
         from config import Config  # runtime import — 순환 의존 방지
         cfg = Config.load()
@@ -43,46 +69,133 @@ def _determine_log_dir() -> Path:
     return Path("./logs").expanduser().resolve()
 
 
-def _make_handlers(log_file: Path) -> list[logging.Handler]:
+class _LazyFileHandler(logging.Handler):
+    """첫 기록 때 로그 폴더를 정하고 `RotatingFileHandler` 를 만드는 핸들러."""
+
+    def __init__(self, file_name: str):
+        super().__init__()
+        self.file_name = file_name
+        self._target: Optional[RotatingFileHandler] = None
+
+    def _open(self) -> RotatingFileHandler:
+        log_dir = _determine_log_dir()
+        log_dir.mkdir(parents=True, exist_ok=True)  # 디렉터리 자동 생성
+        target = RotatingFileHandler(
+            log_dir / self.file_name,
+            maxBytes=_MAX_BYTES,
+            backupCount=_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+        target.setFormatter(self.formatter)
+        return target
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # handle() 이 self.lock 을 잡은 상태로 호출하므로 파일은 한 번만 열린다
+        if self._target is None:
+            try:
+                self._target = self._open()
+            except Exception:  # pylint: disable=broad-except
+                self.handleError(record)
+                return
+        self._target.emit(record)
+
+    def close(self) -> None:
+        if self._target is not None:
+            self._target.close()
+        super().close()
+
+
+def _console_enabled(record: logging.LogRecord) -> bool:
+    """콘솔 핸들러 필터 — writer 스레드에서 불리므로 매번 환경 변수를 봐도 된다
+    (`.env` 를 나중에 읽어도 반영됨)."""
+    if _console["enabled"] is not None:
+        return _console["enabled"]
+    val = os.getenv("LOG_CONSOLE")
+    if val not in (None, ""):
+        return val.strip().lower() in _TRUE
+    # pythonw / 서비스 exe 에는 콘솔이 없다
+    return sys.stderr is not None and not os.getenv("FUND_MAIL_SERVICE")
+
+
+def _make_handlers(file_name: str) -> list[logging.Handler]:
     fmt = logging.Formatter("%(asctime)s [%(levelname).1s] %(name)s: %(message)s")
 
-    file_handler = RotatingFileHandler(
-        log_file,
-        maxBytes=_MAX_BYTES,
-        backupCount=_BACKUP_COUNT,
-        encoding="utf-8",
-    )
+    file_handler = _LazyFileHandler(file_name)
     file_handler.setFormatter(fmt)
 
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(fmt)
+    console_handler.addFilter(_console_enabled)
 
     return [file_handler, console_handler]
 
 
+def _stop_listeners() -> None:
+    """큐에 남은 기록을 모두 쓰고 writer 스레드를 멈춘다 (atexit)."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
 # ─────────────────────────────── API ─────────────────────────────────────
 
 def get_logger(name: str = "fund_mail") -> logging.Logger:
     """콘솔과 회전 로그 파일에 동시에 기록하는 로거를 반환한다.
 
-    동일한 이름으로 반복 호출하면 중복 핸들러 없이 동일 로거를
-    반환한다."""
+    기록은 큐를 거쳐 백그라운드 스레드가 쓴다. 동일한 이름으로 반복
+    호출하면 중복 핸들러 없이 동일 로거를 반환한다."""
     logger = logging.getLogger(name)
     if logger.handlers:  # 이미 초기화 완료
         return logger
 
     logger.setLevel(logging.INFO)
 
-    log_dir = _determine_log_dir()
-    log_dir.mkdir(parents=True, exist_ok=True)  # 디렉터리 자동 생성
-
-    handlers = _make_handlers(log_dir / f"{name}.log")
-    for h in handlers:
-        logger.addHandler(h)
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *_make_handlers(f"{name}.log"),
+                             respect_handler_level=True)
+    listener.start()
+    if not _listeners:
+        atexit.register(_stop_listeners)
+    _listeners.append(listener)
+    logger.addHandler(QueueHandler(log_queue))
 
     logger.propagate = False  # 루트로 전파 방지
     return logger
 
 
+def set_console(enabled: bool) -> None:
+    """콘솔 출력 켜기/끄기 (`LOG_CONSOLE` 보다 우선)."""
+    _console["enabled"] = enabled
+
+
+class LogSampler:
+    """반복문 안의 로그를 처음 `head` 건과 `every` 건마다만 남긴다.
+
+    나머지는 건수만 세고 `summary()` 에서 한 줄로 알린다. DEBUG 가 켜져
+    있으면 모두 남긴다. `head=0` 이면 샘플링하지 않는다. 값은 호출한 쪽이
+    `Config` (`LOG_SAMPLE_HEAD` / `LOG_SAMPLE_EVERY`, 시작할 때 검사)에서 넘긴다.
+    """
+
+    def __init__(self, logger: logging.Logger, head: int | None = None, every: int | None = None):
+        self.logger = logger
+        self.head = _SAMPLE_HEAD if head is None else head
+        self.every = _SAMPLE_EVERY if every is None else every
+        self.count = 0
+        self.suppressed = 0
+
+    def info(self, msg: str, *args) -> None:
+        self.count += 1
+        if (self.head <= 0 or self.count <= self.head
+                or (self.every > 0 and self.count % self.every == 0)
+                or self.logger.isEnabledFor(logging.DEBUG)):
+            self.logger.info(msg, *args)
+        else:
+            self.suppressed += 1
+
+    def summary(self, what: str = "건") -> None:
+        if self.suppressed:
+            self.logger.info(f"… {what} {self.count}개 중 {self.suppressed}개 로그 생략 "
+                             f"(처음 {self.head}개, 이후 {self.every}개마다 기록)")
+
+
 # 모듈 전역 기본 로거 (이 파일 import 시 즉시 준비)
 logger = get_logger()
@@ -0,0 +1,335 @@
+"""mail_tagger.py — 펀드·거래상대방 키워드 태그
+==============================================
+메일 제목·본문에 어떤 펀드 코드, 펀드명, 거래상대방 이름이 나오는지를
+`fund_mail_tag` 테이블에 남깁니다. 키워드가 2천 개 안팎이라 키워드마다
+`in` / 정규식을 돌리면 메일 1건에 본문을 2천 번 훑게 되므로, 키워드 전체로
+Aho-Corasick 오토마톤을 한 번 만들고 본문은 한 번만 훑습니다 (메일 길이에
+비례, 키워드 수와 무관).
+
+키워드 파일 (`TAG_KEYWORDS_FILE`, UTF-8 CSV)::
+
+    kind,tag,keyword
+    fund,KB스타채권,KB스타채권
+    fund,KB스타채권,KB 스타 채권
+    code,K55101BT1234,K55101BT1234
+    counterparty,한국투자증권,한국투자증권
+    counterparty,한국투자증권,한투
+
+• 같은 tag 의 다른 표기는 줄을 더 씁니다. keyword 가 비어 있으면 tag 를
+  키워드로 씁니다. `#` 로 시작하는 줄은 주석.
+• 대소문자는 구분하지 않고 연속 공백은 하나로 봅니다.
+• 영문·숫자로 시작/끝나는 키워드는 앞뒤가 영문·숫자가 아닐 때만 맞습니다
+  (코드 `A123` 이 `A1234` 안에서 맞지 않도록). 한글은 조사가 붙으므로 경계를
+  보지 않습니다.
+• 본문은 HTML 태그·style·script 를 걷어낸 글자에서 찾습니다.
+• 파일이 바뀌면(수정 시각·크기) 다음 수집 때 다시 읽습니다. 새 파일에
+  오류가 있으면 경고를 남기고 이전 키워드를 계속 씁니다.
+
+사용법
+-----
+$ python mail_tagger.py check "KB 스타 채권 기준가 안내"    # 맞는 키워드 확인
+$ python mail_tagger.py retag c:/fund_mail/data/2025_01_02/fm_2025_01_02_10_00.db
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import html
+import re
+import sqlite3
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Generic, Iterable, Iterator, TypeVar
+
+from exceptions import DBWriteError, TagKeywordError
+from logger import get_logger
+import metrics
+
+__all__ = ["KeywordMatcher", "MailTagger", "get_tagger", "tag_email_list"]
+
+logger = get_logger()
+
+T = TypeVar("T")
+
+_WS = re.compile(r"\s+")
+_HTML_DROP = re.compile(r"<(style|script)\b.*?</\1\s*>|<!--.*?-->", re.S | re.I)
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def _normalize(text: str) -> str:
+    return _WS.sub(" ", text).casefold()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+def html_to_text(content: str) -> str:
+    """HTML 본문 → 글자만 (일반 텍스트는 그대로)."""
+    if "<" not in content:
+        return content
+    return html.unescape(_HTML_TAG.sub(" ", _HTML_DROP.sub(" ", content)))
+
+
+class KeywordMatcher(Generic[T]):
+    """Aho-Corasick 다중 문자열 매처 — `find(text)` 는 텍스트 길이에 비례.
+
+    패턴은 `(문자열, 값)` 으로 받고, 찾은 위치마다 `(끝 인덱스, 패턴 길이, 값)` 을 낸다.
+    """
+
+    __slots__ = ("_goto", "_fail", "_out", "_lengths", "_values")
+
+    def __init__(self, patterns: Iterable[tuple[str, T]]):
+        goto: list[dict[str, int]] = [{}]
+        out: list[tuple[int, ...]] = [()]
+        self._lengths: list[int] = []
+        self._values: list[T] = []
+        for word, value in patterns:
+            if not word:
+                continue
+            node = 0
+            for ch in word:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                node = nxt
+            out[node] += (len(self._values),)
+            self._lengths.append(len(word))
+            self._values.append(value)
+
+        # 너비 우선으로 실패 링크를 잇고, 실패 링크 쪽 출력도 합친다
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] += out[fail[nxt]]
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def find(self, text: str) -> Iterator[tuple[int, int, T]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        state = 0
+        for i, ch in enumerate(text):
+            if state == 0:
+                state = root.get(ch, 0)          # 대부분의 글자는 루트에서 바로 끝난다
+            else:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+            if out[state]:
+                for idx in out[state]:
+                    yield i, self._lengths[idx], self._values[idx]
+
+
+@dataclass(slots=True, frozen=True)
+class _Keyword:
+    kind: str
+    tag: str
+    keyword: str
+    left_bound: bool          # 영문·숫자로 시작 → 앞 글자 경계 확인
+    right_bound: bool
+
+
+_EXTRA = "\0extra"                 # 머리줄보다 열이 많은 줄의 나머지 값 (DictReader restkey)
+
+
+def load_keywords(path: Path) -> list[_Keyword]:
+    """키워드 CSV 읽기 — 형식 오류는 `TagKeywordError`."""
+    keywords: list[_Keyword] = []
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            lines = (line for line in f if line.strip() and not line.lstrip().startswith("#"))
+            reader = csv.DictReader(lines, restkey=_EXTRA)
+            if not reader.fieldnames or not {"kind", "tag"} <= {h.strip() for h in reader.fieldnames}:
+                raise TagKeywordError(f"❌ 키워드 파일 머리줄은 kind,tag,keyword 여야 합니다: {path}")
+            for n, row in enumerate(reader, 2):
+                if _EXTRA in row:
+                    raise TagKeywordError(f"❌ 키워드 파일 {n}번째 줄 열 수가 맞지 않습니다"
+                                          f" (쉼표가 든 값은 \"...\" 로 감싸 주세요): {path}")
+                row = {(k or "").strip(): (v or "").strip() for k, v in row.items()}
+                kind, tag = row.get("kind", ""), row.get("tag", "")
+                if not kind or not tag:
+                    raise TagKeywordError(f"❌ 키워드 파일 {n}번째 줄에 kind/tag 가 없습니다: {path}")
+                word = _normalize(row.get("keyword") or tag).strip()
+                keywords.append(_Keyword(kind, tag, word, _is_word_char(word[0]), _is_word_char(word[-1])))
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        raise TagKeywordError(f"❌ 키워드 파일을 읽을 수 없습니다: {path}: {e}") from e
+    except (AttributeError, TypeError, ValueError, IndexError) as e:
+        # 예상 못 한 줄 형식도 수집을 멈추지 않도록 키워드 오류로
+        raise TagKeywordError(f"❌ 키워드 파일 형식 오류: {path}: {e!r}") from e
+    return keywords
+
+
+class MailTagger:
+    """키워드 파일 1개로 만든 매처. `refresh()` 는 파일이 바뀌었을 때만 다시 만든다."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._signature: tuple[int, int] | None = None
+        self.matcher: KeywordMatcher[_Keyword] = KeywordMatcher(())
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """파일이 바뀌었으면 다시 읽는다. 다시 읽었으면 True."""
+        try:
+            st = self.path.stat()
+        except OSError as e:
+            if self._signature is None:
+                raise TagKeywordError(f"❌ 키워드 파일이 없습니다: {self.path}") from e
+            return False                      # 바꾸는 중에 잠깐 없어진 경우 — 이전 키워드 유지
+        signature = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if signature == self._signature:
+                return False
+            try:
+                keywords = load_keywords(self.path)
+            except TagKeywordError as e:
+                if self._signature is None:
+                    raise
+                logger.warning(f"⚠️ {e} — 이전 키워드 {len(self.matcher)}개를 계속 씁니다.")
+                self._signature = signature   # 같은 오류를 매번 다시 읽지 않음
+                return False
+            self.matcher = KeywordMatcher((k.keyword, k) for k in keywords)
+            self._signature = signature
+        logger.info(f"🏷️ 태그 키워드 {len(keywords)}개 읽음: {self.path}")
+        return True
+
+    def _matches(self, text: str) -> Iterator[_Keyword]:
+        text = _normalize(text)
+        last = len(text) - 1
+        for end, length, kw in self.matcher.find(text):
+            start = end - length + 1
+            if kw.left_bound and start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if kw.right_bound and end < last and _is_word_char(text[end + 1]):
+                continue
+            yield kw
+
+    def tag(self, subject: str, content: str) -> list[dict[str, Any]]:
+        """메일 1건의 태그 — (kind, tag) 별 1줄, 제목에 있었는지와 맞은 횟수."""
+        found: dict[tuple[str, str], dict[str, Any]] = {}
+        for field, text in (("subject", subject or ""), ("content", html_to_text(content or ""))):
+            for kw in self._matches(text):
+                row = found.get((kw.kind, kw.tag))
+                if row is None:
+                    row = found[(kw.kind, kw.tag)] = {"kind": kw.kind, "tag": kw.tag,
+                                                      "keyword": kw.keyword, "in_subject": 0, "hits": 0}
+                row["hits"] += 1
+                if field == "subject":
+                    row["in_subject"] = 1
+        return list(found.values())
+
+
+_taggers: dict[Path, MailTagger] = {}
+_taggers_lock = threading.Lock()
+
+
+def get_tagger(path: str | Path) -> MailTagger:
+    """경로별로 하나 (프로세스 안에서 재사용, 파일이 바뀌었으면 다시 읽음)."""
+    path = Path(path)
+    with _taggers_lock:
+        tagger = _taggers.get(path)
+        if tagger is None:
+            tagger = _taggers[path] = MailTagger(path)
+            return tagger
+    tagger.refresh()
+    return tagger
+
+
+def tag_email_list(config, email_data_list: list[dict], path: str | Path | None = None) -> None:
+    """각 레코드에 `tags` 를 채운다 (`save_email_data_to_db` 가 `fund_mail_tag` 에 저장).
+
+    `TAG_KEYWORDS_FILE` 이 없으면 아무것도 하지 않는다. 키워드 파일 문제로
+    수집을 실패시키지 않는다 — 경고만 남기고 태그 없이 저장한다.
+    """
+    if path is None and config is not None:
+        path = config.tag_keywords_file
+    if not path or not email_data_list:
+        return
+    try:
+        tagger = get_tagger(path)
+    except TagKeywordError as e:
+        logger.warning(f"⚠️ 메일 태그 생략: {e}")
+        return
+    with metrics.stage("tag"):
+        count = 0
+        for record in email_data_list:
+            record["tags"] = tagger.tag(record.get("subject", ""), record.get("content", ""))
+            count += len(record["tags"])
+    metrics.incr("tags", count)
+
+
+# ─────────────────────────────── CLI ─────────────────────────────────
+
+def retag_db(config, db_path: str | Path) -> int:
+    """저장된 DB 의 태그를 현재 키워드로 다시 만든다. 새 태그 수를 반환."""
+    from db_actions import create_db_tables
+
+    tagger = get_tagger(config.tag_keywords_file)
+    create_db_tables(db_path)                 # 예전 DB 에 fund_mail_tag 추가
+    try:
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DELETE FROM fund_mail_tag")
+            rows = []
+            for mail_id, email_id, subject, content in conn.execute(
+                    "SELECT id, email_id, subject, content FROM fund_mail"):
+                rows += [(mail_id, email_id, t["kind"], t["tag"], t["keyword"], t["in_subject"], t["hits"])
+                         for t in tagger.tag(subject, content)]
+            conn.executemany("""
+                INSERT INTO fund_mail_tag (parent_id, email_id, kind, tag, keyword, in_subject, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+    except sqlite3.Error as e:
+        raise DBWriteError(f"❌ 태그 다시 만들기 실패: {db_path}: {e}")
+    return len(rows)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="펀드·거래상대방 키워드 태그")
+    parser.add_argument("--keywords", type=Path, help="키워드 파일 (기본: TAG_KEYWORDS_FILE)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("check", help="문자열에서 맞는 키워드 보기")
+    p.add_argument("text")
+    p = sub.add_parser("retag", help="저장된 DB 의 태그 다시 만들기")
+    p.add_argument("db", nargs="+", type=Path)
+    return parser.parse_args()
+
+
+def main() -> None:
+    from dataclasses import replace
+
+    from config import Config
+
+    args = _parse_args()
+    cfg = Config.load()
+    if args.keywords:
+        cfg = replace(cfg, tag_keywords_file=args.keywords)
+    if not cfg.tag_keywords_file:
+        raise SystemExit("TAG_KEYWORDS_FILE 또는 --keywords 를 지정하세요")
+    if args.cmd == "check":
+        tags = get_tagger(cfg.tag_keywords_file).tag(args.text, "")
+        for t in tags:
+            print(f"{t['kind']:<14} {t['tag']}  ({t['keyword']}, {t['hits']}회)")
+        print(f"{len(tags)}개")
+    else:
+        for db in args.db:
+            print(f"{db}: 태그 {retag_db(cfg, db)}개")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,87 +1,240 @@
+import argparse
+import random
 import threading
 import time
 import sys
-import shutil
 from datetime import datetime
 from config import Config # noqa: E402
+from db_actions import count_emails
 from fetch_email import fetch_email_from_office365
-from sftp_upload import upload_to_sftp  # noqa: E402
+from sftp_connection import SFTPConnectionManager
+from upload_outbox import OutboxUploader
 from logger import logger
+from run_lock import RunLock
+from interval_policy import IntervalPolicy
+import profiling
+import run_history
 
 
 class TaskScheduler:
-    def __init__(self, interval=300):
-        self.interval = interval
+    """
+    고정 주기(fixed-rate) 스케줄러.
+
+    • 실행 시각은 시작 시각 + k × interval 격자에 맞춘다 → 실행 시간만큼 밀리지 않음
+    • 실행이 길어져 지나간 틱이 여러 개면 따라잡기 실행은 1번만 한다
+    • 매 실행은 프로세스 간 잠금(`run_lock`)을 잡고, 다른 프로세스(main_once 등)가
+      수집 중이면 이번 틱은 건너뛴다
+    • SCHEDULER_JITTER 초 이내의 무작위 지연을 더해 정각 몰림을 피한다
+    • 간격은 `IntervalPolicy` 가 매 실행 후 수집 건수·업무 시간으로 정한다
+    • `poke()`(IMAP IDLE 새 메일 알림)는 다음 틱을 기다리지 않고 1번 실행한다 —
+      단 직전 실행 시작 후 최소 간격(`SCHEDULER_MIN_INTERVAL`)은 지키고(그사이
+      알림은 합침), 알림 실행 시각을 새 틱 기준으로 삼아 정규 틱이 바로 뒤따르지 않는다
+    """
+
+    def __init__(self, interval=None):
         self._running = threading.Event()
         self._running.set()           # 실행 상태
-        self._timer = None            # 마지막 Timer 레퍼런스
+        self._wake = threading.Event()  # stop() / poke() 시 대기 중인 루프를 깨움
+        self._thread = None           # 주기 실행 스레드
         self.config = Config.load()  # 환경 변수 로드
+        self.policy = IntervalPolicy(self.config, base_interval=interval)
+        self.interval = self.policy.base  # 현재 간격(초)
+        self.run_lock = RunLock(self.config.run_lock_file)
+        self.sftp = SFTPConnectionManager(self.config)  # 실행 간 재사용하는 SFTP 연결
+        self.uploader = OutboxUploader(self.config, connection=self.sftp)  # 백그라운드 업로드
+        self.last_error = None        # 스케줄러를 멈추게 한 예외
+        self.health = None            # /health · /metrics 서버 (HEALTH_PORT)
+        self.idle_watcher = None      # IMAP IDLE 새 메일 알림 (MAIL_BACKEND=imap, IMAP_IDLE)
+        self.extractor = None         # 첨부 본문 색인 스레드 (ATTACH_EXTRACT)
+        if self.config.attach_extract:
+            from attach_extract import AttachTextExtractor
+            self.extractor = AttachTextExtractor(self.config)
+
+    @property
+    def is_running(self) -> bool:
+        return self._running.is_set()
+
+    def health_state(self) -> dict:
+        """`/health` 에 보일 스케줄러 상태."""
+        return {
+            "state": "running" if self.is_running else "stopped",
+            "interval_seconds": self.interval,
+            "stale_after": self.interval * 3 + self.config.scheduler_jitter,
+            "last_error": repr(self.last_error) if self.last_error is not None else None,
+            "upload_pending": self.uploader.outbox.pending_count(),
+        }
+
+    def _start_health(self):
+        if self.health is not None or not self.config.health_port:
+            return
+        from health_server import HealthServer
+        try:
+            self.health = HealthServer(self.config, self.health_state).start()
+        except OSError as e:           # 포트 사용 중 등 — 수집은 계속
+            logger.warning("⚠️ 상태 엔드포인트를 열 수 없습니다 (HEALTH_PORT=%s): %s",
+                           self.config.health_port, e)
+
+    def _start_idle_watcher(self):
+        if self.idle_watcher is not None or self.config.mail_backend != "imap" or not self.config.imap_idle:
+            return
+        from imap_backend import ImapIdleWatcher
+        self.idle_watcher = ImapIdleWatcher(self.config, self.poke).start()
+
+    def poke(self):
+        """다음 틱을 기다리지 않고 바로 수집 (새 메일 알림)."""
+        if self._running.is_set():
+            self._wake.set()
 
     def _run_task(self):
-        success = False                    # 실행 결과 플래그
+        """한 번 수집하고 새로 받은 메일 건수를 반환 (건너뛰면 None)."""
+        with profiling.profiled(self.config.log_dir, "main"), \
+                run_history.track(self.config, "main") as entry:   # run_history.db 에 1줄
+            new_count = self._run_task_once()
+            if new_count is None:
+                entry.status = run_history.STATUS_SKIPPED
+            return new_count
+
+    def _run_task_once(self):
+        if not self.run_lock.acquire():
+            logger.warning("⏭️ 다른 프로세스가 수집 중이라 이번 실행은 건너뜁니다. (%s)",
+                           self.config.run_lock_file)
+            return None
         try:
             logger.info("=" * 59)
             logger.info("⏺️ fund메일 수집이 시작됩니다.   작업 시작: %s", datetime.now())
             logger.info("=" * 59)
-            # 
-            # self.config.last_time_file의 백업을 만든다.
-            backup_path = None
-            if self.config.last_time_file.exists():
-                backup_path = self.config.last_time_file.with_suffix(self.config.last_time_file.suffix + ".previous")
-                shutil.copy2(self.config.last_time_file, backup_path)
+            # 수집이 DB 저장 → 업로드 대기열 → LAST_TIME.json 순으로 커밋하므로 백업이 필요 없다
             db_path = fetch_email_from_office365(self.config)
+            new_count = count_emails(db_path)
             if db_path: 
-                upload_to_sftp(self.config, db_path)
-    
-            if backup_path and shutil.os.path.exists(backup_path):
-                shutil.os.remove(backup_path)  # 백업 파일 삭제                
+                # 업로드는 백그라운드 스레드가 맡는다 — 수집은 SFTP 를 기다리지 않음
+                self.uploader.notify()
+                if self.extractor is not None:
+                    self.extractor.enqueue(db_path)   # 첨부 본문 추출도 별도 프로세스에서
 
             logger.info("=" * 59)
             logger.info("⏺️ fund메일 작업이 완료되었습니다. 완료 시각: %s", datetime.now())
             logger.info("=" * 59)
-            success = True                 # 여기까지 오면 정상
-        except Exception:
+            return new_count
+        except Exception as e:
             logger.info("=" * 59)
             logger.exception("⛔ fund메일 작업 중 예외 발생 - 프로그램을 종료합니다.")
             logger.info("=" * 59)
-            self.stop()                    # 타이머 취소 및 플래그 클리어
-            #백업을 복구
-            if backup_path and shutil.os.path.exists(backup_path):
-                shutil.copy2(backup_path, self.config.last_time_file)
-                logger.warning("⚠️백업된 LAST_TIME.json을 복구했습니다: %s", backup_path)
-            else:
-                logger.error("❌ 백업 파일이 존재하지 않습니다: %s", backup_path)
-            raise                          # 메인 루프까지 예외 전파
+            self.last_error = e
+            self.stop()                    # 루프 중단 및 플래그 클리어
+            raise                          # 호출한 곳까지 예외 전파
         finally:
-            # 정상 종료 + 스케줄러가 살아있을 때만 다음 실행 예약
-            if success and self._running.is_set():
-                self._timer = threading.Timer(self.interval, self._run_task)
-                self._timer.start()
+            self.run_lock.release()
+
+    def _next_tick(self, next_tick: float, new_count: int | None) -> float:
+        """다음 실행 시각(monotonic). 지나간 틱은 모아서 따라잡기 1번으로 처리."""
+        if new_count is not None:          # 건너뛴 틱이면 간격 유지
+            self.interval = self.policy.next_interval(new_count)
+        next_tick += self.interval
+        now = time.monotonic()
+        if next_tick <= now:
+            missed = int((now - next_tick) // self.interval)
+            next_tick += missed * self.interval   # 지나간 마지막 틱 → 즉시 1번 실행
+            logger.warning("⏩ 실행이 주기(%ss)보다 길어 밀린 틱 %d개를 건너뛰고 1번만 따라잡습니다.",
+                           self.interval, missed + 1)
+        return next_tick
+
+    def _wait_min_gap(self, last_start: float) -> None:
+        """직전 실행 시작 후 최소 간격이 지날 때까지 대기 (그사이 온 알림은 합친다)."""
+        while self._running.is_set():
+            gap = last_start + self.policy.min - time.monotonic()
+            if gap <= 0:
+                break
+            self._wake.wait(gap)
+            self._wake.clear()
+
+    def _loop(self, next_tick: float, last_start: float):
+        while self._running.is_set():
+            delay = next_tick - time.monotonic()
+            if self.config.scheduler_jitter > 0:
+                delay += random.uniform(0, self.config.scheduler_jitter)
+            poked = delay > 0 and self._wake.wait(delay)
+            if poked:
+                self._wake.clear()
+                self._wait_min_gap(last_start)
+            if not self._running.is_set():
+                break                      # stop() 호출됨
+            if poked:
+                logger.info("📬 새 메일 알림 — 다음 주기를 기다리지 않고 수집합니다.")
+            last_start = time.monotonic()
+            try:
+                new_count = self._run_task()
+            except Exception:
+                break                      # _run_task 에서 이미 로그 + stop()
+            if poked:                      # 알림 실행 시각부터 다시 한 주기
+                next_tick = last_start
+            next_tick = self._next_tick(next_tick, new_count)
 
     def start(self):
         if not self._running.is_set():
             self._running.set()
-        self._run_task()               # 첫 실행
+        self._wake.clear()
+        self._start_health()           # 첫 실행이 실패해도 stopped 로 보이도록 먼저 연다
+        self.uploader.start()          # 이전 실행에서 남은 대기열도 함께 처리
+        if self.extractor is not None:
+            self.extractor.start()
+        self._start_idle_watcher()     # 첫 실행 중에 온 메일도 알림으로 받도록 먼저 건다
+        first_tick = time.monotonic()
+        new_count = self._run_task()   # 첫 실행 (실패하면 예외가 호출한 곳으로)
+        if self._running.is_set():
+            self._thread = threading.Thread(target=self._loop,
+                                            args=(self._next_tick(first_tick, new_count), first_tick),
+                                            name="task-scheduler", daemon=True)
+            self._thread.start()
 
     def stop(self):
         self._running.clear()          # 중단 플래그
-        if self._timer is not None:
-            self._timer.cancel()       # 예약된 타이머 취소
+        self._wake.set()               # 대기 중인 루프 깨우기
+        if self.idle_watcher is not None:
+            self.idle_watcher.stop()
+            self.idle_watcher = None
+        if (self._thread is not None and self._thread.is_alive()
+                and self._thread is not threading.current_thread()):
+            self._thread.join(timeout=60)  # 진행 중인 수집이 끝나길 기다림
+        self.uploader.stop()           # 진행 중인 업로드가 끝나길 기다림
+        if self.extractor is not None:
+            self.extractor.stop()
+        self.sftp.close()              # 유지하던 SFTP 연결 종료
+
+    def close(self):
+        """stop() + 상태 엔드포인트 종료 — 프로세스/서비스를 끝낼 때.
+
+        예외로 멈춘 스케줄러(stop())는 엔드포인트를 남겨 두어 `/health` 가
+        stopped 를 보고한다.
+        """
+        self.stop()
+        if self.health is not None:
+            self.health.stop()
+            self.health = None
 
 def fetch_fund_mail():
     scheduler = TaskScheduler()
     try:
         scheduler.start()      # start() 내부에서 _run_task() 처음 실행
-        while True:
+        while scheduler.is_running:
             time.sleep(1)      # Ctrl-C 처리용 루프
+        if scheduler.last_error is not None:
+            sys.exit(1)        # 주기 실행 중 예외 – 이미 로그 찍었으므로 종료만
     except KeyboardInterrupt:
-        scheduler.stop()
+        scheduler.close()
         logger.info("🔴 사용자가 스케줄러를 중단했습니다.")
     except Exception:
         # _run_task 에서 올라온 예외 – 이미 로그 찍었으므로 종료만
-        scheduler.stop()
+        scheduler.close()
         sys.exit(1)
 
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="fund 메일 주기 수집 (서비스 모드)")
+    profiling.add_arguments(parser)
+    return parser.parse_args()
+
 # 사용 예시
 if __name__ == "__main__":
+    args = _parse_args()
+    profiling.configure(args.profile, args.tracemalloc)
     fetch_fund_mail()
@@ -1,36 +1,77 @@
-import shutil
+import argparse
 import sys
 from datetime import datetime
 
 from config import Config  # noqa: E402
-from fetch_email import fetch_email_from_office365
-from sftp_upload import upload_to_sftp  # noqa: E402
+from daemon import trigger_daemon
+from upload_outbox import drain_outbox
 from logger import logger
+from run_lock import RunLock
+import profiling
+import run_history
+
+
+def _report_daemon_result(result: dict) -> None:
+    status = result.get("status")
+    if status == "ok":
+        logger.info("✅ 데몬 수집 완료: 새 메일 %s건 (%ss) %s", result.get("new_count"),
+                    result.get("elapsed"), result.get("db_path") or "")
+    elif status == "busy":
+        logger.warning("⏭️ 데몬이 수집 중이라 이번 실행은 건너뜁니다.")
+    else:
+        logger.error("⛔ 데몬 수집 실패: %s", result.get("error"))
+        sys.exit(1)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="fund 메일 1회 수집/업로드")
+    profiling.add_arguments(parser)
+    return parser.parse_args()
 
 
 def main():
     """단발성(fire‑and‑exit) fund 메일 수집/업로드 진입점."""
     cfg = Config.load()
-    backup_path = None
+    # --profile / FUND_MAIL_PROFILE : 이번 실행 전체를 log_dir/profile 에 기록
+    with profiling.profiled(cfg.log_dir, "main_once"), \
+            run_history.track(cfg, "main_once") as entry:       # run_history.db 에 1줄
+        _run(cfg, entry)
+
+
+def _run(cfg, entry):
+    # 상주 데몬(daemon.py)이 떠 있으면 수집을 맡기고 결과만 받는다
+    # (토큰·Graph 세션·SFTP 연결 재사용, 업로드는 데몬의 업로드 스레드가 처리)
+    try:
+        result = trigger_daemon(cfg)
+    except Exception:
+        logger.exception("⛔ 데몬 수집 요청 중 예외 – 프로세스 종료")
+        sys.exit(1)
+    if result is not None:
+        entry.discard()                 # 데몬이 자기 수집을 기록한다
+        _report_daemon_result(result)
+        return
+
+    # 서비스나 이전 main_once 가 아직 수집 중이면 겹쳐 실행하지 않는다
+    run_lock = RunLock(cfg.run_lock_file)
+    if not run_lock.acquire():
+        logger.warning("⏭️ 다른 프로세스가 수집 중이라 이번 실행은 건너뜁니다. (%s)", cfg.run_lock_file)
+        entry.status = run_history.STATUS_SKIPPED
+        return
 
     logger.info("=" * 59)
     logger.info("⏺️ fund메일 수집 시작: %s", datetime.now())
     logger.info("=" * 59)
 
     try:
-        # LAST_TIME.json 백업
-        if cfg.last_time_file.exists():
-            backup_path = cfg.last_time_file.with_suffix(cfg.last_time_file.suffix + ".previous")
-            shutil.copy2(cfg.last_time_file, backup_path)
+        # 무거운 import(requests, msal)는 실제로 수집할 때만
+        from fetch_email import fetch_email_from_office365
 
-        # 메일 수집 후 SFTP 업로드
+        # 메일 수집 — DB 저장 → 업로드 대기열 등록 → LAST_TIME.json 순으로 커밋된다
         db_path = fetch_email_from_office365(cfg)
         if db_path:
-            upload_to_sftp(cfg, db_path)
-
-        # 정상 완료 시 백업 삭제
-        if backup_path and backup_path.exists():
-            backup_path.unlink()
+            if cfg.attach_extract:      # 추출은 데몬/서비스나 `attach_extract.py index` 가 맡는다
+                from attach_extract import AttachTextIndex
+                AttachTextIndex(cfg.attach_text_file).enqueue(db_path)
 
         logger.info("=" * 59)
         logger.info("✅ fund메일 수집 완료: %s", datetime.now())
@@ -38,12 +79,19 @@ def main():
 
     except Exception:
         logger.exception("⛔ fund메일 작업 중 예외 발생 – 프로세스 종료")
-        # 실패 시 백업 복구
-        if backup_path and backup_path.exists():
-            shutil.copy2(backup_path, cfg.last_time_file)
-            logger.warning("⚠️ 백업된 LAST_TIME.json 복구: %s", backup_path)
         sys.exit(1)
+    finally:
+        run_lock.release()              # 업로드는 대기열 잠금으로 따로 보호
+
+    # 이번 결과 + 이전에 실패해 재시도 시각이 된 항목 업로드.
+    # 실패해도 수집 결과는 이미 저장됐으므로 대기열에 남겨 다음 실행에서 재시도한다.
+    try:
+        drain_outbox(cfg)
+    except Exception:
+        logger.exception("⚠️ 업로드 대기열 처리 중 예외 – 다음 실행에서 재시도")
 
 
 if __name__ == "__main__":
+    args = _parse_args()
+    profiling.configure(args.profile, args.tracemalloc)
     main()
@@ -28,10 +28,15 @@ except ModuleNotFoundError:  # pragma: no cover (≤3.8 fallback)
 # ----------------------------------------------------------------------------
 from config import Config
 from fetch_email import fetch_email_from_office365
-from sftp_upload import upload_to_sftp  # noqa: E402
+from run_lock import RunLock
+from upload_outbox import drain_outbox
+import profiling
+import run_history
 
            # 기본 .env 로드
 logger = get_logger()
+
+_LOCK_WAIT_SECONDS = 600   # 서비스/main_once 의 수집이 끝나길 기다리는 최대 시간
 # ---------------------------------------------------------------------------
 # CLI helpers
 # ---------------------------------------------------------------------------
@@ -46,6 +51,7 @@ def _parse_args() -> argparse.Namespace:
         metavar="YYYY-MM-DD",
         help="Target date in KST (default: today)",
     )
+    profiling.add_arguments(parser)
     return parser.parse_args()
 
 
@@ -55,6 +61,7 @@ def _parse_args() -> argparse.Namespace:
 
 def main() -> None:
     args = _parse_args()
+    profiling.configure(args.profile, args.tracemalloc)
 
     # 1️⃣ Determine the date string (YYYY‑MM‑DD, in KST)
     if args.date:
@@ -67,17 +74,30 @@ def main() -> None:
         date_str = args.date
     else:
         date_str = datetime.now(KST).strftime("%Y-%m-%d")
+    try:
+        # 2️⃣ Load project configuration (credentials, paths, etc.)
+        cfg = Config.load()
+    except Exception:
+        logger.exception("⛔ 설정(.env) 로드 실패 – 프로세스 종료")
+        sys.exit(1)
+    # --profile / FUND_MAIL_PROFILE : 이번 실행 전체를 log_dir/profile 에 기록
+    with profiling.profiled(cfg.log_dir, "main_one_day"), \
+            run_history.track(cfg, "main_one_day"):             # run_history.db 에 1줄
+        _run(cfg, date_str)
+
+
+def _run(cfg, date_str: str) -> None:
     logger.info(f"=" * 59)
     logger.info(f"✅ {date_str}(KST)의 모든 메일 가져오기")
     logger.info(f"=" * 59)
     try:
-        # 2️⃣ Load project configuration (credentials, paths, etc.)
-        cfg = Config.load() 
-        db_path = fetch_email_from_office365(cfg, one_day=date_str)
-        if db_path:
-            upload_to_sftp(cfg, db_path)    
+        # 주기 수집과 겹치지 않도록 잠금 — 하루치 수집은 건너뛰지 않고 기다린다
+        with RunLock(cfg.run_lock_file) as run_lock:
+            if not run_lock.acquire(timeout=_LOCK_WAIT_SECONDS):
+                raise TimeoutError(f"다른 프로세스의 수집이 {_LOCK_WAIT_SECONDS}초 안에 끝나지 않았습니다.")
+            fetch_email_from_office365(cfg, one_day=date_str)   # 업로드 대기열 등록까지
         logger.info("=" * 59)
-        logger.info("✅ {date_str}(KST) 완료: %s", datetime.now())
+        logger.info(f"✅ {date_str}(KST) 완료: %s", datetime.now())
         logger.info("=" * 59)
     except Exception as exc:
         logger.info(f"=" * 59)
@@ -85,6 +105,12 @@ def main() -> None:
         logger.info(f"=" * 59)
         sys.exit(1)
 
+    # 업로드 실패는 대기열에 남아 다음 실행(main_once / 서비스)에서 재시도된다.
+    try:
+        drain_outbox(cfg)
+    except Exception:
+        logger.exception("⚠️ 업로드 대기열 처리 중 예외 – 다음 실행에서 재시도")
+
 
 if __name__ == "__main__":  # pragma: no cover
     main()
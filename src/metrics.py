@@ -0,0 +1,345 @@
+"""metrics.py — 실행 단위 성능 지표
+===================================
+메일 수집(`fetch`)과 SFTP 업로드(`upload`) 1회를 하나의 "실행"으로 보고
+단계별 소요 시간과 요청·바이트·재시도 횟수를 모읍니다.
+
+• 실행이 끝나면 `log_dir/metrics.jsonl` 에 JSON 한 줄을 추가합니다
+  (10 MB 를 넘으면 `metrics.jsonl.1` 로 넘기고 새로 시작).
+• node exporter textfile collector 용 `fund_mail_<kind>.prom` 을
+  `METRICS_PROM_DIR`(기본: log_dir)에 임시 파일 → `os.replace` 로 씁니다.
+• 프로세스가 도는 동안의 누적값(실행 수, 카운터 합계, 실행·단계 소요
+  시간 히스토그램, 마지막 성공 시각)도 모아 `render_prometheus()` 로
+  내보냅니다 — 서비스/데몬의 `/metrics` (`health_server.py`).
+• 실행은 스레드별로 추적합니다. 수집 스레드와 업로드 스레드가 동시에
+  돌아도 서로의 지표가 섞이지 않고, 실행 밖에서 부른 `stage()`/`incr()`
+  은 아무 일도 하지 않습니다.
+
+사용 예::
+
+    import metrics
+
+    with metrics.start_run(cfg, "fetch") as run:
+        with metrics.stage("list"):
+            ...
+        metrics.incr("graph_requests")
+    metrics.last_run("fetch")      # 마지막 기록 (dict)
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from logger import get_logger
+
+__all__ = ["RunMetrics", "start_run", "current", "stage", "incr", "last_run", "collect",
+           "last_success", "render_prometheus"]
+
+logger = get_logger()
+
+JSONL_NAME = "metrics.jsonl"
+_JSONL_MAX_BYTES = 10 * 1024 * 1024
+
+_local = threading.local()
+_last: dict[str, dict[str, Any]] = {}
+_write_lock = threading.Lock()
+
+# 히스토그램 구간(초) — 수집 1회는 보통 수 초, 큰 첨부 업로드는 수 분
+BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+@dataclass(slots=True)
+class RunMetrics:
+    kind: str
+    labels: dict[str, Any] = field(default_factory=dict)
+    started_at: datetime = field(default_factory=datetime.now)
+    stages: dict[str, float] = field(default_factory=dict)       # 단계별 누적 초
+    stage_calls: dict[str, int] = field(default_factory=dict)    # 단계별 호출 수
+    counters: dict[str, int] = field(default_factory=dict)
+    status: str = "running"
+    error: str | None = None
+    duration: float = 0.0
+    _t0: float = field(default_factory=time.perf_counter)
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+
+    def incr(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_record(self) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "started_at": self.started_at.isoformat(timespec="milliseconds"),
+            "ended_at": datetime.now().isoformat(timespec="milliseconds"),
+            "duration": round(self.duration, 4),
+            "status": self.status,
+            "error": self.error,
+            "labels": self.labels,
+            "stages": {k: round(v, 4) for k, v in self.stages.items()},
+            "stage_calls": self.stage_calls,
+            "counters": self.counters,
+        }
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, le in enumerate(BUCKETS):
+            if value <= le:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class _Totals:
+    """프로세스 누적 지표 (`/metrics`)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.runs: dict[tuple[str, str], int] = {}
+        self.counters: dict[tuple[str, str], int] = {}
+        self.durations: dict[str, _Histogram] = {}
+        self.stages: dict[tuple[str, str], _Histogram] = {}
+        self.last_success: dict[str, float] = {}
+
+    def add(self, run: RunMetrics) -> None:
+        with self.lock:
+            key = (run.kind, run.status)
+            self.runs[key] = self.runs.get(key, 0) + 1
+            for name, n in run.counters.items():
+                self.counters[(run.kind, name)] = self.counters.get((run.kind, name), 0) + n
+            self.durations.setdefault(run.kind, _Histogram()).observe(run.duration)
+            for name, sec in run.stages.items():
+                self.stages.setdefault((run.kind, name), _Histogram()).observe(sec)
+            if run.status == "ok":
+                self.last_success[run.kind] = time.time()
+
+
+_totals = _Totals()
+
+
+def current() -> RunMetrics | None:
+    """이 스레드에서 진행 중인 실행 (없으면 None)."""
+    return getattr(_local, "run", None)
+
+
+@contextmanager
+def start_run(config, kind: str, **labels) -> Iterator[RunMetrics]:
+    """실행 1회를 측정하고 끝나면 기록한다.
+
+    이미 진행 중인 실행 안에서 다시 부르면(예: 대기열 → upload_to_sftp)
+    바깥 실행을 그대로 돌려주고 따로 기록하지 않는다.
+    """
+    outer = current()
+    if outer is not None:
+        outer.labels.update(labels)
+        yield outer
+        return
+
+    run = RunMetrics(kind, labels={k: v for k, v in labels.items() if v is not None})
+    _local.run = run
+    try:
+        yield run
+        run.status = "ok"
+    except BaseException as e:
+        run.status = "error"
+        run.error = type(e).__name__
+        raise
+    finally:
+        _local.run = None
+        run.duration = time.perf_counter() - run._t0
+        record = run.to_record()
+        _last[kind] = record
+        _totals.add(run)
+        sink = getattr(_local, "sink", None)
+        if sink is not None:
+            sink.append(record)
+        _write(config, record)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """진행 중인 실행에 `name` 단계 소요 시간을 더한다."""
+    run = current()
+    if run is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add_stage(name, time.perf_counter() - t0)
+
+
+def incr(name: str, n: int = 1) -> None:
+    run = current()
+    if run is not None:
+        run.incr(name, n)
+
+
+def last_run(kind: str) -> dict[str, Any] | None:
+    """이 프로세스에서 마지막으로 끝난 `kind` 실행의 기록."""
+    return _last.get(kind)
+
+
+def last_success(kind: str) -> float | None:
+    """이 프로세스에서 `kind` 실행이 마지막으로 성공한 시각 (epoch 초)."""
+    return _totals.last_success.get(kind)
+
+
+@contextmanager
+def collect() -> Iterator[list[dict[str, Any]]]:
+    """블록 안에서 이 스레드가 끝낸 실행 기록을 모은다 (다른 스레드의 업로드는 제외)."""
+    records: list[dict[str, Any]] = []
+    outer = getattr(_local, "sink", None)
+    _local.sink = records
+    try:
+        yield records
+    finally:
+        _local.sink = outer
+
+
+# ─────────────────────────────── 기록 ─────────────────────────────────────
+
+def _write(config, record: dict[str, Any]) -> None:
+    if not getattr(config, "metrics_enabled", True):
+        return
+    try:
+        with _write_lock:
+            _append_jsonl(Path(config.log_dir) / JSONL_NAME, record)
+            prom_dir = Path(config.metrics_prom_dir or config.log_dir)
+            _write_prom(prom_dir / f"fund_mail_{record['kind']}.prom", record)
+    except Exception as e:  # noqa: BLE001 — 지표 기록 실패로 실행을 실패시키지 않음
+        logger.warning(f"⚠️ 지표 기록 실패: {e}")
+
+
+def _append_jsonl(path: Path, record: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if path.stat().st_size > _JSONL_MAX_BYTES:
+            os.replace(path, path.with_name(path.name + ".1"))
+    except FileNotFoundError:
+        pass
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _esc(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _previous_success_ts(path: Path, kind: str) -> float | None:
+    """이전 .prom 파일의 마지막 성공 시각 — 실패한 실행도 이 값을 이어받는다."""
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+    m = re.search(r'^fund_mail_run_last_success_timestamp_seconds\{kind="%s"\} (\S+)$'
+                  % re.escape(kind), text, re.M)
+    return float(m.group(1)) if m else None
+
+
+def _histogram_lines(name: str, labels: str, hist: _Histogram) -> list[str]:
+    lines, cumulative = [], 0
+    for le, n in zip(BUCKETS, hist.counts):
+        cumulative += n
+        lines.append(f'{name}_bucket{{{labels},le="{le:g}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+    lines.append(f"{name}_sum{{{labels}}} {hist.sum:.4f}")
+    lines.append(f"{name}_count{{{labels}}} {hist.count}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """프로세스 누적 지표를 Prometheus text format 으로."""
+    with _totals.lock:
+        lines = [
+            "# HELP fund_mail_runs_total 끝난 실행 수",
+            "# TYPE fund_mail_runs_total counter",
+        ]
+        lines += [f'fund_mail_runs_total{{kind="{_esc(k)}",status="{_esc(s)}"}} {n}'
+                  for (k, s), n in sorted(_totals.runs.items())]
+        lines += [
+            "# HELP fund_mail_events_total 실행 카운터 합계 (메일·요청·바이트·재시도)",
+            "# TYPE fund_mail_events_total counter",
+        ]
+        lines += [f'fund_mail_events_total{{kind="{_esc(k)}",name="{_esc(n)}"}} {v}'
+                  for (k, n), v in sorted(_totals.counters.items())]
+        lines += [
+            "# HELP fund_mail_last_success_timestamp_seconds 마지막 성공 실행 종료 시각",
+            "# TYPE fund_mail_last_success_timestamp_seconds gauge",
+        ]
+        lines += [f'fund_mail_last_success_timestamp_seconds{{kind="{_esc(k)}"}} {ts:.3f}'
+                  for k, ts in sorted(_totals.last_success.items())]
+        lines += [
+            "# HELP fund_mail_run_duration_seconds 실행 1회 소요 시간",
+            "# TYPE fund_mail_run_duration_seconds histogram",
+        ]
+        for k, hist in sorted(_totals.durations.items()):
+            lines += _histogram_lines("fund_mail_run_duration_seconds", f'kind="{_esc(k)}"', hist)
+        lines += [
+            "# HELP fund_mail_stage_duration_seconds 실행 안 단계별 소요 시간",
+            "# TYPE fund_mail_stage_duration_seconds histogram",
+        ]
+        for (k, st), hist in sorted(_totals.stages.items()):
+            lines += _histogram_lines("fund_mail_stage_duration_seconds",
+                                      f'kind="{_esc(k)}",stage="{_esc(st)}"', hist)
+    return "\n".join(lines) + "\n"
+
+
+def _write_prom(path: Path, record: dict[str, Any]) -> None:
+    kind = _esc(record["kind"])
+    now = time.time()
+    ok = record["status"] == "ok"
+    success_ts = now if ok else _previous_success_ts(path, record["kind"])
+
+    lines = [
+        "# HELP fund_mail_run_last_timestamp_seconds 마지막 실행 종료 시각",
+        "# TYPE fund_mail_run_last_timestamp_seconds gauge",
+        f'fund_mail_run_last_timestamp_seconds{{kind="{kind}"}} {now:.3f}',
+        "# HELP fund_mail_run_last_success 마지막 실행 성공 여부 (1/0)",
+        "# TYPE fund_mail_run_last_success gauge",
+        f'fund_mail_run_last_success{{kind="{kind}"}} {int(ok)}',
+        "# HELP fund_mail_run_last_duration_seconds 마지막 실행 소요 시간",
+        "# TYPE fund_mail_run_last_duration_seconds gauge",
+        f'fund_mail_run_last_duration_seconds{{kind="{kind}"}} {record["duration"]}',
+    ]
+    if success_ts is not None:
+        lines += [
+            "# HELP fund_mail_run_last_success_timestamp_seconds 마지막 성공 실행 종료 시각",
+            "# TYPE fund_mail_run_last_success_timestamp_seconds gauge",
+            f'fund_mail_run_last_success_timestamp_seconds{{kind="{kind}"}} {success_ts:.3f}',
+        ]
+    lines += [
+        "# HELP fund_mail_run_last_stage_seconds 마지막 실행의 단계별 소요 시간",
+        "# TYPE fund_mail_run_last_stage_seconds gauge",
+    ]
+    lines += [f'fund_mail_run_last_stage_seconds{{kind="{kind}",stage="{_esc(k)}"}} {v}'
+              for k, v in sorted(record["stages"].items())]
+    lines += [
+        "# HELP fund_mail_run_last_count 마지막 실행의 요청·바이트·건수 카운터",
+        "# TYPE fund_mail_run_last_count gauge",
+    ]
+    lines += [f'fund_mail_run_last_count{{kind="{kind}",name="{_esc(k)}"}} {v}'
+              for k, v in sorted(record["counters"].items())]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")     # textfile collector 는 *.prom 만 읽는다
+    tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
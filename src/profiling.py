@@ -0,0 +1,162 @@
+"""profiling.py — 실행 프로파일링 스위치
+=========================================
+운영 서버에서 느린 실행을 코드 수정 없이 들여다보기 위한 도구입니다.
+
+• `--profile` (또는 환경 변수 `FUND_MAIL_PROFILE=1`) : cProfile 로 실행을
+  측정해 `log_dir/profile/<이름>_<시각>.prof` 와 상위 N개 요약 `.txt` 를 남깁니다.
+  `.prof` 는 `python -m pstats`, snakeviz 등으로 열 수 있습니다.
+• `--tracemalloc` (또는 `FUND_MAIL_TRACEMALLOC=1`) : 실행 동안의 메모리
+  할당을 추적해 최대 사용량과 할당 위치 상위 N개를 같은 `.txt` 에 적습니다.
+• 요약 개수는 `FUND_MAIL_PROFILE_TOP` (기본 30), 파일은 이름별로 최근
+  50개만 남깁니다.
+
+환경 변수는 `.env` 에 적어도 되므로 Windows 서비스나
+`service_wrapper.py debug` 에서도 켤 수 있습니다(서비스는 매 수집마다 1개).
+cProfile 은 측정을 시작한 스레드만 보므로, 서비스의 백그라운드 업로드는
+포함되지 않습니다.
+
+사용 예::
+
+    parser = argparse.ArgumentParser()
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.configure(args.profile, args.tracemalloc)
+
+    with profiling.profiled(cfg.log_dir, "main_once"):
+        run()
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from logger import get_logger
+
+__all__ = ["add_arguments", "configure", "profile_enabled", "tracemalloc_enabled", "profiled"]
+
+logger = get_logger()
+
+_KEEP = 50                      # 이름별로 남길 최근 프로파일 수
+_DEFAULT_TOP = 30
+_TRUE = ("1", "true", "yes", "y", "on")
+
+_flags: dict[str, bool | None] = {"profile": None, "tracemalloc": None}   # None = 환경 변수 사용
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """진입점 CLI 에 `--profile` / `--tracemalloc` 추가."""
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile 결과와 요약을 log_dir/profile 에 저장 (FUND_MAIL_PROFILE=1)")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="메모리 할당 상위 위치를 요약에 추가 (FUND_MAIL_TRACEMALLOC=1)")
+
+
+def configure(profile: bool = False, tracemalloc: bool = False) -> None:
+    """CLI 플래그 반영 — 켜진 것만 덮어쓰고, 꺼진 것은 환경 변수를 따른다."""
+    if profile:
+        _flags["profile"] = True
+    if tracemalloc:
+        _flags["tracemalloc"] = True
+
+
+def _env_flag(key: str) -> bool:
+    return (os.getenv(key) or "").strip().lower() in _TRUE
+
+
+def profile_enabled() -> bool:
+    return _flags["profile"] or _env_flag("FUND_MAIL_PROFILE")
+
+
+def tracemalloc_enabled() -> bool:
+    return _flags["tracemalloc"] or _env_flag("FUND_MAIL_TRACEMALLOC")
+
+
+def _top_n() -> int:
+    try:
+        return int(os.getenv("FUND_MAIL_PROFILE_TOP") or _DEFAULT_TOP)
+    except ValueError:
+        return _DEFAULT_TOP
+
+
+@contextmanager
+def profiled(log_dir: str | Path, name: str) -> Iterator[None]:
+    """켜져 있으면 블록 실행을 측정해 파일로 남긴다. 꺼져 있으면 아무 일도 하지 않는다."""
+    use_profile = profile_enabled()
+    use_tracemalloc = tracemalloc_enabled()
+    if not (use_profile or use_tracemalloc):
+        yield
+        return
+
+    profiler = None
+    if use_profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:          # 다른 프로파일러가 이미 동작 중 (3.12+)
+            logger.warning(f"⚠️ 프로파일러를 시작할 수 없어 측정 없이 실행합니다: {e}")
+            profiler = None
+    if use_tracemalloc:
+        import tracemalloc
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(25)
+        tracemalloc.reset_peak()
+
+    started = datetime.now()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        snapshot = peak = None
+        if use_tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if started_tracemalloc:
+                tracemalloc.stop()
+        try:
+            _save(Path(log_dir) / "profile", name, started, profiler, snapshot, peak)
+        except Exception as e:  # noqa: BLE001 — 프로파일 저장 실패로 실행을 실패시키지 않음
+            logger.warning(f"⚠️ 프로파일 저장 실패: {e}")
+
+
+def _save(out_dir: Path, name: str, started: datetime, profiler, snapshot, peak) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"{name}_{started:%Y%m%d_%H%M%S}"
+    top = _top_n()
+    summary = io.StringIO()
+    summary.write(f"# {name}  시작 {started:%Y-%m-%d %H:%M:%S}  "
+                  f"소요 {(datetime.now() - started).total_seconds():.3f}s\n\n")
+
+    if profiler is not None:
+        import pstats
+        prof_path = out_dir / f"{stem}.prof"
+        profiler.dump_stats(prof_path)
+        stats = pstats.Stats(profiler, stream=summary).strip_dirs()
+        summary.write(f"## 누적 시간(cumulative) 상위 {top}\n")
+        stats.sort_stats("cumulative").print_stats(top)
+        summary.write(f"## 자체 시간(tottime) 상위 {top}\n")
+        stats.sort_stats("tottime").print_stats(top)
+
+    if snapshot is not None:
+        summary.write(f"## 메모리: 최대 {peak / 1024 / 1024:.1f} MiB, 할당 위치 상위 {top}\n")
+        for stat in snapshot.statistics("lineno")[:top]:
+            summary.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8d}회  {stat.traceback}\n")
+
+    txt_path = out_dir / f"{stem}.txt"
+    txt_path.write_text(summary.getvalue(), encoding="utf-8")
+    logger.info(f"🔬 프로파일 저장: {txt_path}")
+    _prune(out_dir, name)
+
+
+def _prune(out_dir: Path, name: str) -> None:
+    for suffix in (".prof", ".txt"):
+        files = sorted(out_dir.glob(f"{name}_[0-9]*{suffix}"))
+        for old in files[:-_KEEP]:
+            old.unlink(missing_ok=True)
@@ -0,0 +1,578 @@
+"""pst_import.py — PST 백업을 fund_mail DB 로 가져오기
+=====================================================
+Outlook PST(수십 GB)를 libpff(`pypff`)로 읽어 실시간 수집과 같은
+`fund_mail` / `fund_mail_attach` 스키마(`save_email_data_to_db`)로 옮깁니다.
+
+• 폴더를 메시지 구간(기본 2000건) 단위로 나눠 여러 프로세스가 동시에
+  읽습니다. 각 구간은 자기 shard DB(`shards/shard_NNNN.db`)에만 쓰므로
+  sqlite 쓰기 잠금을 다투지 않습니다.
+• 첨부는 PST 에서 1MiB 씩 읽으며 파일로 쓰고 sha256 을 함께 계산합니다.
+  파일명은 `<YYYYMMDD>_<메시지 id>_<순번><확장자>` 로 정해져 있어 다시
+  실행해도 같은 파일을 덮어씁니다.
+• 진행 상황은 `checkpoint.db` 에 배치(기본 500건)마다 남깁니다. 중단된
+  뒤 같은 명령을 다시 실행하면 끝난 구간은 건너뛰고, 하던 구간은 마지막
+  체크포인트 이후 줄을 지우고 이어서 읽습니다.
+• 모든 구간이 끝나면 shard 를 폴더 순서대로 `fm_pst_<이름>.db` 하나로
+  합칩니다(`--no-merge` 면 shard 그대로).
+• 읽을 수 없는 메시지는 건너뛰지 않고 `note` 에 사유를 적은 줄로 남깁니다.
+
+결과 ::
+
+    <출력 폴더>/pst_<이름>/fm_pst_<이름>.db
+    <출력 폴더>/pst_<이름>/attach/...          (save_folder = pst_<이름>/attach)
+
+사용법
+-----
+$ python pst_import.py d:/backup/fund_2019.pst                 # DATA_DIR 아래
+$ python pst_import.py fund_2019.pst --out e:/pst --workers 8
+$ python pst_import.py fund_2019.pst --restart                 # 체크포인트 무시, 처음부터
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.parser import HeaderParser
+from email.utils import getaddresses, parseaddr
+from pathlib import Path
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from db_actions import create_db_tables, save_email_data_to_db
+from exceptions import DBWriteError, PstImportError
+from logger import get_logger
+from mail_tagger import tag_email_list
+import metrics
+
+__all__ = ["WorkUnit", "ImportCheckpoint", "PstImporter", "merge_shards"]
+
+logger = get_logger()
+
+KST = ZoneInfo("Asia/Seoul")
+CHECKPOINT_NAME = "checkpoint.db"
+UNIT_SIZE = 2000                  # 작업 단위(메시지 수)
+BATCH_SIZE = 500                  # shard 트랜잭션·체크포인트 단위
+_CHUNK_SIZE = 1024 * 1024         # 첨부 읽기 단위
+_PR_ATTACH_LONG_FILENAME = 0x3707
+_PR_ATTACH_FILENAME = 0x3704
+_SENT_FOLDERS = ("sent items", "보낸 편지함", "sent")
+_FUND_MAIL_COLUMNS = ("email_id, subject, sender_address, sender_name, from_address, from_name, "
+                      "to_recipients, cc_recipients, email_time, kst_time, content, msg_kind, "
+                      "folder_path, note")
+_ATTACH_COLUMNS = "email_id, save_folder, org_file_name, phy_file_name, file_size, sha256"
+_TAG_COLUMNS = "email_id, kind, tag, keyword, in_subject, hits"
+
+
+def _open_pst(path: str | Path):
+    try:
+        import pypff
+    except ImportError as e:
+        raise PstImportError("PST 를 읽으려면 libpff-python(pypff) 이 필요합니다") from e
+    pst = pypff.file()
+    try:
+        pst.open(str(path))
+    except OSError as e:
+        raise PstImportError(f"PST 를 열 수 없습니다: {path}: {e}") from e
+    return pst
+
+
+def _decode(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    for encoding in ("utf-8", "cp949"):
+        try:
+            return value.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return value.decode("utf-8", errors="replace")
+
+
+# ─────────────────────────────── 작업 계획 ─────────────────────────────────
+
+@dataclass(frozen=True, slots=True)
+class WorkUnit:
+    """폴더 하나의 메시지 구간 [start, stop)."""
+    key: str                      # "0.3.1:0-2000"
+    index_path: tuple[int, ...]   # 루트에서 하위 폴더 순번
+    folder_path: str              # "/받은 편지함/펀드"
+    start: int
+    stop: int
+
+    @property
+    def size(self) -> int:
+        return self.stop - self.start
+
+
+def plan_units(pst_path: str | Path, unit_size: int = UNIT_SIZE) -> list[WorkUnit]:
+    """PST 폴더를 훑어 메시지가 있는 폴더를 `unit_size` 구간으로 나눈다."""
+    pst = _open_pst(pst_path)
+    units: list[WorkUnit] = []
+    try:
+        stack = [((), "", pst.get_root_folder())]
+        while stack:
+            index_path, folder_path, folder = stack.pop()
+            count = folder.number_of_sub_messages
+            for start in range(0, count, unit_size):
+                stop = min(start + unit_size, count)
+                key = f"{'.'.join(map(str, index_path)) or 'root'}:{start}-{stop}"
+                units.append(WorkUnit(key, index_path, folder_path or "/", start, stop))
+            children = []
+            for i in range(folder.number_of_sub_folders):
+                sub = folder.get_sub_folder(i)
+                children.append(((*index_path, i), f"{folder_path}/{_decode(sub.name)}", sub))
+            stack.extend(reversed(children))        # 폴더 순서대로 방문
+    finally:
+        pst.close()
+    return units
+
+
+# ─────────────────────────────── 체크포인트 ────────────────────────────────
+
+class ImportCheckpoint:
+    """`checkpoint.db` — 구간별 진행 위치 (여러 프로세스가 함께 갱신)."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        try:
+            with self._connect() as conn:
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS pst_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS pst_unit (
+                    key TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL,                -- 계획 순서 (합칠 때 순서)
+                    shard TEXT NOT NULL,
+                    index_path TEXT NOT NULL,            -- 루트에서 하위 폴더 순번 "0.3.1"
+                    folder_path TEXT NOT NULL,
+                    start_index INTEGER NOT NULL,
+                    stop_index INTEGER NOT NULL,
+                    next_index INTEGER NOT NULL,         -- 다음에 읽을 메시지
+                    last_row_id INTEGER NOT NULL DEFAULT 0,  -- 체크포인트 시점 shard 의 마지막 fund_mail.id
+                    done INTEGER NOT NULL DEFAULT 0,
+                    messages INTEGER NOT NULL DEFAULT 0,
+                    attachments INTEGER NOT NULL DEFAULT 0,
+                    attach_bytes INTEGER NOT NULL DEFAULT 0,
+                    errors INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 체크포인트 테이블 생성 실패: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=60)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def meta(self, key: str) -> str | None:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM pst_meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO pst_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def add_units(self, units: list[WorkUnit]) -> None:
+        with self._connect() as conn:
+            conn.executemany("""
+                INSERT OR IGNORE INTO pst_unit
+                      (key, seq, shard, index_path, folder_path, start_index, stop_index, next_index)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(u.key, seq, f"shard_{seq:04d}.db", ".".join(map(str, u.index_path)),
+                   u.folder_path, u.start, u.stop, u.start)
+                  for seq, u in enumerate(units)])
+
+    def unit(self, key: str) -> dict[str, Any]:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT * FROM pst_unit WHERE key = ?", (key,)).fetchone())
+
+    def units(self) -> list[dict[str, Any]]:
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute("SELECT * FROM pst_unit ORDER BY seq")]
+
+    def advance(self, key: str, next_index: int, last_row_id: int, messages: int,
+                attachments: int, attach_bytes: int, errors: int, done: bool = False) -> None:
+        with self._connect() as conn:
+            conn.execute("""
+                UPDATE pst_unit
+                   SET next_index = ?, last_row_id = ?, done = ?,
+                       messages = messages + ?, attachments = attachments + ?,
+                       attach_bytes = attach_bytes + ?, errors = errors + ?
+                 WHERE key = ?
+            """, (next_index, last_row_id, int(done), messages, attachments, attach_bytes,
+                  errors, key))
+
+
+# ─────────────────────────────── 작업자 ───────────────────────────────────
+
+@dataclass(frozen=True, slots=True)
+class _Context:
+    job_dir: Path
+    attach_dir: Path
+    save_folder: str              # data root 기준 상대 경로
+    stem: str
+    mailbox: str
+    tag_keywords: Path | None = None   # TAG_KEYWORDS_FILE — 작업 프로세스마다 매처를 만든다
+
+
+def _init_worker() -> None:
+    # 배치마다 남는 저장 로그는 부모가 구간 단위로 요약한다
+    logging.getLogger("fund_mail").setLevel(logging.WARNING)
+
+
+def _attachment_name(attachment, n: int) -> str:
+    name = getattr(attachment, "name", None)
+    if not name:
+        for record_set in getattr(attachment, "record_sets", None) or ():
+            for entry in record_set.entries:
+                if entry.entry_type in (_PR_ATTACH_LONG_FILENAME, _PR_ATTACH_FILENAME):
+                    name = entry.data_as_string
+                    if entry.entry_type == _PR_ATTACH_LONG_FILENAME:
+                        break
+            if name:
+                break
+    return os.path.basename(_decode(name).replace("\\", "/")) or f"attachment_{n}"
+
+
+def _save_attachment(attachment, path: Path) -> tuple[int, str]:
+    """PST 첨부를 1MiB 씩 읽어 쓰면서 sha256 계산 → (크기, sha256)."""
+    size = attachment.size
+    digest = hashlib.sha256()
+    tmp = path.with_name(path.name + ".tmp")
+    attachment.seek_offset(0, os.SEEK_SET)
+    with tmp.open("wb") as fh:
+        remaining = size
+        while remaining > 0:
+            chunk = attachment.read_buffer(min(_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            fh.write(chunk)
+            digest.update(chunk)
+            remaining -= len(chunk)
+    os.replace(tmp, path)
+    return size - remaining, digest.hexdigest()
+
+
+def _addresses(value: str | None) -> str:
+    return ", ".join(addr for _, addr in getaddresses([value]) if addr) if value else ""
+
+
+def _message_record(message, unit: WorkUnit, ctx: _Context) -> tuple[dict, int]:
+    """pypff 메시지 → `save_email_data_to_db` 가 받는 dict (+ 첨부 바이트)."""
+    # 보낸 편지함 등 transport header 가 없는 메시지는 표시 이름만 남는다
+    headers = HeaderParser().parsestr(_decode(message.transport_headers))
+    from_name, from_address = parseaddr(headers.get("From", ""))
+    sender_name, sender_address = (parseaddr(headers["Sender"]) if headers.get("Sender")
+                                   else (from_name, from_address))
+    sender_name = sender_name or _decode(message.sender_name)
+    from_name = from_name or sender_name
+
+    received = message.delivery_time or message.client_submit_time or message.creation_time
+    received_utc = received.replace(tzinfo=timezone.utc) if received else None
+    email_time = received_utc.strftime("%Y-%m-%d %H:%M:%S") if received_utc else ""
+    kst_time = received_utc.astimezone(KST).strftime("%Y-%m-%d %H:%M:%S") if received_utc else ""
+
+    folder_name = unit.folder_path.rsplit("/", 1)[-1].lower()
+    msg_kind = "receive"
+    if folder_name in _SENT_FOLDERS or (ctx.mailbox and sender_address.lower() == ctx.mailbox.lower()):
+        msg_kind = "sent"
+
+    email_id = f"pst:{ctx.stem}:{message.identifier}"
+    notes, attach_files, attach_bytes = [], [], 0
+    for n in range(message.number_of_attachments):
+        try:
+            attachment = message.get_attachment(n)
+            org_name = _attachment_name(attachment, n)
+            date_prefix = kst_time[:10].replace("-", "") or "00000000"
+            phy_name = f"{date_prefix}_{message.identifier}_{n}{os.path.splitext(org_name)[1]}"
+            file_size, sha256 = _save_attachment(attachment, ctx.attach_dir / phy_name)
+        except (OSError, AttributeError) as e:
+            notes.append(f"첨부 {n} 읽기 실패: {e}")
+            continue
+        attach_bytes += file_size
+        attach_files.append({
+            "parent_id": None,
+            "email_id": email_id,
+            "org_file_name": org_name,
+            "phy_file_name": phy_name,
+            "save_folder": ctx.save_folder,
+            "file_size": file_size,
+            "sha256": sha256,
+        })
+
+    content = _decode(message.html_body) or _decode(message.plain_text_body) or "내용 없음"
+    return {
+        "email_id": email_id,
+        "subject": _decode(message.subject) or "제목 없음",
+        "sender_address": sender_address,
+        "sender_name": sender_name,
+        "from_address": from_address,
+        "from_name": from_name,
+        "to_recipients": _addresses(headers.get("To")) or "받는 사람 없음",
+        "cc_recipients": _addresses(headers.get("Cc")) or "참조 없음",
+        "email_time": email_time,
+        "kst_time": kst_time,
+        "content": content,
+        "note": "; ".join(notes),
+        "msg_kind": msg_kind,
+        "folder_path": unit.folder_path,
+        "attach_files": attach_files,
+    }, attach_bytes
+
+
+def _broken_record(index: int, unit: WorkUnit, ctx: _Context, error: Exception) -> dict:
+    """읽을 수 없는 메시지 자리 — 건수를 맞추고 나중에 찾을 수 있게 남긴다."""
+    return {
+        "email_id": f"pst:{ctx.stem}:{unit.key}#{index}",
+        "subject": "", "sender_address": "", "sender_name": "", "from_address": "",
+        "from_name": "", "to_recipients": "", "cc_recipients": "", "email_time": "",
+        "kst_time": "", "content": "", "msg_kind": "receive",
+        "folder_path": unit.folder_path,
+        "note": f"PST 손상: {unit.folder_path} #{index}: {type(error).__name__}: {error}",
+        "attach_files": [],
+    }
+
+
+def _rollback_partial(shard: Path, last_row_id: int) -> None:
+    """체크포인트 뒤에 저장된 줄(중단된 배치) 삭제."""
+    with sqlite3.connect(shard) as conn:
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("DELETE FROM fund_mail WHERE id > ?", (last_row_id,))
+
+
+def _last_row_id(shard: Path) -> int:
+    with sqlite3.connect(shard) as conn:
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM fund_mail").fetchone()[0]
+
+
+def _import_unit(pst_path: str, unit: WorkUnit, ctx: _Context, batch_size: int) -> dict[str, Any]:
+    """작업 프로세스: 구간 하나를 shard DB 로 (체크포인트부터 이어서)."""
+    checkpoint = ImportCheckpoint(ctx.job_dir / CHECKPOINT_NAME)
+    state = checkpoint.unit(unit.key)
+    shard = ctx.job_dir / "shards" / state["shard"]
+    create_db_tables(shard)
+    _rollback_partial(shard, state["last_row_id"])
+
+    totals = {"messages": 0, "attachments": 0, "attach_bytes": 0, "errors": 0}
+    started = time.perf_counter()
+    pst = _open_pst(pst_path)
+    try:
+        folder = pst.get_root_folder()
+        for i in unit.index_path:
+            folder = folder.get_sub_folder(i)
+        batch: list[dict] = []
+        counts = dict.fromkeys(totals, 0)
+        index = state["next_index"]
+        while index < unit.stop:
+            try:
+                record, nbytes = _message_record(folder.get_sub_message(index), unit, ctx)
+            except (OSError, AttributeError, ValueError) as e:     # 손상된 메시지
+                record, nbytes = _broken_record(index, unit, ctx, e), 0
+                counts["errors"] += 1
+            batch.append(record)
+            counts["messages"] += 1
+            counts["attachments"] += len(record["attach_files"])
+            counts["attach_bytes"] += nbytes
+            index += 1
+            if len(batch) >= batch_size or index == unit.stop:
+                tag_email_list(None, batch, ctx.tag_keywords)
+                save_email_data_to_db(batch, shard)
+                checkpoint.advance(unit.key, index, _last_row_id(shard), done=index == unit.stop,
+                                   **counts)
+                for k, v in counts.items():
+                    totals[k] += v
+                batch, counts = [], dict.fromkeys(totals, 0)
+    finally:
+        pst.close()
+    return {"key": unit.key, "folder_path": unit.folder_path, "resumed_at": state["next_index"],
+            "elapsed": time.perf_counter() - started, **totals}
+
+
+# ─────────────────────────────── 합치기 ───────────────────────────────────
+
+def merge_shards(shards: list[Path], target: Path) -> int:
+    """shard DB 들을 순서대로 `target` 하나로 (id 를 다시 매기고 첨부·태그 parent_id 도 맞춤)."""
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    create_db_tables(tmp)
+    try:
+        conn = sqlite3.connect(tmp)
+        try:
+            for shard in shards:
+                offset = conn.execute("SELECT COALESCE(MAX(id), 0) FROM fund_mail").fetchone()[0]
+                conn.execute("ATTACH DATABASE ? AS shard", (str(shard),))
+                conn.execute(f"INSERT INTO fund_mail (id, {_FUND_MAIL_COLUMNS}) "
+                             f"SELECT id + ?, {_FUND_MAIL_COLUMNS} FROM shard.fund_mail ORDER BY id",
+                             (offset,))
+                conn.execute(f"INSERT INTO fund_mail_attach (parent_id, {_ATTACH_COLUMNS}) "
+                             f"SELECT parent_id + ?, {_ATTACH_COLUMNS} FROM shard.fund_mail_attach "
+                             f"ORDER BY id", (offset,))
+                if conn.execute("SELECT 1 FROM shard.sqlite_master WHERE name = 'fund_mail_tag'").fetchone():
+                    conn.execute(f"INSERT INTO fund_mail_tag (parent_id, {_TAG_COLUMNS}) "
+                                 f"SELECT parent_id + ?, {_TAG_COLUMNS} FROM shard.fund_mail_tag "
+                                 f"ORDER BY id", (offset,))
+                conn.commit()
+                conn.execute("DETACH DATABASE shard")
+            count = conn.execute("SELECT COUNT(*) FROM fund_mail").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        raise DBWriteError(f"❌ shard 합치기 실패: {e}")
+    os.replace(tmp, target)
+    return count
+
+
+# ─────────────────────────────── 실행 ────────────────────────────────────
+
+class PstImporter:
+    """PST 하나를 `out_dir/pst_<이름>/` 으로 가져오는 작업."""
+
+    def __init__(self, pst_path: str | Path, out_dir: str | Path, workers: int | None = None,
+                 unit_size: int = UNIT_SIZE, batch_size: int = BATCH_SIZE, mailbox: str = "",
+                 tag_keywords: str | Path | None = None):
+        self.pst_path = Path(pst_path).resolve()
+        if not self.pst_path.is_file():
+            raise PstImportError(f"PST 파일이 없습니다: {self.pst_path}")
+        self.stem = self.pst_path.stem
+        self.out_dir = Path(out_dir).resolve()
+        self.job_dir = self.out_dir / f"pst_{self.stem}"
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.unit_size = unit_size
+        self.batch_size = batch_size
+        self.mailbox = mailbox
+        self.tag_keywords = Path(tag_keywords) if tag_keywords else None
+
+    @property
+    def db_path(self) -> Path:
+        return self.job_dir / f"fm_pst_{self.stem}.db"
+
+    def _signature(self) -> str:
+        st = self.pst_path.stat()
+        return f"{st.st_size}:{st.st_mtime_ns}"
+
+    def _prepare(self, restart: bool) -> ImportCheckpoint:
+        if restart and self.job_dir.exists():
+            logger.info(f"🧹 이전 가져오기 결과 삭제: {self.job_dir}")
+            shutil.rmtree(self.job_dir)
+        (self.job_dir / "shards").mkdir(parents=True, exist_ok=True)
+        (self.job_dir / "attach").mkdir(exist_ok=True)
+        checkpoint = ImportCheckpoint(self.job_dir / CHECKPOINT_NAME)
+        signature = checkpoint.meta("pst_signature")
+        if signature is None:
+            units = plan_units(self.pst_path, self.unit_size)
+            checkpoint.add_units(units)
+            checkpoint.set_meta("pst_path", str(self.pst_path))
+            checkpoint.set_meta("pst_signature", self._signature())
+            logger.info(f"🗂️ 작업 계획: 폴더 구간 {len(units)}개, 메시지 {sum(u.size for u in units):,}건")
+        elif signature != self._signature():
+            raise PstImportError(f"체크포인트와 PST 파일이 다릅니다 (--restart 로 처음부터): {self.job_dir}")
+        return checkpoint
+
+    def run(self, restart: bool = False, merge: bool = True) -> Path:
+        checkpoint = self._prepare(restart)
+        rows = checkpoint.units()
+        pending = [WorkUnit(r["key"], tuple(int(i) for i in r["index_path"].split(".") if i),
+                            r["folder_path"], r["start_index"], r["stop_index"])
+                   for r in rows if not r["done"]]
+        if len(pending) < len(rows):
+            logger.info(f"↩️ 체크포인트에서 이어서 진행: 완료 {len(rows) - len(pending)}/{len(rows)} 구간")
+        ctx = _Context(self.job_dir, self.job_dir / "attach",
+                       str((self.job_dir / "attach").relative_to(self.out_dir)), self.stem, self.mailbox,
+                       self.tag_keywords)
+
+        failed: list[str] = []
+        started = time.perf_counter()
+        done_bytes = 0
+        pending.sort(key=lambda u: u.size, reverse=True)       # 큰 구간 먼저 (작업자 균형)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(_import_unit, str(self.pst_path), unit, ctx, self.batch_size): unit
+                       for unit in pending}
+            for n, future in enumerate(as_completed(futures), 1):
+                unit = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:  # noqa: BLE001 — 다른 구간은 계속, 재실행 시 이어서
+                    failed.append(unit.key)
+                    logger.error(f"⛔ {unit.folder_path} [{unit.key}] 가져오기 실패: {e}")
+                    continue
+                done_bytes += result["attach_bytes"]
+                metrics.incr("messages", result["messages"])
+                metrics.incr("attachments", result["attachments"])
+                metrics.incr("attach_bytes", result["attach_bytes"])
+                elapsed = time.perf_counter() - started
+                logger.info(f"📦 [{n}/{len(pending)}] {result['folder_path']} [{unit.key}] "
+                            f"메일 {result['messages']}건, 첨부 {result['attachments']}개"
+                            f"{f', 손상 {result['errors']}건' if result['errors'] else ''} "
+                            f"({result['elapsed']:.1f}s, 누적 {done_bytes / 1024 / 1024 / elapsed:.1f} MB/s)")
+
+        if failed:
+            raise PstImportError(f"{len(failed)}개 구간 실패 — 같은 명령으로 다시 실행하면 이어서 진행합니다: "
+                                 f"{', '.join(failed[:5])}")
+        rows = checkpoint.units()
+        logger.info(f"✅ PST 읽기 완료: 메일 {sum(r['messages'] for r in rows):,}건, "
+                    f"첨부 {sum(r['attachments'] for r in rows):,}개 "
+                    f"({sum(r['attach_bytes'] for r in rows) / 1024 / 1024:,.1f} MB), "
+                    f"손상 {sum(r['errors'] for r in rows)}건")
+        if not merge:
+            return self.job_dir / "shards"
+        shards = [self.job_dir / "shards" / r["shard"] for r in rows
+                  if (self.job_dir / "shards" / r["shard"]).exists()]
+        count = merge_shards(shards, self.db_path)
+        checkpoint.set_meta("merged_at", datetime.now().isoformat(timespec="seconds"))
+        logger.info(f"✅ shard {len(shards)}개를 합쳤습니다: {self.db_path} (메일 {count:,}건)")
+        return self.db_path
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="PST 백업을 fund_mail DB 로 가져오기")
+    parser.add_argument("pst", help="PST 파일")
+    parser.add_argument("--out", help="출력 폴더 (기본: DATA_DIR) — 그 아래 pst_<이름>/ 에 만든다")
+    parser.add_argument("--workers", type=int, help="작업 프로세스 수 (기본: CPU 수 - 1)")
+    parser.add_argument("--unit-size", type=int, default=UNIT_SIZE,
+                        help=f"작업 단위 메시지 수 (기본 {UNIT_SIZE})")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE,
+                        help=f"트랜잭션·체크포인트 단위 메시지 수 (기본 {BATCH_SIZE})")
+    parser.add_argument("--mailbox", help="보낸 메일 판단용 계정 (기본: EMAIL_ID)")
+    parser.add_argument("--restart", action="store_true", help="체크포인트와 결과를 지우고 처음부터")
+    parser.add_argument("--no-merge", action="store_true", help="shard DB 를 합치지 않고 남긴다")
+    return parser.parse_args()
+
+
+def main() -> None:
+    from config import Config
+
+    args = _parse_args()
+    cfg = Config.load()
+    importer = PstImporter(args.pst, args.out or cfg.data_dir, workers=args.workers,
+                           unit_size=args.unit_size, batch_size=args.batch,
+                           mailbox=args.mailbox or cfg.email_user_id,
+                           tag_keywords=cfg.tag_keywords_file)
+    logger.info(f"⏺️ PST 가져오기 시작: {importer.pst_path} → {importer.job_dir} "
+                f"(작업 프로세스 {importer.workers}개)")
+    try:
+        with metrics.start_run(cfg, "pst_import", pst=importer.stem):
+            importer.run(restart=args.restart, merge=not args.no_merge)
+    except PstImportError as e:
+        logger.error(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()           # PyInstaller exe 에서 작업 프로세스 실행
+    main()
@@ -0,0 +1,94 @@
+"""remote_dir_cache.py — 원격 디렉터리 캐시
+=============================================
+`mkdir_p` 가 이미 확인한 원격 디렉터리를 기억해 두어, 다음 업로드부터는
+`sftp.stat` 왕복 없이 바로 건너뛰게 합니다.
+
+• 프로세스 안에서는 set 으로 유지합니다.
+• `SFTP_DIR_CACHE_PERSIST` 가 켜져 있으면 `remote_dirs.json` 에도 저장해
+  단발성 실행(main_once)도 이전 실행의 결과를 재사용합니다.
+• 업로드 중 오류가 나면 `invalidate()` 로 비워서 다음 실행에서 다시 확인합니다.
+
+사용 예::
+
+    from remote_dir_cache import get_remote_dir_cache
+    cache = get_remote_dir_cache(cfg)
+    mkdir_p(sftp, remote_dir, cache)
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+
+from logger import get_logger
+
+__all__ = ["RemoteDirCache", "get_remote_dir_cache"]
+
+logger = get_logger()
+
+_caches: dict[str, "RemoteDirCache"] = {}
+_caches_lock = threading.Lock()
+
+
+class RemoteDirCache:
+    """존재가 확인된 원격 디렉터리 집합 (선택적으로 JSON 파일에 영속화)."""
+
+    def __init__(self, server: str, persist_file: Path | None = None):
+        self.server = server              # "host:port" — 다른 서버의 목록은 무시
+        self.persist_file = persist_file
+        self._dirs: set[str] = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.persist_file or not self.persist_file.exists():
+            return
+        try:
+            data = json.loads(self.persist_file.read_text(encoding="utf-8"))
+            if data.get("server") == self.server:
+                self._dirs = set(data.get("dirs", []))
+        except Exception as e:  # noqa: BLE001 — 캐시는 없어도 동작에 지장 없음
+            logger.warning(f"⚠️ 원격 디렉터리 캐시 로드 실패, 무시합니다: {e}")
+
+    def _save_locked(self) -> None:
+        if not self.persist_file:
+            return
+        try:
+            tmp = self.persist_file.with_suffix(self.persist_file.suffix + ".tmp")
+            tmp.write_text(json.dumps({"server": self.server, "dirs": sorted(self._dirs)},
+                                      ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(tmp, self.persist_file)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"⚠️ 원격 디렉터리 캐시 저장 실패: {e}")
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._dirs
+
+    def add(self, path: str) -> None:
+        with self._lock:
+            if path in self._dirs:
+                return
+            self._dirs.add(path)
+            self._save_locked()
+
+    def invalidate(self) -> None:
+        """오류 발생 시 호출 — 캐시를 비워 다음에 실제로 다시 확인하게 한다."""
+        with self._lock:
+            if not self._dirs:
+                return
+            self._dirs.clear()
+            self._save_locked()
+        logger.info("원격 디렉터리 캐시 초기화")
+
+
+def get_remote_dir_cache(config) -> RemoteDirCache:
+    """서버별 프로세스 공용 캐시를 반환 (동일 서버면 같은 객체)."""
+    server = f"{config.sftp_host}:{config.sftp_port}"
+    persist_file = config.remote_dir_cache_file if config.sftp_dir_cache_persist else None
+    key = f"{server}|{persist_file}"
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = RemoteDirCache(server, persist_file)
+        return cache
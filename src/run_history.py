@@ -0,0 +1,266 @@
+"""run_history.py — 실행 이력 테이블과 추세 리포트
+==================================================
+로그 파일은 용량 기준으로 돌아가며 지워지므로 몇 주만 지나면 실행 결과를
+다시 볼 수 없습니다. 진입점 실행(서비스 `_run_task`, `main_once`,
+`main_one_day`, 데몬 수집) 1회마다 `data_dir/run_history.db` 의
+`run_history` 테이블에 한 줄을 남깁니다.
+
+• 시작/종료 시각, 상태(ok / error / skipped), 오류 클래스
+• 메일·첨부 건수와 바이트, Graph(IMAP) 요청 수, 재시도 수, 업로드 파일·바이트
+• 단계별 소요 시간(`fetch.body`, `upload.put` …) — `metrics` 기록에서 가져옴
+
+`RUN_HISTORY_DAYS`(기본 180일)보다 오래된 줄은 기록할 때 지웁니다.
+기록 실패는 경고만 남기고 실행에는 영향을 주지 않습니다.
+
+사용법
+-----
+$ python run_history.py                      # 최근 30일, 날짜별
+$ python run_history.py --by hour --days 14  # 시간대별 (용량 한계 확인)
+$ python run_history.py --stage fetch.body   # 특정 단계 소요 시간 분포
+$ python run_history.py --entry main --last 20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterator
+
+from exceptions import DBQueryError, DBWriteError
+from logger import get_logger
+import metrics
+
+__all__ = ["RunEntry", "RunHistory", "track"]
+
+logger = get_logger()
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_SKIPPED = "skipped"       # 다른 프로세스가 수집 중이라 건너뜀
+
+
+@dataclass(slots=True)
+class RunEntry:
+    """`track()` 블록 안에서 호출한 쪽이 결과를 알려 주는 객체."""
+    entry: str
+    status: str | None = None    # 정하지 않으면 예외/지표로 판단
+    discarded: bool = False
+    started_at: datetime = field(default_factory=datetime.now)
+
+    def discard(self) -> None:
+        """이 실행은 기록하지 않는다 (예: 데몬에 수집을 맡긴 main_once — 데몬이 기록)."""
+        self.discarded = True
+
+
+class RunHistory:
+    """`run_history` sqlite 테이블."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with self._connect() as conn:
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS run_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    entry TEXT NOT NULL,             -- main / main_once / main_one_day / daemon
+                    started_at TEXT NOT NULL,        -- 로컬 시각 ISO
+                    ended_at TEXT NOT NULL,
+                    duration REAL NOT NULL,          -- 초
+                    status TEXT NOT NULL,            -- ok / error / skipped
+                    error TEXT,                      -- 예외 클래스 이름
+                    messages INTEGER NOT NULL DEFAULT 0,
+                    attachments INTEGER NOT NULL DEFAULT 0,
+                    attach_bytes INTEGER NOT NULL DEFAULT 0,
+                    graph_requests INTEGER NOT NULL DEFAULT 0,
+                    retries INTEGER NOT NULL DEFAULT 0,
+                    upload_files INTEGER NOT NULL DEFAULT 0,
+                    upload_bytes INTEGER NOT NULL DEFAULT 0,
+                    stages TEXT                      -- {"fetch.body": 1.23, ...} JSON
+                )
+            """)
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_run_history_started "
+                             "ON run_history (started_at)")
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 실행 이력 테이블 생성 실패: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def add(self, row: dict[str, Any], keep_days: int = 0) -> None:
+        """한 줄 추가, `keep_days` 보다 오래된 줄 삭제 (0 = 모두 보관)."""
+        cols = ", ".join(row)
+        marks = ", ".join("?" * len(row))
+        try:
+            with self._connect() as conn:
+                conn.execute(f"INSERT INTO run_history ({cols}) VALUES ({marks})", tuple(row.values()))
+                if keep_days > 0:
+                    cutoff = (datetime.now() - timedelta(days=keep_days)).isoformat(timespec="seconds")
+                    conn.execute("DELETE FROM run_history WHERE started_at < ?", (cutoff,))
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 실행 이력 기록 실패: {e}")
+
+    def rows(self, since: datetime, entry: str | None = None) -> list[dict[str, Any]]:
+        sql = "SELECT * FROM run_history WHERE started_at >= ?"
+        params: list[Any] = [since.isoformat(timespec="seconds")]
+        if entry:
+            sql += " AND entry = ?"
+            params.append(entry)
+        try:
+            with self._connect() as conn:
+                conn.row_factory = sqlite3.Row
+                return [dict(r) for r in conn.execute(sql + " ORDER BY started_at", params)]
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 실행 이력 조회 오류: {e}")
+
+
+def _build_row(run: RunEntry, records: list[dict[str, Any]], exc: BaseException | None,
+               duration: float) -> dict[str, Any]:
+    counters: dict[str, int] = {}
+    stages: dict[str, float] = {}
+    errors = []
+    for record in records:
+        for k, v in record["counters"].items():
+            counters[k] = counters.get(k, 0) + v
+        for k, v in record["stages"].items():
+            key = f"{record['kind']}.{k}"
+            stages[key] = round(stages.get(key, 0.0) + v, 4)
+        if record.get("error"):
+            errors.append(record["error"])
+
+    fetch_failed = any(r["kind"] == "fetch" and r["status"] != "ok" for r in records)
+    if exc is not None and not (isinstance(exc, SystemExit) and exc.code in (None, 0)):
+        status = STATUS_ERROR
+        errors.append(type(exc).__name__)
+    elif fetch_failed:
+        status = STATUS_ERROR
+    else:
+        status = run.status or STATUS_OK
+    return {
+        "entry": run.entry,
+        "started_at": run.started_at.isoformat(timespec="seconds"),
+        "ended_at": datetime.now().isoformat(timespec="seconds"),
+        "duration": round(duration, 3),
+        "status": status,
+        "error": errors[0] if errors else None,    # 지표에 남은 원래 예외가 SystemExit 보다 먼저
+        "messages": counters.get("messages", 0),
+        "attachments": counters.get("attachments", 0),
+        "attach_bytes": counters.get("attach_bytes", 0),
+        "graph_requests": counters.get("graph_requests", 0) + counters.get("imap_requests", 0),
+        "retries": counters.get("graph_retries", 0) + counters.get("retries", 0),
+        "upload_files": counters.get("upload_files", 0),
+        "upload_bytes": counters.get("upload_bytes", 0),
+        "stages": json.dumps(stages) if stages else None,
+    }
+
+
+@contextmanager
+def track(config, entry: str) -> Iterator[RunEntry]:
+    """블록 1회를 `entry` 실행으로 기록한다 (블록 안에서 끝난 fetch/upload 지표 포함)."""
+    run = RunEntry(entry)
+    t0 = time.perf_counter()
+    exc: BaseException | None = None
+    with metrics.collect() as records:
+        try:
+            yield run
+        except BaseException as e:
+            exc = e
+            raise
+        finally:
+            if not run.discarded:
+                _save(config, _build_row(run, records, exc, time.perf_counter() - t0))
+
+
+def _save(config, row: dict[str, Any]) -> None:
+    try:
+        RunHistory(config.run_history_file).add(row, keep_days=config.run_history_days)
+    except Exception as e:  # noqa: BLE001 — 이력 기록 실패로 실행을 실패시키지 않음
+        logger.warning(f"⚠️ 실행 이력 기록 실패: {e}")
+
+
+# ─────────────────────────────── 리포트 ─────────────────────────────────────
+
+def percentile(values: list[float], pct: float) -> float:
+    """nearest-rank 백분위수 (값이 없으면 0)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))          # ceil
+    return ordered[int(rank) - 1]
+
+
+def _metric(row: dict[str, Any], stage: str | None) -> float | None:
+    if stage is None:
+        return row["duration"]
+    return json.loads(row["stages"] or "{}").get(stage)
+
+
+def report(rows: list[dict[str, Any]], by: str = "day", stage: str | None = None) -> list[str]:
+    """날짜별 / 시간대별 건수·오류·처리량과 소요 시간 백분위수 표."""
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for row in rows:
+        key = row["started_at"][:10] if by == "day" else f"{row['started_at'][11:13]}시"
+        groups.setdefault(key, []).append(row)
+
+    label = stage or "duration"
+    lines = [f"{by:<10} {'runs':>5} {'err':>4} {'skip':>4} {'msgs':>6} {'MB':>8} "
+             f"{label + ' p50':>14} {'p90':>8} {'p99':>8} {'max':>8}"]
+    all_values: list[float] = []
+    for key in sorted(groups):
+        group = groups[key]
+        worked = [r for r in group if r["status"] != STATUS_SKIPPED]
+        values = [v for r in worked if (v := _metric(r, stage)) is not None]
+        all_values += values
+        mb = sum(r["attach_bytes"] for r in group) / 1024 / 1024
+        lines.append(
+            f"{key:<10} {len(group):>5} {sum(r['status'] == STATUS_ERROR for r in group):>4} "
+            f"{len(group) - len(worked):>4} {sum(r['messages'] for r in group):>6} {mb:>8.1f} "
+            f"{percentile(values, 50):>14.2f} {percentile(values, 90):>8.2f} "
+            f"{percentile(values, 99):>8.2f} {max(values, default=0):>8.2f}")
+    lines.append(f"{'전체':<9} {len(rows):>5} {'':>4} {'':>4} {sum(r['messages'] for r in rows):>6} "
+                 f"{sum(r['attach_bytes'] for r in rows) / 1024 / 1024:>8.1f} "
+                 f"{percentile(all_values, 50):>14.2f} {percentile(all_values, 90):>8.2f} "
+                 f"{percentile(all_values, 99):>8.2f} {max(all_values, default=0):>8.2f}")
+    return lines
+
+
+def _recent(rows: list[dict[str, Any]], n: int) -> list[str]:
+    lines = [f"{'started_at':<20} {'entry':<13} {'status':<8} {'sec':>8} {'msgs':>5} {'retry':>5}  error"]
+    for r in rows[-n:]:
+        lines.append(f"{r['started_at']:<20} {r['entry']:<13} {r['status']:<8} {r['duration']:>8.2f} "
+                     f"{r['messages']:>5} {r['retries']:>5}  {r['error'] or ''}")
+    return lines
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="fund_mail 실행 이력 리포트")
+    parser.add_argument("--days", type=int, default=30, help="최근 N일 (기본 30)")
+    parser.add_argument("--by", choices=("day", "hour"), default="day", help="묶는 기준 (기본 day)")
+    parser.add_argument("--entry", help="진입점만 (main / main_once / main_one_day / daemon)")
+    parser.add_argument("--stage", help="전체 소요 시간 대신 이 단계 시간 (예: fetch.body, upload.put)")
+    parser.add_argument("--last", type=int, default=0, help="최근 실행 N건도 출력")
+    return parser.parse_args()
+
+
+def main() -> None:
+    from config import Config
+
+    args = _parse_args()
+    cfg = Config.load()
+    rows = RunHistory(cfg.run_history_file).rows(datetime.now() - timedelta(days=args.days), args.entry)
+    if not rows:
+        print(f"최근 {args.days}일 실행 이력이 없습니다: {cfg.run_history_file}")
+        return
+    print("\n".join(report(rows, args.by, args.stage)))
+    if args.last:
+        print()
+        print("\n".join(_recent(rows, args.last)))
+
+
+if __name__ == "__main__":
+    main()
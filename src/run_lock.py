@@ -0,0 +1,96 @@
+"""run_lock.py — 프로세스 간 실행 잠금
+=======================================
+서비스(main.py)와 작업 스케줄러가 띄운 main_once.exe, 수동 실행한
+main_one_day 가 동시에 수집하지 않도록 `data_dir/fund_mail.lock` 파일에
+OS 잠금을 건다. 프로세스가 죽으면 OS 가 잠금을 풀어 주므로 잠금 파일이
+남아 있어도 문제없다.
+
+사용 예::
+
+    from run_lock import RunLock
+    lock = RunLock(cfg.run_lock_file)
+    if not lock.acquire():          # 다른 프로세스가 수집 중
+        return
+    try:
+        ...
+    finally:
+        lock.release()
+"""
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+__all__ = ["RunLock"]
+
+_POLL_INTERVAL = 1.0
+
+
+class RunLock:
+    """비차단 파일 잠금 (Windows: msvcrt, 그 외: fcntl)."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._fh = None
+
+    @property
+    def held(self) -> bool:
+        return self._fh is not None
+
+    def _try_lock(self) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(self.path, "a+")
+        try:
+            if os.name == "nt":
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        # 누가 잡고 있는지 보이도록 pid 기록 (잠금 판단에는 쓰지 않음)
+        fh.seek(0)
+        fh.truncate()
+        fh.write(f"{os.getpid()} {datetime.now().isoformat(timespec='seconds')}\n")
+        fh.flush()
+        self._fh = fh
+        return True
+
+    def acquire(self, timeout: float = 0) -> bool:
+        """잠금을 잡으면 True. `timeout` 초 동안 재시도하고, 0 이면 한 번만 시도."""
+        if self._fh is not None:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._try_lock():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(_POLL_INTERVAL)
+
+    def release(self) -> None:
+        if self._fh is None:
+            return
+        try:
+            if os.name == "nt":
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> "RunLock":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
@@ -0,0 +1,133 @@
+"""run_state.py — 수집 커서(LAST_TIME.json) 저장소
+==================================================
+마지막으로 받은 메일의 시각·ID 를 프로세스 안에 한 번만 읽어 두고
+메모리에서 돌려줍니다. 저장은 임시 파일에 쓴 뒤 `os.replace` 로 바꿔
+끼우므로 쓰는 도중 죽어도 이전 내용이나 새 내용 중 하나만 남습니다.
+
+수집 흐름에서는 메일 DB 를 커밋하고 업로드 대기열에 넣은 다음 커서를
+저장합니다. 그 전에 실패하면 커서는 그대로라 다음 실행에서 같은 메일을
+다시 받고, 별도의 `.previous` 백업/복구가 필요 없습니다. 커서 저장이
+실패하면 `RunStateError` 로 실행을 실패시킵니다 (이미 대기열에 넣은 DB 는
+업로드되고, 다음 실행이 같은 메일을 한 번 더 받음).
+
+다른 프로세스(main_once, 서비스)가 같은 파일을 갱신할 수 있으므로 수집
+시작 시 `refresh()` 로 파일이 바뀌었을 때만 다시 읽습니다.
+
+사용 예::
+
+    from run_state import get_run_state
+    state = get_run_state(cfg)
+    state.refresh()                       # 실행마다 1번 (바뀐 경우에만 파싱)
+    cursor, last_id = state.last_fetch_time, state.last_email_id
+    state.commit(last_mail_time, last_id, title)
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from exceptions import RunStateError
+
+__all__ = ["RunState", "get_run_state"]
+
+UTC = timezone.utc
+KST = timezone(timedelta(hours=9))
+
+_states: dict[Path, "RunState"] = {}
+_states_lock = threading.Lock()
+
+
+class RunState:
+    """`LAST_TIME.json` 의 메모리 캐시 + 원자적 저장."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._data: dict[str, Any] = {}
+        self._mtime_ns: int | None = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self) -> None:
+        """파일이 마지막으로 읽은 뒤 바뀌었으면 다시 읽는다."""
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        with self._lock:
+            if mtime_ns == self._mtime_ns:
+                return
+            data: dict[str, Any] = {}
+            if mtime_ns is not None:
+                try:
+                    data = json.loads(self.path.read_text(encoding="utf-8"))
+                except Exception:  # noqa: BLE001 (손상된 파일은 없는 것으로 취급)
+                    data = {}
+            self._data = data
+            self._mtime_ns = mtime_ns
+
+    @property
+    def data(self) -> dict[str, Any]:
+        return dict(self._data)
+
+    @property
+    def last_fetch_time(self) -> datetime:
+        """마지막 수집 시각(UTC). 없거나 읽을 수 없으면 오늘 00:00(KST)."""
+        ts_str = self._data.get("last_fetch_time")
+        if ts_str:
+            try:
+                ts = datetime.fromisoformat(ts_str.replace("Z", "+00:00"))
+                if ts.tzinfo is None:
+                    ts = ts.replace(tzinfo=UTC)
+                return ts.astimezone(UTC)
+            except (TypeError, ValueError):
+                pass
+        midnight_local = datetime.now(KST).replace(hour=0, minute=0, second=0, microsecond=0)
+        return midnight_local.astimezone(UTC)
+
+    @property
+    def last_email_id(self) -> str:
+        return self._data.get("last_email_id") or ""
+
+    def commit(self, last_fetch_time: str, last_email_id: str, title: str | None,
+               last_fetch_time_kst: str = "", **extra: Any) -> dict[str, Any]:
+        """새 커서를 임시 파일에 쓰고 `os.replace` 로 교체한 뒤 메모리에도 반영.
+        실패하면 메모리 커서도 그대로 두고 `RunStateError`.
+
+        `extra` 는 최상위 키로 함께 저장한다 (예: IMAP 폴더별 UID 커서 `imap=`).
+        """
+        with self._lock:
+            data = dict(self._data)
+            data.update(extra)
+            data["last_fetch_time"] = last_fetch_time
+            data["last_email_id"] = last_email_id
+            data["last_fetch_time_kst"] = last_fetch_time_kst
+            data["title"] = title
+
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+                with tmp.open("w", encoding="utf-8") as fh:
+                    json.dump(data, fh, indent=4, ensure_ascii=False)
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                os.replace(tmp, self.path)
+            except (OSError, TypeError, ValueError) as e:
+                raise RunStateError(f"❌ 수집 커서 저장 실패: {self.path}: {e}") from e
+
+            self._data = data
+            self._mtime_ns = self.path.stat().st_mtime_ns
+            return dict(data)
+
+
+def get_run_state(config) -> RunState:
+    """`config.last_time_file` 에 대한 프로세스 공용 RunState."""
+    path = config.last_time_file
+    with _states_lock:
+        state = _states.get(path)
+        if state is None:
+            state = _states[path] = RunState(path)
+        return state
@@ -51,13 +51,14 @@ class FundEmailFetchService(win32serviceutil.ServiceFramework):
         """서비스용 로깅 설정"""
         log_path = Path("C:/fund_mail/logs")
         log_path.mkdir(parents=True, exist_ok=True)
+        # 서비스에는 콘솔이 없다 — fund_mail 로거도 파일에만 쓴다 (.env 의 LOG_CONSOLE=1 이면 켬)
+        os.environ["FUND_MAIL_SERVICE"] = "1"
         
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             handlers=[
                 logging.FileHandler(log_path / "service.log", encoding='utf-8'),
-                logging.StreamHandler()
             ]
         )
         self.logger = logging.getLogger(__name__)
@@ -70,7 +71,7 @@ class FundEmailFetchService(win32serviceutil.ServiceFramework):
         # 스케줄러 중지
         if self.scheduler:
             try:
-                self.scheduler.stop()
+                self.scheduler.close()     # 상태 엔드포인트(HEALTH_PORT)까지 종료
                 self.logger.info("스케줄러 중지 완료")
             except Exception as e:
                 self.logger.error(f"스케줄러 중지 중 오류: {e}")
@@ -148,7 +149,7 @@ class FundEmailFetchService(win32serviceutil.ServiceFramework):
                 return
             
             # ★ 스케줄러 초기화
-            self.scheduler = TaskScheduler(interval=300)  # 5분
+            self.scheduler = TaskScheduler()  # 간격: SCHEDULER_INTERVAL (기본 5분, 적응형)
             self.logger.info("TaskScheduler 객체 생성 완료")
             
             # ★ 스케줄러 시작
@@ -162,6 +163,7 @@ class FundEmailFetchService(win32serviceutil.ServiceFramework):
         except Exception as e:
             self.logger.error(f"스케줄러 실행 중 오류: {e}", exc_info=True)
             # 스케줄러 오류 시 서비스는 계속 실행 (서비스 자체를 중지하지 않음)
+            # — HEALTH_PORT 를 켜 두면 /health 가 503 stopped 로 알린다
         finally:
             if self.scheduler:
                 try:
@@ -198,7 +200,7 @@ def run_debug():
         # TaskScheduler import
         from main import TaskScheduler
         
-        scheduler = TaskScheduler(interval=300)  # 5분
+        scheduler = TaskScheduler()  # 간격: SCHEDULER_INTERVAL (기본 5분, 적응형)
         scheduler.start()
         
         print("서비스가 실행 중입니다. Ctrl+C로 중지하세요.")
@@ -211,12 +213,12 @@ def run_debug():
     except KeyboardInterrupt:
         print("\n서비스를 중지합니다...")
         logger.info("사용자가 디버그 모드 스케줄러를 중단했습니다.")
-        scheduler.stop()
+        scheduler.close()
         print("서비스가 중지되었습니다.")
     except Exception as e:
         logger.error(f"디버그 모드 실행 중 오류 발생: {e}", exc_info=True)
         if 'scheduler' in locals():
-            scheduler.stop()
+            scheduler.close()
 
 if __name__ == '__main__':
     if len(sys.argv) == 1:
@@ -0,0 +1,283 @@
+"""sftp_connection.py — paramiko 전송 엔진
+==========================================
+`Config` 의 SFTP 튜닝 값(윈도·패킷·버퍼 크기, pipelining, 압축, cipher)
+을 적용해 SFTP 연결을 열고 파일을 전송합니다.
+
+`SFTPConnectionManager` 는 스케줄러 수명 동안 연결 하나를 유지합니다.
+SSH keepalive 로 연결을 살려 두고, 사용 전 상태를 확인해 끊겼으면
+다시 연결하므로 SSH 핸드셰이크·인증 비용은 서비스 기동 시 한 번만 듭니다.
+
+사용 예::
+
+    from sftp_connection import open_sftp, put_file
+    transport, sftp = open_sftp(cfg)
+    put_file(sftp, cfg, local_path, remote_path)
+
+    conn = SFTPConnectionManager(cfg)   # 스케줄러가 소유
+    sftp = conn.get()                   # 살아 있으면 재사용, 아니면 재연결
+    conn.close()
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import weakref
+
+import paramiko
+
+from logger import get_logger
+
+__all__ = ["SFTPConnectionManager", "open_sftp", "put_file", "read_remote",
+           "remote_check_sha256", "verify_remote", "verify_remote_prefix"]
+
+logger = get_logger()
+
+_SAMPLE_SIZE = 64 * 1024        # 읽어서 비교하는 구간 하나의 크기
+_SAMPLE_COUNT = 3               # 처음 / 가운데 / 끝
+
+# 서버가 check-file 확장을 지원하는지 연결별로 기억 (매번 실패 왕복 방지)
+_check_file_supported: "weakref.WeakKeyDictionary[paramiko.SFTPClient, bool]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _apply_ciphers(transport: paramiko.Transport, preferred: tuple[str, ...]) -> None:
+    """선호 cipher 를 앞으로 당긴다. paramiko 가 모르는 이름은 무시."""
+    if not preferred:
+        return
+    opts = transport.get_security_options()
+    available = tuple(opts.ciphers)
+    chosen = [c for c in preferred if c in available]
+    unknown = [c for c in preferred if c not in available]
+    if unknown:
+        logger.warning(f"⚠️ 지원하지 않는 SFTP cipher 무시: {', '.join(unknown)}")
+    if chosen:
+        opts.ciphers = tuple(chosen) + tuple(c for c in available if c not in chosen)
+
+
+def open_sftp(config) -> tuple[paramiko.Transport, paramiko.SFTPClient]:
+    """튜닝 값을 적용한 Transport 와 SFTPClient 를 반환."""
+    transport = paramiko.Transport(
+        (config.sftp_host, config.sftp_port),
+        default_window_size=config.sftp_window_size,
+        default_max_packet_size=config.sftp_max_packet_size,
+    )
+    try:
+        transport.use_compression(config.sftp_compress)
+        _apply_ciphers(transport, config.sftp_ciphers)
+        transport.connect(username=config.sftp_id, password=config.sftp_pw)
+        if config.sftp_keepalive > 0:
+            transport.set_keepalive(config.sftp_keepalive)
+        sftp = paramiko.SFTPClient.from_transport(
+            transport,
+            window_size=config.sftp_window_size,
+            max_packet_size=config.sftp_max_packet_size,
+        )
+    except Exception:
+        transport.close()
+        raise
+    return transport, sftp
+
+
+def put_file(sftp: paramiko.SFTPClient, config, local_path, remote_path: str,
+             offset: int = 0) -> int:
+    """
+    로컬 파일을 원격에 쓴다. `offset > 0` 이면 그 위치부터 이어서 쓴다.
+
+    `sftp.put` 대신 직접 쓰는 이유: 버퍼 크기와 pipelined write 를
+    설정값으로 조절하기 위함. pipelined 모드에서는 각 write 의 응답을
+    기다리지 않고 연속 전송하며, close 시점에 한꺼번에 확인한다.
+
+    Returns
+    -------
+    int
+        이번 호출에서 전송한 바이트 수
+    """
+    sent = 0
+    buffer_size = config.sftp_buffer_size
+    mode = "r+" if offset else "wb"
+    with open(local_path, "rb") as src, sftp.open(remote_path, mode, bufsize=buffer_size) as dst:
+        dst.set_pipelined(config.sftp_pipelined)
+        if offset:
+            src.seek(offset)
+            dst.seek(offset)
+        for chunk in iter(lambda: src.read(buffer_size), b""):
+            dst.write(chunk)
+            sent += len(chunk)
+    return sent
+
+
+def read_remote(sftp: paramiko.SFTPClient, config, remote_path: str,
+                offset: int = 0, length: int | None = None) -> bytes:
+    """원격 파일의 `offset` 부터 `length` 바이트(None 이면 끝까지)를 읽는다."""
+    with sftp.open(remote_path, "rb", bufsize=config.sftp_buffer_size) as f:
+        if config.sftp_prefetch:
+            f.prefetch(None if length is None else offset + length)
+        f.seek(offset)
+        return f.read(length) if length is not None else f.read()
+
+
+def remote_check_sha256(sftp: paramiko.SFTPClient, remote_path: str,
+                        length: int = 0) -> str | None:
+    """서버측 `check-file` 확장으로 원격 파일(`length` > 0 이면 앞부분만) sha256 을 구한다.
+    미지원이면 None."""
+    if _check_file_supported.get(sftp) is False:
+        return None
+    try:
+        with sftp.open(remote_path, "rb") as f:
+            digest = f.check("sha256", 0, length, 0)
+    except IOError as e:
+        if not _is_unsupported(e):
+            # 일시적인 오류 — 이 파일만 표본 비교, 다음 파일은 다시 check-file 시도
+            logger.debug("check-file 실패, 표본 비교로 검증: %s - %s", remote_path, e)
+            return None
+        _check_file_supported[sftp] = False
+        logger.info("SFTP 서버가 check-file 확장을 지원하지 않아 표본 비교로 검증합니다.")
+        return None
+    _check_file_supported[sftp] = True
+    return digest.hex()
+
+
+def _is_unsupported(e: IOError) -> bool:
+    """서버가 check-file(또는 sha256)을 지원하지 않는다는 응답인가.
+
+    paramiko 는 ENOENT/EACCES 외 상태 코드를 errno 없이 서버 메시지로만
+    돌려준다 (OpenSSH: "Operation unsupported", paramiko 서버: "No supported
+    hash types found"). 소켓 오류처럼 errno 가 있는 것은 일시적인 것으로 본다.
+    """
+    if e.errno is not None:
+        return False
+    text = str(e).lower()
+    return any(w in text for w in ("unsupported", "not supported", "no supported"))
+
+
+def _sample_offsets(size: int) -> list[int]:
+    if size <= _SAMPLE_SIZE * _SAMPLE_COUNT:
+        return list(range(0, size, _SAMPLE_SIZE))     # 작은 파일은 모든 구간
+    return sorted({0, (size - _SAMPLE_SIZE) // 2, size - _SAMPLE_SIZE})
+
+
+def verify_remote(sftp: paramiko.SFTPClient, config, local_path, remote_path: str,
+                  size: int, sha256: str | None) -> str:
+    """
+    업로드된 원격 파일을 로컬 파일 전체를 다시 읽지 않고 검증한다.
+
+    1. 원격 크기 == 로컬 크기 (호출 전에 확인됨)
+    2. 서버가 check-file 을 지원하면 원격 sha256 == 기록된 sha256
+    3. 아니면 처음/가운데/끝 구간(각 64 KB)만 원격·로컬에서 읽어 비교
+       (192 KB 이하 파일은 전체를 비교)
+
+    Returns
+    -------
+    str
+        사용한 방법 ("check-file" / "sample" / "size"). 불일치면 ValueError.
+    """
+    if config.sftp_verify == "size":
+        return "size"
+    if sha256:
+        remote_sha = remote_check_sha256(sftp, remote_path)
+        if remote_sha is not None:
+            if remote_sha != sha256:
+                raise ValueError(f"원격 sha256 불일치: {remote_path}")
+            return "check-file"
+    _compare_samples(sftp, config, local_path, remote_path, size)
+    return "sample"
+
+
+def verify_remote_prefix(sftp: paramiko.SFTPClient, config, local_path, remote_path: str,
+                         length: int) -> str:
+    """
+    이어서 전송하기 전에 원격 파일의 앞 `length` 바이트가 로컬 파일과 같은지 확인한다.
+
+    서버가 check-file 을 지원하면 앞부분 sha256 을, 아니면 처음/가운데/끝
+    구간을 비교한다. `SFTP_VERIFY=size` 여도 확인한다 — 다른 파일 뒤에
+    이어 붙이면 크기 검증으로는 잡을 수 없기 때문.
+
+    Returns
+    -------
+    str
+        사용한 방법 ("check-file" / "sample"). 불일치면 ValueError.
+    """
+    remote_sha = remote_check_sha256(sftp, remote_path, length)
+    if remote_sha is not None:
+        h = hashlib.sha256()
+        with open(local_path, "rb") as f:
+            remaining = length
+            while remaining:
+                chunk = f.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                h.update(chunk)
+                remaining -= len(chunk)
+        if remote_sha != h.hexdigest():
+            raise ValueError(f"원격 앞부분 sha256 불일치: {remote_path}")
+        return "check-file"
+    _compare_samples(sftp, config, local_path, remote_path, length)
+    return "sample"
+
+
+def _compare_samples(sftp: paramiko.SFTPClient, config, local_path, remote_path: str,
+                     size: int) -> None:
+    with open(local_path, "rb") as f:
+        for offset in _sample_offsets(size):
+            f.seek(offset)
+            local = f.read(min(_SAMPLE_SIZE, size - offset))
+            if read_remote(sftp, config, remote_path, offset, len(local)) != local:
+                raise ValueError(f"원격 내용 불일치(offset {offset}): {remote_path}")
+
+
+class SFTPConnectionManager:
+    """스케줄러 수명 동안 재사용되는 SFTP 연결."""
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.Lock()
+        self._transport: paramiko.Transport | None = None
+        self._sftp: paramiko.SFTPClient | None = None
+        self.connect_count = 0          # 실제 SSH 연결 횟수 (재연결 포함)
+
+    def _is_healthy(self) -> bool:
+        """Transport 가 살아 있고 SFTP 요청 1건이 정상 응답하는가."""
+        if self._sftp is None or self._transport is None or not self._transport.is_active():
+            return False
+        try:
+            self._sftp.normalize(".")
+            return True
+        except Exception as e:  # noqa: BLE001 — 어떤 오류든 재연결 대상
+            logger.warning(f"⚠️ SFTP 연결 상태 확인 실패, 재연결합니다: {e}")
+            return False
+
+    def get(self) -> paramiko.SFTPClient:
+        """정상 연결을 반환. 끊겼으면 다시 연결한다."""
+        with self._lock:
+            if self._is_healthy():
+                return self._sftp
+            self._close_locked()
+            self._transport, self._sftp = open_sftp(self.config)
+            self.connect_count += 1
+            logger.info(f"🔵 SFTP 연결 수립 (누적 {self.connect_count}회): "
+                        f"{self.config.sftp_host}:{self.config.sftp_port}")
+            return self._sftp
+
+    @property
+    def is_connected(self) -> bool:
+        return self._transport is not None and self._transport.is_active()
+
+    def invalidate(self) -> None:
+        """오류가 난 연결을 버린다. 다음 `get()` 에서 새로 연결."""
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        # `close()`는 idempotent하므로 중복 호출해도 안전
+        if self._sftp:
+            self._sftp.close()
+        if self._transport:
+            self._transport.close()
+        self._sftp = None
+        self._transport = None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._transport:
+                logger.info("🔴 SFTP 연결 종료")
+            self._close_locked()
@@ -6,7 +6,13 @@ import paramiko
 import sqlite3
 from exceptions import SFTPUploadError
 from exceptions import DBQueryError
+from bundle_upload import upload_bundle
 from logger import get_logger
+import metrics
+from remote_dir_cache import RemoteDirCache, get_remote_dir_cache
+from sftp_connection import (SFTPConnectionManager, open_sftp, put_file, verify_remote,
+                             verify_remote_prefix)
+from upload_manifest import UploadManifest, file_sha256
 
 
 logger = get_logger()
@@ -15,11 +21,11 @@ logger = get_logger()
 def extract_date_from_db_path(db_path):
     """
     DB 파일 경로에서 날짜 부분을 추출
-    예: '/home/kdy987/fund_mail/2025-06-30/fm_2025_06_23_14_29.db' -> '2025_06_23'
+    예: '/home/kdy987/fund_mail/2025-06-30/fm_2025_06_23_14_29_05.db' -> '2025_06_23'
     """
     filename = os.path.basename(db_path)
-    # fm_YYYY_MM_DD_HH_MM.db 패턴에서 날짜 부분 추출
-    pattern = r'fm_(\d{4}_\d{2}_\d{2})_\d{2}_\d{2}\.db'
+    # fm_YYYY_MM_DD_HH_MM[_SS][_번호].db 패턴에서 날짜 부분 추출 (예전 분 단위 이름 포함)
+    pattern = r'fm_(\d{4}_\d{2}_\d{2})_\d{2}_\d{2}(?:_\d+)*\.db'
     match = re.search(pattern, filename)
     if match:
         return match.group(1)
@@ -39,73 +45,264 @@ def remote_exists(sftp: paramiko.SFTPClient, path: str) -> bool:
             return False
         raise                           # 다른 오류는 그대로 전파
 
-def mkdir_p(sftp: paramiko.SFTPClient, path: str) -> None:
-    """`mkdir -p`처럼 상위 디렉터리까지 재귀적으로 생성"""
+def remote_size(sftp: paramiko.SFTPClient, path: str) -> int | None:
+    """원격 파일 크기. 파일이 없으면 None"""
+    try:
+        return sftp.stat(path).st_size
+    except FileNotFoundError:
+        return None
+    except IOError as e:
+        if e.errno == errno.ENOENT:
+            return None
+        raise
+
+def mkdir_p(sftp: paramiko.SFTPClient, path: str, cache: RemoteDirCache | None = None) -> None:
+    """`mkdir -p`처럼 상위 디렉터리까지 재귀적으로 생성
+
+    `cache` 에 이미 있는 디렉터리는 원격 확인 없이 건너뛴다.
+    """
+    if cache is not None and path in cache:
+        return
     parts = []
     while path not in ("", "/"):
         parts.append(path)
         path = os.path.dirname(path)
     for p in reversed(parts):
+        if cache is not None and p in cache:
+            continue
         if not remote_exists(sftp, p):
             sftp.mkdir(p)
             logger.info(f"SFTP 디렉터리 생성: {p}")
+        if cache is not None:
+            cache.add(p)
 
 
-def get_local_attach_file_list(db_path):
-    """db_path의 sqlite를 읽어서 첨부파일의 목록을  가져오기"""
+def get_local_attach_files(db_path) -> list[tuple[str, str | None]]:
+    """db_path의 sqlite를 읽어서 (첨부파일 상대경로, sha256) 목록을 가져오기
 
+    sha256 컬럼이 없는 예전 DB 는 sha256 을 None 으로 돌려준다.
+    """
     try:
         conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT save_folder, phy_file_name FROM fund_mail_attach")
-        rows = cur.fetchall()
-        conn.close()
-        
-        file_list = [os.path.join(row[0], row[1]) for row in rows]
-        return file_list
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT save_folder, phy_file_name, sha256 FROM fund_mail_attach")
+            except sqlite3.OperationalError:     # sha256 컬럼 추가 전 DB
+                cur.execute("SELECT save_folder, phy_file_name, NULL FROM fund_mail_attach")
+            rows = cur.fetchall()
+        finally:
+            conn.close()
+        return [(os.path.join(row[0], row[1]), row[2]) for row in rows]
     except sqlite3.Error as e:
         raise DBQueryError(f"❌ DB 첨부파일 목록 조회 오류: {e}")
 
 
+def get_local_attach_file_list(db_path):
+    """db_path의 sqlite를 읽어서 첨부파일의 목록을  가져오기"""
+    return [path for path, _ in get_local_attach_files(db_path)]
 
-def upload_to_sftp(config, db_path):
-    """SFTP 서버에 DB 파일과 첨부파일 업로드"""
-    transport = None
-    sftp = None
+
+
+def _verify_or_discard(sftp: paramiko.SFTPClient, config, local_path, remote_path: str,
+                       size: int, sha256: str) -> str | None:
+    """원격 파일 검증. 불일치면 원격 파일을 지우고 None 을 돌려준다."""
+    try:
+        return verify_remote(sftp, config, local_path, remote_path, size, sha256)
+    except ValueError as e:
+        logger.warning(f"⚠️ {e} — 원격 파일 삭제 후 다시 전송합니다.")
+        sftp.remove(remote_path)
+        return None
+
+
+def _resume_offset(sftp: paramiko.SFTPClient, config, local_path, remote_path: str,
+                   r_size: int | None, size: int) -> int:
+    """이어서 전송할 위치. 원격 앞부분이 로컬과 다르면 0 (처음부터 전송)."""
+    if not r_size or r_size >= size:
+        return 0
+    try:
+        verify_remote_prefix(sftp, config, local_path, remote_path, r_size)
+    except ValueError as e:
+        logger.warning(f"⚠️ {e} — 이어 쓰지 않고 처음부터 다시 전송합니다.")
+        return 0
+    return r_size
+
+
+def sync_file(sftp: paramiko.SFTPClient, config, manifest: UploadManifest,
+              local_path, remote_path: str, sha256: str | None = None) -> bool:
+    """
+    매니페스트를 기준으로 한 파일을 원격과 맞춘다.
+
+    • 업로드 완료로 기록돼 있고 로컬 파일이 그대로면 → 원격 호출 없이 건너뜀
+    • 원격 크기 == 로컬 크기 + 내용 검증 통과          → 완료로 기록만 함
+    • 0 < 원격 크기 < 로컬 크기, 앞부분 일치           → 남은 바이트만 이어서 전송
+    • 그 외(없음/더 큼/앞부분 다름)                    → 처음부터 전송
+
+    Returns
+    -------
+    bool
+        실제로 바이트를 전송했으면 True, 건너뛰었으면 False
+    """
+    st = os.stat(local_path)
+    size, mtime_ns = st.st_size, st.st_mtime_ns
+
+    entry = manifest.get(local_path)
+    if entry and entry.is_done_for(remote_path, size, mtime_ns):
+        logger.debug("업로드 완료 기록 있음, 건너뜀: %s", remote_path)
+        metrics.incr("upload_skipped")
+        return False
+
+    if sha256:
+        pass                                # 첨부 저장 시 계산해 DB 에 기록된 해시
+    elif entry and entry.file_size == size and entry.mtime_ns == mtime_ns:
+        sha256 = entry.sha256               # 로컬 파일이 그대로면 해시 재계산 생략
+    else:
+        sha256 = file_sha256(local_path)
+
+    with metrics.stage("verify"):
+        r_size = remote_size(sftp, remote_path)
+        present = r_size == size and _verify_or_discard(sftp, config, local_path, remote_path,
+                                                        size, sha256)
+    if present:
+        manifest.mark_done(local_path, remote_path, size, mtime_ns, sha256)
+        logger.info(f"원격에 이미 존재, 건너뜀: {remote_path}")
+        metrics.incr("upload_skipped")
+        return False
+    if r_size == size:
+        r_size = None                       # 내용이 달라 삭제함 → 처음부터 전송
+
+    with metrics.stage("verify"):
+        offset = _resume_offset(sftp, config, local_path, remote_path, r_size, size)
+    manifest.mark_pending(local_path, remote_path, size, mtime_ns, sha256, offset)
+    if offset:
+        logger.info(f"⏩ 이어서 전송: {remote_path} ({offset:,} / {size:,} bytes)")
+        metrics.incr("upload_resumed")
+    with metrics.stage("put"):
+        put_file(sftp, config, local_path, remote_path, offset=offset)
+    metrics.incr("upload_files")
+    metrics.incr("upload_bytes", size - offset)
+
+    with metrics.stage("verify"):
+        r_size = remote_size(sftp, remote_path)
+        if r_size != size:
+            raise SFTPUploadError(f"❌ 원격 파일 크기 불일치: {remote_path} ({r_size} != {size})")
+        method = _verify_or_discard(sftp, config, local_path, remote_path, size, sha256)
+    if method is None:
+        raise SFTPUploadError(f"❌ 업로드 검증 실패: {remote_path}")
+    logger.debug("업로드 검증(%s) 통과: %s", method, remote_path)
+    manifest.mark_done(local_path, remote_path, size, mtime_ns, sha256)
+    return True
+
+
+def _upload_run_files(sftp: paramiko.SFTPClient, config, manifest: UploadManifest,
+                      dir_cache: RemoteDirCache, db_path) -> None:
+    """한 번의 수집 결과(DB + 첨부파일)를 업로드"""
+    ymd = extract_date_from_db_path(db_path)  # DB 파일 경로에서 날짜 추출
+    remote_dir = f"{config.sftp_base_dir}/{ymd}"
+    with metrics.stage("mkdir"):
+        mkdir_p(sftp, remote_dir, dir_cache)  # 디렉터리 생성 (필요 시)
+
+    attach_files = []
+    for file_path, sha256 in get_local_attach_files(db_path):
+        file_path = config.data_dir / file_path  # 절대 경로로 변환
+        if not os.path.exists(file_path):
+            raise SFTPUploadError(f"❌ 첨부파일 경로가 존재하지 않음: {file_path}")
+        attach_files.append((file_path, sha256))
+    attach_paths = [path for path, _ in attach_files]
+
+    # === 묶음 모드: DB + 첨부파일을 압축 파일 하나로 ===
+    if config.sftp_bundle:
+        with metrics.stage("bundle"):
+            upload_bundle(sftp, config, manifest, db_path, attach_paths, remote_dir)
+        return
+
+    # === 1) DB 파일 업로드 ===
+    remote_db_path = f"{remote_dir}/{os.path.basename(db_path)}"
+    sync_file(sftp, config, manifest, db_path, remote_db_path)
+    logger.info(f"DB 파일 SFTP 업로드 완료: {remote_db_path}")
+
+    # === 2) 첨부파일 업로드 ===
+    attach_dir = f"{remote_dir}/attach"
+    if attach_paths:                     # 첨부파일이 하나라도 있으면
+        with metrics.stage("mkdir"):
+            mkdir_p(sftp, attach_dir, dir_cache)
+    count = 0
+    skipped = 0
+    for file_path, sha256 in attach_files:
+        remote_attach_path = f"{attach_dir}/{os.path.basename(file_path)}"
+        if not sync_file(sftp, config, manifest, file_path, remote_attach_path, sha256):
+            skipped += 1
+            continue
+        count += 1
+        logger.info(f"{count} 첨부파일 SFTP 업로드 완료: {remote_attach_path}")
+    if skipped:
+        logger.info(f"이미 업로드된 첨부파일 {skipped}개 건너뜀")
+
+
+def upload_to_sftp(config, db_path, connection: SFTPConnectionManager | None = None):
+    """
+    SFTP 서버에 DB 파일과 첨부파일 업로드
+
+    `connection` 을 주면 그 연결을 재사용하고 닫지 않는다(스케줄러용).
+    재사용한 연결에서 통신 오류가 나면 연결을 버리고 한 번 더 시도한다.
+    매니페스트 덕분에 재시도는 남은 파일/바이트만 전송한다.
+    단계별 소요 시간과 전송량은 `metrics` 에 실행 1건으로 기록된다.
+    """
+    with metrics.start_run(config, "upload", db_path=str(db_path)):
+        _upload_to_sftp(config, db_path, connection)
+
+
+def _connect(connection: SFTPConnectionManager) -> paramiko.SFTPClient:
+    with metrics.stage("connect"):
+        return connection.get()
+
+
+def _upload_to_sftp(config, db_path, connection: SFTPConnectionManager | None):
     logger.info("------------------------------------------------------------")
     logger.info("🔴 SFTP 업로드 시작")
     try:
-        transport = paramiko.Transport((config.sftp_host, config.sftp_port))
-        transport.connect(username=config.sftp_id, password=config.sftp_pw)
-        sftp = paramiko.SFTPClient.from_transport(transport)
-
-        # === 1) DB 파일 업로드 ===
-        # ymd = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        ymd = extract_date_from_db_path(db_path)  # DB 파일 경로에서 날짜 추출
-        remote_dir = f"{config.sftp_base_dir}/{ymd}"
-        mkdir_p(sftp, remote_dir)  # 디렉터리 생성 (필요 시)
-
-        remote_db_path = f"{remote_dir}/{os.path.basename(db_path)}"
-        sftp.put(str(db_path), remote_db_path)
-        logger.info(f"DB 파일 SFTP 업로드 완료: {remote_db_path}")
-
-        # === 2) 첨부파일 업로드 ===
-        attach_dir = f"{remote_dir}/attach"
-        file_list = get_local_attach_file_list(db_path)
-        if file_list:                        # 첨부파일이 하나라도 있으면
-            mkdir_p(sftp, attach_dir)
-        count = 0
-        for file_path in file_list:
-            file_path = config.data_dir / file_path  # 절대 경로로 변환
-            if os.path.exists(file_path):
-                remote_attach_path = f"{attach_dir}/{os.path.basename(file_path)}"
-                sftp.put(file_path, remote_attach_path)
-                count += 1
-                logger.info(f"{count} 첨부파일 SFTP 업로드 완료: {remote_attach_path}")
-            else:
-                raise SFTPUploadError(f"❌ 첨부파일 경로가 존재하지 않음: {file_path}")
+        manifest = UploadManifest(config.upload_manifest_file)
+    except Exception as e:
+        raise SFTPUploadError(f"❌ SFTP 업로드 중 오류 발생: {e}")
+    dir_cache = get_remote_dir_cache(config)
+
+    if connection is not None:
+        reused = connection.is_connected
+        try:
+            _upload_run_files(_connect(connection), config, manifest, dir_cache, db_path)
+            return
+        except SFTPUploadError:
+            dir_cache.invalidate()
+            raise
+        except (paramiko.SSHException, EOFError, OSError) as e:
+            connection.invalidate()
+            dir_cache.invalidate()
+            if not reused:
+                raise SFTPUploadError(f"❌ SFTP 업로드 중 오류 발생: {e}")
+            logger.warning(f"⚠️ 재사용한 SFTP 연결 오류, 재연결 후 재시도: {e}")
+            metrics.incr("retries")
+        except Exception as e:
+            dir_cache.invalidate()
+            raise SFTPUploadError(f"❌ SFTP 업로드 중 오류 발생: {e}")
+        try:
+            _upload_run_files(_connect(connection), config, manifest, dir_cache, db_path)
+        except SFTPUploadError:
+            dir_cache.invalidate()
+            raise
+        except Exception as e:
+            connection.invalidate()
+            dir_cache.invalidate()
+            raise SFTPUploadError(f"❌ SFTP 업로드 중 오류 발생: {e}")
+        return
 
+    transport = None
+    sftp = None
+    try:
+        with metrics.stage("connect"):
+            transport, sftp = open_sftp(config)
+        _upload_run_files(sftp, config, manifest, dir_cache, db_path)
     except Exception as e:
+        dir_cache.invalidate()
         raise SFTPUploadError(f"❌ SFTP 업로드 중 오류 발생: {e}")
     finally:
         # `close()`는 idempotent하므로 중복 호출해도 안전
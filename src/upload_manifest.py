@@ -0,0 +1,137 @@
+"""upload_manifest.py — SFTP 업로드 매니페스트
+================================================
+로컬 파일별로 크기·해시·원격 업로드 상태를 sqlite 에 기록합니다.
+`upload_to_sftp` 는 이 매니페스트를 보고
+
+• 이미 원격에 올라간 것이 확인된 파일은 건너뛰고,
+• 중간에 끊긴 파일은 원격 크기부터 이어서 전송합니다.
+
+사용 예::
+
+    from upload_manifest import UploadManifest
+    manifest = UploadManifest(cfg.upload_manifest_file)
+    entry = manifest.get(local_path)
+    manifest.mark_done(local_path, remote_path, size, mtime_ns, sha256)
+"""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from exceptions import DBQueryError, DBWriteError
+
+__all__ = ["ManifestEntry", "UploadManifest", "file_sha256"]
+
+_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+
+
+def file_sha256(path: str | Path) -> str:
+    """파일 전체의 sha256 hex digest (1 MB 단위로 읽음)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@dataclass(slots=True, frozen=True)
+class ManifestEntry:
+    local_path: str
+    remote_path: str
+    file_size: int
+    mtime_ns: int
+    sha256: str
+    remote_size: int
+    status: str
+
+    def is_done_for(self, remote_path: str, file_size: int, mtime_ns: int) -> bool:
+        """로컬 파일이 바뀌지 않았고 같은 원격 경로로 업로드 완료된 상태인가."""
+        return (self.status == STATUS_DONE
+                and self.remote_path == remote_path
+                and self.file_size == file_size
+                and self.mtime_ns == mtime_ns)
+
+
+class UploadManifest:
+    """업로드 상태를 기록하는 sqlite 매니페스트."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS upload_manifest (
+                        local_path TEXT PRIMARY KEY,
+                        remote_path TEXT NOT NULL,
+                        file_size INTEGER NOT NULL,
+                        mtime_ns INTEGER NOT NULL,
+                        sha256 TEXT NOT NULL,
+                        remote_size INTEGER DEFAULT 0,
+                        status TEXT NOT NULL DEFAULT 'pending',  -- pending / done
+                        updated_at TEXT
+                    )
+                """)
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 업로드 매니페스트 생성 실패: {e}")
+
+    def get(self, local_path: str | Path) -> ManifestEntry | None:
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                row = conn.execute("""
+                    SELECT local_path, remote_path, file_size, mtime_ns, sha256,
+                           remote_size, status
+                      FROM upload_manifest
+                     WHERE local_path = ?
+                """, (str(local_path),)).fetchone()
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 업로드 매니페스트 조회 오류: {e}")
+        return ManifestEntry(*row) if row else None
+
+    def _upsert(self, local_path, remote_path, file_size, mtime_ns, sha256,
+                remote_size, status) -> None:
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    INSERT INTO upload_manifest
+                          (local_path, remote_path, file_size, mtime_ns, sha256,
+                           remote_size, status, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(local_path) DO UPDATE SET
+                           remote_path = excluded.remote_path,
+                           file_size   = excluded.file_size,
+                           mtime_ns    = excluded.mtime_ns,
+                           sha256      = excluded.sha256,
+                           remote_size = excluded.remote_size,
+                           status      = excluded.status,
+                           updated_at  = excluded.updated_at
+                """, (str(local_path), remote_path, file_size, mtime_ns, sha256,
+                      remote_size, status, datetime.now().isoformat(timespec="seconds")))
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 업로드 매니페스트 저장 오류: {e}")
+
+    def mark_pending(self, local_path, remote_path, file_size, mtime_ns, sha256,
+                     remote_size: int = 0) -> None:
+        """전송 시작 전 상태를 기록 (원격에 일부만 있으면 그 크기도 함께)."""
+        self._upsert(local_path, remote_path, file_size, mtime_ns, sha256,
+                     remote_size, STATUS_PENDING)
+
+    def mark_done(self, local_path, remote_path, file_size, mtime_ns, sha256) -> None:
+        """원격 업로드 완료(원격 크기 == 로컬 크기 확인)."""
+        self._upsert(local_path, remote_path, file_size, mtime_ns, sha256,
+                     file_size, STATUS_DONE)
+
+    def forget(self, local_paths: list[str | Path]) -> None:
+        """로컬에서 지운 파일의 기록 삭제 (보관 기간 정리 후)."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany("DELETE FROM upload_manifest WHERE local_path = ?",
+                                 [(str(p),) for p in local_paths])
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 업로드 매니페스트 저장 오류: {e}")
@@ -0,0 +1,264 @@
+"""upload_outbox.py — SFTP 업로드 대기열(outbox)
+================================================
+메일 수집은 DB 파일(첨부파일 목록은 DB 안에 있음)을 저장하면 커서
+(`LAST_TIME.json`)를 옮기기 전에 sqlite 대기열에 넣고 바로 다음 수집으로
+넘어갑니다. 업로드는 별도
+스레드(`OutboxUploader`)나 단발성 실행의 `drain_outbox()` 가 맡으며,
+실패하면 지수 백오프로 다시 시도합니다.
+
+SFTP 서버가 느리거나 내려가 있어도 수집 주기는 영향받지 않고,
+업로드 실패가 `LAST_TIME.json` 을 되돌려 이미 저장한 메일을 다시 받는
+일도 없습니다.
+
+사용 예::
+
+    from upload_outbox import UploadOutbox, OutboxUploader, drain_outbox
+
+    outbox = UploadOutbox(cfg.upload_outbox_file)
+    outbox.enqueue(db_path)
+
+    uploader = OutboxUploader(cfg, connection=sftp_conn)   # 서비스 모드
+    uploader.start(); uploader.notify(); uploader.stop()
+
+    drain_outbox(cfg)                                      # 단발성 실행
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from exceptions import DBQueryError, DBWriteError
+import file_catalog
+from logger import get_logger
+import metrics
+from run_lock import RunLock
+
+__all__ = ["OutboxItem", "UploadOutbox", "OutboxUploader", "drain_outbox"]
+
+logger = get_logger()
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_MISSING = "missing"      # 로컬 DB 파일이 사라져 더 이상 재시도하지 않음
+
+_IDLE_WAIT = 30.0               # 대기열이 비었을 때 다시 확인하는 간격(초)
+
+
+@dataclass(slots=True, frozen=True)
+class OutboxItem:
+    id: int
+    db_path: str
+    attempts: int
+
+
+class UploadOutbox:
+    """업로드할 DB 파일 목록을 보관하는 sqlite 대기열."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with self._connect() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS upload_outbox (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        db_path TEXT NOT NULL UNIQUE,
+                        status TEXT NOT NULL DEFAULT 'pending',  -- pending / done / missing
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        next_attempt_at REAL NOT NULL DEFAULT 0,  -- epoch 초
+                        last_error TEXT,
+                        enqueued_at TEXT,
+                        done_at TEXT
+                    )
+                """)
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS ix_upload_outbox_due
+                        ON upload_outbox (status, next_attempt_at)
+                """)
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 업로드 대기열 생성 실패: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # 수집 스레드와 업로드 스레드가 동시에 쓰므로 잠금 대기 허용
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def enqueue(self, db_path: str | Path) -> None:
+        """업로드할 DB 파일 추가 (이미 있으면 재시도 횟수를 지우고 즉시 재시도 대상으로 되돌림)."""
+        try:
+            with self._connect() as conn:
+                conn.execute("""
+                    INSERT INTO upload_outbox (db_path, enqueued_at) VALUES (?, ?)
+                    ON CONFLICT(db_path) DO UPDATE SET
+                           status = 'pending', attempts = 0, next_attempt_at = 0,
+                           last_error = NULL, enqueued_at = excluded.enqueued_at, done_at = NULL
+                """, (str(db_path), datetime.now().isoformat(timespec="seconds")))
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 업로드 대기열 추가 실패: {e}")
+        logger.info(f"📤 업로드 대기열 추가: {db_path}")
+
+    def due(self, now: float | None = None) -> list[OutboxItem]:
+        """지금 시도할 차례인 항목 (먼저 들어온 순)."""
+        now = time.time() if now is None else now
+        try:
+            with self._connect() as conn:
+                rows = conn.execute("""
+                    SELECT id, db_path, attempts FROM upload_outbox
+                     WHERE status = 'pending' AND next_attempt_at <= ?
+                     ORDER BY id
+                """, (now,)).fetchall()
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 업로드 대기열 조회 오류: {e}")
+        return [OutboxItem(*row) for row in rows]
+
+    def pending_count(self) -> int:
+        try:
+            with self._connect() as conn:
+                return conn.execute(
+                    "SELECT COUNT(*) FROM upload_outbox WHERE status = 'pending'").fetchone()[0]
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 업로드 대기열 조회 오류: {e}")
+
+    def _set(self, sql: str, params: tuple) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute(sql, params)
+        except sqlite3.Error as e:
+            raise DBWriteError(f"❌ 업로드 대기열 갱신 실패: {e}")
+
+    def mark_done(self, item: OutboxItem) -> None:
+        self._set("""
+            UPDATE upload_outbox SET status = 'done', attempts = attempts + 1,
+                   last_error = NULL, done_at = ?
+             WHERE id = ?
+        """, (datetime.now().isoformat(timespec="seconds"), item.id))
+
+    def mark_missing(self, item: OutboxItem) -> None:
+        self._set("UPDATE upload_outbox SET status = 'missing' WHERE id = ?", (item.id,))
+
+    def mark_failed(self, item: OutboxItem, error: str, retry_base: int, retry_max: int) -> float:
+        """실패 기록 + 다음 시도 시각 설정. 다음 시도까지 남은 초를 반환."""
+        delay = float(min(retry_base * (2 ** item.attempts), retry_max))
+        self._set("""
+            UPDATE upload_outbox SET attempts = attempts + 1, last_error = ?,
+                   next_attempt_at = ?
+             WHERE id = ?
+        """, (error, time.time() + delay, item.id))
+        return delay
+
+    def seconds_until_next(self) -> float | None:
+        """가장 가까운 재시도까지 남은 초 (대기 항목이 없으면 None)."""
+        try:
+            with self._connect() as conn:
+                row = conn.execute("""
+                    SELECT MIN(next_attempt_at) FROM upload_outbox WHERE status = 'pending'
+                """).fetchone()
+        except sqlite3.Error as e:
+            raise DBQueryError(f"❌ 업로드 대기열 조회 오류: {e}")
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+
+def drain_outbox(config, connection=None, outbox: UploadOutbox | None = None,
+                 stop_event: threading.Event | None = None) -> tuple[int, int]:
+    """
+    시도할 차례인 항목을 모두 업로드한다.
+
+    한 건이라도 실패하면 서버/회선 문제일 가능성이 높으므로 나머지는
+    다음 기회로 미룬다. 업로드 모듈(paramiko)은 실제로 올릴 항목이
+    있을 때만 import 한다. 다른 프로세스가 대기열을 처리 중이면
+    (`upload_outbox.lock`) 같은 파일을 겹쳐 올리지 않도록 건너뛴다.
+
+    Returns
+    -------
+    tuple[int, int]
+        (업로드 성공 건수, 실패 건수)
+    """
+    outbox = outbox or UploadOutbox(config.upload_outbox_file)
+    if not outbox.due():
+        return 0, 0
+
+    with RunLock(outbox.db_path.with_suffix(".lock")) as lock:
+        if not lock.acquire():
+            logger.info("다른 프로세스가 업로드 대기열을 처리 중이라 건너뜁니다.")
+            return 0, 0
+        # 잠금을 잡는 사이 다른 프로세스가 처리했을 수 있으므로 다시 조회
+        return _drain_items(config, connection, outbox, outbox.due(), stop_event)
+
+
+def _drain_items(config, connection, outbox: UploadOutbox, items: list[OutboxItem],
+                 stop_event) -> tuple[int, int]:
+    if not items:
+        return 0, 0
+    from sftp_upload import upload_to_sftp  # 지연 import — 빈 대기열이면 paramiko 불필요
+
+    done = 0
+    for item in items:
+        if stop_event is not None and stop_event.is_set():
+            break
+        if not Path(item.db_path).exists():
+            logger.error(f"❌ 업로드 대기 DB 파일이 없어 대기열에서 제외: {item.db_path}")
+            outbox.mark_missing(item)
+            continue
+        try:
+            with metrics.start_run(config, "upload", attempt=item.attempts + 1):
+                if item.attempts:
+                    metrics.incr("retries")
+                upload_to_sftp(config, item.db_path, connection=connection)
+        except Exception as e:  # noqa: BLE001 — 실패는 재시도로 처리
+            delay = outbox.mark_failed(item, str(e), config.outbox_retry_base,
+                                       config.outbox_retry_max)
+            logger.warning(f"⚠️ 업로드 실패({item.attempts + 1}회째), "
+                           f"{delay:.0f}초 후 재시도: {item.db_path} - {e}")
+            return done, 1
+        outbox.mark_done(item)
+        file_catalog.record_upload(config, item.db_path)
+        done += 1
+    if done:
+        logger.info(f"📤 업로드 대기열 처리 완료: {done}건")
+        file_catalog.maybe_prune(config)
+    return done, 0
+
+
+class OutboxUploader:
+    """업로드 대기열을 비우는 백그라운드 스레드 (서비스 모드용)."""
+
+    def __init__(self, config, connection=None):
+        self.config = config
+        self.connection = connection
+        self.outbox = UploadOutbox(config.upload_outbox_file)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="outbox-uploader", daemon=True)
+        self._thread.start()
+
+    def notify(self) -> None:
+        """새 항목이 들어왔음을 알림 — 대기 중이면 즉시 깨어난다."""
+        self._wake.set()
+
+    def stop(self, timeout: float = 30) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                drain_outbox(self.config, self.connection, self.outbox, self._stop)
+                wait = self.outbox.seconds_until_next()
+            except Exception:  # noqa: BLE001 — 업로드 스레드는 죽지 않는다
+                logger.exception("⛔ 업로드 대기열 처리 중 예외")
+                wait = self.config.outbox_retry_base
+            self._wake.wait(_IDLE_WAIT if wait is None else min(wait, _IDLE_WAIT))